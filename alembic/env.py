@@ -1,20 +1,30 @@
+"""Alembic environment.
+
+Run on demand with ``alembic upgrade head`` (uses the DB_* / DATABASE_URL
+settings), or at startup with DB_AUTO_MIGRATE=1, in which case the app passes
+its own connection in ``config.attributes["connection"]``.
+"""
+import asyncio
 from logging.config import fileConfig
+
+from alembic import context
 from sqlalchemy import pool
 from sqlalchemy.engine import Connection
-from alembic import context
+from sqlalchemy.ext.asyncio import create_async_engine
 
-from models.base import Base  # import models to register metadata
-from models import server, events  # noqa: F401
+import models  # noqa: F401  (registers the tables on Base.metadata)
+from utils.db import Base, _dsn
 
 config = context.config
-fileConfig(config.config_file_name)
+if config.config_file_name is not None and not config.attributes.get("connection"):
+    fileConfig(config.config_file_name, disable_existing_loggers=False)
 
 target_metadata = Base.metadata
 
+
 def run_migrations_offline():
-    url = config.get_main_option("sqlalchemy.url")
     context.configure(
-        url=url,
+        url=_dsn(),
         target_metadata=target_metadata,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
@@ -22,14 +32,27 @@ def run_migrations_offline():
     with context.begin_transaction():
         context.run_migrations()
 
+
+def do_run_migrations(connection: Connection):
+    context.configure(connection=connection, target_metadata=target_metadata)
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+async def run_async_migrations():
+    engine = create_async_engine(_dsn(), poolclass=pool.NullPool)
+    async with engine.connect() as connection:
+        await connection.run_sync(do_run_migrations)
+    await engine.dispose()
+
+
 def run_migrations_online():
-    connectable = context.config.attributes.get("connection", None)
-    if connectable is None:
-        raise RuntimeError("Connection must be supplied by app startup.")
-    with connectable.connect() as connection:
-        context.configure(connection=connection, target_metadata=target_metadata)
-        with context.begin_transaction():
-            context.run_migrations()
+    connection = config.attributes.get("connection")
+    if connection is not None:
+        do_run_migrations(connection)
+    else:
+        asyncio.run(run_async_migrations())
+
 
 if context.is_offline_mode():
     run_migrations_offline()
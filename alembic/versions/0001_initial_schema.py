@@ -0,0 +1,94 @@
+"""initial schema
+
+Revision ID: 0001
+Revises: 
+Create Date: 2026-10-17
+
+The schema the bot built with Base.metadata.create_all before migrations
+existed. Databases created that way should be stamped, then upgraded:
+``alembic stamp 0001 && alembic upgrade head``.
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0001'
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('cs2_help_tickets',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('server_key', sa.String(length=16), nullable=False),
+    sa.Column('opener_discord_id', sa.BigInteger(), nullable=False),
+    sa.Column('thread_id', sa.BigInteger(), nullable=False),
+    sa.Column('state', sa.String(length=16), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('server_key', 'opener_discord_id', 'state', name='uq_open_ticket_per_user', sqlite_on_conflict='IGNORE'),
+    sa.UniqueConstraint('thread_id')
+    )
+    op.create_index(op.f('ix_cs2_help_tickets_opener_discord_id'), 'cs2_help_tickets', ['opener_discord_id'], unique=False)
+    op.create_index(op.f('ix_cs2_help_tickets_server_key'), 'cs2_help_tickets', ['server_key'], unique=False)
+    op.create_table('cs2_map_requests',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('server_key', sa.String(length=16), nullable=False),
+    sa.Column('map_name', sa.String(length=64), nullable=False),
+    sa.Column('requester_discord_id', sa.BigInteger(), nullable=False),
+    sa.Column('thread_id', sa.BigInteger(), nullable=True),
+    sa.Column('state', sa.String(length=16), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_cs2_map_requests_requester_discord_id'), 'cs2_map_requests', ['requester_discord_id'], unique=False)
+    op.create_index(op.f('ix_cs2_map_requests_server_key'), 'cs2_map_requests', ['server_key'], unique=False)
+    op.create_table('cs2_panel_messages',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('channel_id', sa.BigInteger(), nullable=False),
+    sa.Column('message_id', sa.BigInteger(), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('channel_id', name='uq_panel_per_channel'),
+    sa.UniqueConstraint('message_id')
+    )
+    op.create_index(op.f('ix_cs2_panel_messages_channel_id'), 'cs2_panel_messages', ['channel_id'], unique=False)
+    op.create_table('cs2_servers',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('key', sa.String(length=16), nullable=False),
+    sa.Column('host', sa.String(length=64), nullable=False),
+    sa.Column('port', sa.Integer(), nullable=False),
+    sa.Column('rcon_host', sa.String(length=64), nullable=False),
+    sa.Column('rcon_port', sa.Integer(), nullable=False),
+    sa.Column('server_pass', sa.String(length=64), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_cs2_servers_key'), 'cs2_servers', ['key'], unique=True)
+    op.create_table('cs2_status',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('server_id', sa.Integer(), nullable=False),
+    sa.Column('ts', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.Column('map_name', sa.String(length=64), nullable=True),
+    sa.Column('players', sa.Integer(), nullable=False),
+    sa.Column('max_players', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['server_id'], ['cs2_servers.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('cs2_status')
+    op.drop_index(op.f('ix_cs2_servers_key'), table_name='cs2_servers')
+    op.drop_table('cs2_servers')
+    op.drop_index(op.f('ix_cs2_panel_messages_channel_id'), table_name='cs2_panel_messages')
+    op.drop_table('cs2_panel_messages')
+    op.drop_index(op.f('ix_cs2_map_requests_server_key'), table_name='cs2_map_requests')
+    op.drop_index(op.f('ix_cs2_map_requests_requester_discord_id'), table_name='cs2_map_requests')
+    op.drop_table('cs2_map_requests')
+    op.drop_index(op.f('ix_cs2_help_tickets_server_key'), table_name='cs2_help_tickets')
+    op.drop_index(op.f('ix_cs2_help_tickets_opener_discord_id'), table_name='cs2_help_tickets')
+    op.drop_table('cs2_help_tickets')
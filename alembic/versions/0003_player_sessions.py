@@ -0,0 +1,39 @@
+"""player sessions
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0003'
+down_revision: Union[str, None] = '0002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('cs2_player_sessions',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('server_key', sa.String(length=16), nullable=False),
+    sa.Column('name', sa.String(length=64), nullable=False),
+    sa.Column('joined_at', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('left_at', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('seconds', sa.Integer(), nullable=False),
+    sa.Column('score', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_player_sessions_name_left', 'cs2_player_sessions', ['name', 'left_at'], unique=False)
+    op.create_index('ix_player_sessions_server_left', 'cs2_player_sessions', ['server_key', 'left_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_player_sessions_server_left', table_name='cs2_player_sessions')
+    op.drop_index('ix_player_sessions_name_left', table_name='cs2_player_sessions')
+    op.drop_table('cs2_player_sessions')
@@ -0,0 +1,32 @@
+"""per-server player stats
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-17
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0005'
+down_revision: Union[str, None] = '0004'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('cs2_player_stats', sa.Column('server_key', sa.String(length=16), server_default='', nullable=False))
+    op.drop_constraint('cs2_player_stats_player_key', 'cs2_player_stats', type_='unique')
+    op.create_index('ix_player_stats_updated', 'cs2_player_stats', ['updated_at'], unique=False)
+    op.create_unique_constraint('uq_player_stats_server_player', 'cs2_player_stats', ['server_key', 'player'])
+
+
+def downgrade() -> None:
+    op.drop_constraint('uq_player_stats_server_player', 'cs2_player_stats', type_='unique')
+    op.drop_index('ix_player_stats_updated', table_name='cs2_player_stats')
+    op.create_unique_constraint('cs2_player_stats_player_key', 'cs2_player_stats', ['player'])
+    op.drop_column('cs2_player_stats', 'server_key')
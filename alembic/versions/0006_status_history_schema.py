@@ -0,0 +1,52 @@
+"""status rollups and history index
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-17
+
+Adds what the status history needs on top of the create_all baseline:
+``cs2_status_rollup`` and the (server_id, ts) index on ``cs2_status``. Either
+may already exist -- bots that ran create_all after the history work have the
+rollup table (but never the index, create_all doesn't add indexes to existing
+tables), and early versions of 0001 created both -- so each is created only if
+missing.
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0006'
+down_revision: Union[str, None] = '0005'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    insp = sa.inspect(op.get_bind())
+    if not insp.has_table('cs2_status_rollup'):
+        op.create_table('cs2_status_rollup',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('server_id', sa.Integer(), nullable=False),
+        sa.Column('resolution', sa.String(length=4), nullable=False),
+        sa.Column('bucket', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('samples', sa.Integer(), nullable=False),
+        sa.Column('players_avg', sa.Float(), nullable=False),
+        sa.Column('players_min', sa.Integer(), nullable=False),
+        sa.Column('players_max', sa.Integer(), nullable=False),
+        sa.Column('max_players', sa.Integer(), nullable=False),
+        sa.Column('map_name', sa.String(length=64), nullable=True),
+        sa.ForeignKeyConstraint(['server_id'], ['cs2_servers.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('server_id', 'resolution', 'bucket', name='uq_status_rollup_bucket')
+        )
+    if 'ix_cs2_status_server_ts' not in {ix['name'] for ix in insp.get_indexes('cs2_status')}:
+        op.create_index('ix_cs2_status_server_ts', 'cs2_status', ['server_id', 'ts'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_cs2_status_server_ts', table_name='cs2_status')
+    op.drop_table('cs2_status_rollup')
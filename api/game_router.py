@@ -1,34 +1,125 @@
 from __future__ import annotations
-import os
-from fastapi import APIRouter, Header, HTTPException
+import json
 from typing import Literal
 
-from services.alerts_cog import AlertsCog
-from db.models_game import PlayerStats
-from utils.db import async_session_maker
+from fastapi import APIRouter, Header, HTTPException, Query, Request
+from pydantic import BaseModel, ConfigDict, Field, ValidationError
+from sqlalchemy import text
 
-router = APIRouter(prefix="/game", tags=["game"]) 
+from services.alerts import alerts
+from services.leaderboards import leaderboards
+from utils.config import settings
+from utils.db import SessionLocal
+
+router = APIRouter(prefix="/game", tags=["game"])
 
 async def _require_token(authorization: str | None):
-    token = os.getenv("GAME_EVENT_TOKEN")
+    token = settings.GAME_EVENT_TOKEN
     if not token or not authorization or not authorization.startswith("Bearer ") or authorization.split(" ",1)[1] != token:
         raise HTTPException(status_code=401, detail="Unauthorized")
 
-@router.post("/alert/{kind}")
+class StatDelta(BaseModel):
+    """What one player gained since the last report (e.g. one round)."""
+    model_config = ConfigDict(extra="ignore", frozen=True)
+    player: str = Field(min_length=1, max_length=64)
+    server: str | None = Field(default=None, max_length=16)  # server key; default: the request's ?server=
+    kills: int = Field(default=0, ge=0)
+    deaths: int = Field(default=0, ge=0)
+    playtime_hours: float = Field(default=0.0, ge=0)
+
+# the whole batch as five arrays: one statement and one round trip, whatever the batch size
+_UPSERT_STATS = text("""
+INSERT INTO cs2_player_stats AS s (server_key, player, kills, deaths, playtime_hours, updated_at)
+SELECT d.server_key, d.player, d.kills, d.deaths, d.playtime_hours, now()
+FROM unnest(CAST(:servers AS varchar[]), CAST(:players AS varchar[]), CAST(:kills AS int[]),
+            CAST(:deaths AS int[]), CAST(:hours AS float8[]))
+     AS d(server_key, player, kills, deaths, playtime_hours)
+ON CONFLICT (server_key, player) DO UPDATE SET
+    kills = s.kills + excluded.kills, deaths = s.deaths + excluded.deaths,
+    playtime_hours = s.playtime_hours + excluded.playtime_hours, updated_at = excluded.updated_at
+RETURNING s.server_key, s.player, s.kills, s.deaths, s.playtime_hours
+""")
+
+async def apply_stats(deltas: list[StatDelta], server: str | None = None) -> int:
+    """Add the deltas to the players' totals in one transaction. Returns the number of rows touched."""
+    # ON CONFLICT can't touch a row twice in one statement, so sum per server and player first
+    merged: dict[tuple[str, str], list] = {}
+    for d in deltas:
+        row = merged.setdefault(((d.server or server or "").lower(), d.player), [0, 0, 0.0])
+        row[0] += d.kills
+        row[1] += d.deaths
+        row[2] += d.playtime_hours
+    if not merged:
+        return 0
+    async with SessionLocal() as ses:
+        totals = (await ses.execute(_UPSERT_STATS, {
+            "servers": [k[0] for k in merged],
+            "players": [k[1] for k in merged],
+            "kills": [r[0] for r in merged.values()],
+            "deaths": [r[1] for r in merged.values()],
+            "hours": [r[2] for r in merged.values()],
+        })).all()
+        await ses.commit()
+    for row in totals:  # this worker's boards now; the others catch up on their next refresh
+        leaderboards.update(*row)
+    return len(merged)
+
+async def _read_ndjson(request: Request) -> list[StatDelta]:
+    # validated line by line as the body streams in; a bad line rejects the whole batch
+    deltas: list[StatDelta] = []
+    buf, line_no = b"", 0
+
+    def take(line: bytes):
+        nonlocal line_no
+        line_no += 1
+        if not line.strip():
+            return
+        if len(deltas) >= settings.GAME_STATS_MAX_BATCH:
+            raise HTTPException(status_code=413, detail=f"At most {settings.GAME_STATS_MAX_BATCH} deltas per request")
+        try:
+            deltas.append(StatDelta.model_validate_json(line))
+        except ValidationError as e:
+            raise HTTPException(status_code=422, detail=f"line {line_no}: {e.errors(include_url=False, include_context=False)}")
+
+    async for chunk in request.stream():
+        buf += chunk
+        *lines, buf = buf.split(b"\n")
+        for line in lines:
+            take(line)
+    take(buf)
+    return deltas
+
+@router.post("/alert/{kind}", status_code=202)
 async def post_alert(kind: Literal["rare_loot","boss","suspicious"], payload: dict, authorization: str | None = Header(default=None)):
     await _require_token(authorization)
-    # Get bot and AlertsCog via app state, or import your global bot reference
-    from main import bot  # adjust if your bot lives elsewhere
-    cog: AlertsCog | None = bot.get_cog("AlertsCog")  # type: ignore
-    if not cog:
-        raise HTTPException(status_code=503, detail="Alerts cog not ready")
-    await cog.post_alert(kind, payload)
-    return {"ok": True}
+    # queued; posted to Discord (merged with similar alerts) by the leader's dispatcher
+    return {"ok": alerts.submit(kind, payload)}
 
 @router.post("/stats/update")
-async def stats_update(item: dict, authorization: str | None = Header(default=None)):
+async def stats_update(item: StatDelta, authorization: str | None = Header(default=None)):
+    await _require_token(authorization)
+    await apply_stats([item])
+    return {"ok": True}
+
+@router.post("/stats/bulk")
+async def stats_bulk(request: Request, server: str | None = Query(default=None, max_length=16, description="Server key for deltas that name none"),
+                     authorization: str | None = Header(default=None)):
+    """Many deltas in one request: a JSON array, or NDJSON (``application/x-ndjson``, one delta per line)."""
     await _require_token(authorization)
-    # item = {player, kills, deaths, playtime_hours}
-    async with async_session_maker() as s:
-        await PlayerStats.upsert(s, item)
-    return {"ok": True}
\ No newline at end of file
+    if request.headers.get("content-type", "").startswith("application/x-ndjson"):
+        deltas = await _read_ndjson(request)
+    else:
+        try:
+            items = json.loads(await request.body())
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Body must be a JSON array or NDJSON")
+        if not isinstance(items, list):
+            raise HTTPException(status_code=422, detail="Expected a JSON array of deltas")
+        if len(items) > settings.GAME_STATS_MAX_BATCH:
+            raise HTTPException(status_code=413, detail=f"At most {settings.GAME_STATS_MAX_BATCH} deltas per request")
+        try:
+            deltas = [StatDelta.model_validate(i) for i in items]
+        except ValidationError as e:
+            raise HTTPException(status_code=422, detail=e.errors(include_url=False, include_context=False))
+    players = await apply_stats(deltas, server)
+    return {"ok": True, "deltas": len(deltas), "players": players}
@@ -0,0 +1,123 @@
+from __future__ import annotations
+import datetime as dt
+import json
+import math
+
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy import text
+
+from services.server_registry import registry
+from utils.config import settings
+from utils.db import SessionLocal
+
+router = APIRouter(prefix="/status", tags=["status"])
+
+MAX_RANGE = dt.timedelta(days=800)
+TARGET_POINTS = 500  # auto step aims for about this many points
+
+# (resolution name, seconds); raw samples are ~STATUS_POLL_INTERVAL apart
+_SOURCES = (("1h", 3600), ("1m", 60))
+
+# one bucketing query per source; :step >= the source resolution, so buckets are exact multiples
+_RAW_QUERY = text("""
+SELECT to_timestamp(floor(extract(epoch FROM ts) / :step) * :step) AS bucket_ts,
+       avg(players) AS players_avg, min(players) AS players_min, max(players) AS players_max,
+       max(max_players) AS max_players, (array_agg(map_name ORDER BY ts DESC))[1] AS map_name
+FROM cs2_status
+WHERE server_id = :server_id AND ts >= :since AND ts < :until
+GROUP BY 1 ORDER BY 1
+""")
+
+_ROLLUP_QUERY = text("""
+SELECT to_timestamp(floor(extract(epoch FROM bucket) / :step) * :step) AS bucket_ts,
+       sum(players_avg * samples) / nullif(sum(samples), 0) AS players_avg,
+       min(players_min) AS players_min, max(players_max) AS players_max,
+       max(max_players) AS max_players, (array_agg(map_name ORDER BY bucket DESC))[1] AS map_name
+FROM cs2_status_rollup
+WHERE server_id = :server_id AND resolution = :resolution AND bucket >= :since AND bucket < :until
+GROUP BY 1 ORDER BY 1
+""")
+
+
+def _retention(source: str) -> dt.timedelta:
+    days = {"1h": settings.STATUS_HOURLY_RETENTION_DAYS, "1m": settings.STATUS_MINUTE_RETENTION_DAYS,
+            "raw": settings.STATUS_RAW_RETENTION_DAYS}[source]
+    return dt.timedelta(days=days)
+
+
+def _pick_source(step: int, since: dt.datetime, now: dt.datetime) -> tuple[str, int]:
+    """(source, step): the coarsest table that fits the step and still holds data back to ``since``.
+
+    When only coarser tables reach back that far, the step is rounded up to the
+    finest of them instead of silently returning just the retained tail.
+    """
+    covering = [(name, seconds) for name, seconds in (*_SOURCES, ("raw", 1)) if since >= now - _retention(name)]
+    for name, seconds in covering:
+        if step % seconds == 0:
+            return name, step
+    name, seconds = covering[-1] if covering else _SOURCES[0]
+    return name, math.ceil(step / seconds) * seconds
+
+
+async def _stream(params: dict, source: str, header: dict):
+    # emit the JSON document piecewise; rows come from a server-side cursor, never a full list
+    yield json.dumps(header)[:-1] + ', "points": ['
+    map_changes = []
+    last_map = None
+    first = True
+    async with SessionLocal() as ses:
+        if source == "raw":
+            rows = await ses.stream(_RAW_QUERY, params)
+        else:
+            rows = await ses.stream(_ROLLUP_QUERY, {**params, "resolution": source})
+        async for row in rows:
+            ts = row.bucket_ts.isoformat()
+            if row.map_name and row.map_name != last_map:
+                map_changes.append({"ts": ts, "map": row.map_name})
+                last_map = row.map_name
+            point = {
+                "ts": ts,
+                "players_avg": round(float(row.players_avg or 0), 2),
+                "players_min": row.players_min,
+                "players_max": row.players_max,
+                "max_players": row.max_players,
+                "map": row.map_name,
+            }
+            yield ("" if first else ",") + json.dumps(point)
+            first = False
+    yield '], "map_changes": ' + json.dumps(map_changes) + "}"
+
+
+@router.get("/{server}/history")
+async def history(
+    server: str,
+    since: dt.datetime | None = Query(default=None, alias="from"),
+    until: dt.datetime | None = Query(default=None, alias="to"),
+    step: int | None = Query(default=None, ge=1, description="Bucket size in seconds; default picks ~500 points"),
+):
+    srv = registry.get(server.lower())
+    if srv is None or srv.id is None:
+        raise HTTPException(status_code=404, detail="Unknown server")
+    now = dt.datetime.now(dt.timezone.utc)
+    until = until or now
+    since = since or until - dt.timedelta(days=1)
+    if until.tzinfo is None:
+        until = until.replace(tzinfo=dt.timezone.utc)
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=dt.timezone.utc)
+    if since >= until or until - since > MAX_RANGE:
+        raise HTTPException(status_code=422, detail="Invalid range")
+
+    if step is None:
+        step = max(1, math.ceil((until - since).total_seconds() / TARGET_POINTS))
+        # snap auto steps onto a rollup resolution so the cheapest table is used
+        for _, seconds in _SOURCES:
+            if step >= seconds:
+                step = math.ceil(step / seconds) * seconds
+                break
+    source, step = _pick_source(step, since, now)
+
+    header = {"server": srv.key, "from": since.isoformat(), "to": until.isoformat(), "step": step, "source": source}
+    params = {"server_id": srv.id, "since": since, "until": until, "step": step}
+    return StreamingResponse(_stream(params, source, header), media_type="application/json")
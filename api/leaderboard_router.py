@@ -0,0 +1,39 @@
+from __future__ import annotations
+from typing import Literal
+
+from fastapi import APIRouter, Query
+from pydantic import BaseModel
+
+from services.leaderboards import leaderboards
+
+router = APIRouter(prefix="/leaderboard", tags=["leaderboard"])
+
+class EntryOut(BaseModel):
+    rank: int
+    player: str
+    score: float
+    kills: int
+    deaths: int
+    playtime_hours: float
+
+class LeaderboardOut(BaseModel):
+    board: str
+    server: str | None
+    total: int
+    entries: list[EntryOut]
+
+@router.get("", response_model=LeaderboardOut)
+async def leaderboard(
+    board: Literal["kills", "kd", "playtime"] = "kills",
+    server: str | None = Query(default=None, description="Server key; default all servers"),
+    offset: int = Query(default=0, ge=0),
+    limit: int = Query(default=10, ge=1, le=100),
+):
+    """A page of a ranking, served from memory."""
+    server = server.lower() if server else None
+    total, rows = leaderboards.top(board, server, offset, limit)
+    return {"board": board, "server": server, "total": total, "entries": [
+        {"rank": rank, "player": player, "score": score,
+         "kills": t.kills, "deaths": t.deaths, "playtime_hours": round(t.playtime_hours, 2)}
+        for rank, player, score, t in rows
+    ]}
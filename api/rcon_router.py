@@ -0,0 +1,29 @@
+from __future__ import annotations
+from dataclasses import asdict
+
+from fastapi import APIRouter, Header, HTTPException
+from pydantic import BaseModel, Field
+
+from services.rcon_broadcast import broadcast, resolve_targets
+from utils.config import settings
+
+router = APIRouter(prefix="/rcon", tags=["rcon"])
+
+async def _require_token(authorization: str | None):
+    token = settings.RCON_API_TOKEN
+    if not token or not authorization or not authorization.startswith("Bearer ") or authorization.split(" ",1)[1] != token:
+        raise HTTPException(status_code=401, detail="Unauthorized")
+
+class BroadcastIn(BaseModel):
+    commands: list[str] = Field(min_length=1, max_length=20)
+    servers: list[str] | None = None  # None = every registered server
+    timeout: float | None = Field(default=None, gt=0, le=30)
+
+@router.post("/broadcast")
+async def post_broadcast(body: BroadcastIn, authorization: str | None = Header(default=None)):
+    await _require_token(authorization)
+    keys, unknown = resolve_targets(body.servers)
+    if unknown:
+        raise HTTPException(status_code=404, detail=f"Unknown servers: {', '.join(unknown)}")
+    result = await broadcast(keys, body.commands, body.timeout)
+    return {"ok": result.ok, "elapsed_ms": round(result.elapsed_ms, 1), "servers": [asdict(s) for s in result.servers]}
@@ -0,0 +1,132 @@
+from __future__ import annotations
+import asyncio
+import datetime as dt
+import hashlib
+import json
+
+from fastapi import APIRouter, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+
+from services.player_sessions import sessions
+from services.server_registry import registry
+from services.status_hub import hub, sse
+from services.status_snapshot import ServerSnapshot, snapshots
+
+router = APIRouter(prefix="/status", tags=["status"])
+
+class StatusOut(BaseModel):
+    server: str
+    address: str
+    map: str | None
+    players: int
+    max_players: int
+    names: list[str]
+
+class StatusListOut(BaseModel):
+    servers: list[StatusOut]
+
+class PlayerOut(BaseModel):
+    name: str
+    joined_at: dt.datetime
+    seconds: int
+    score: int
+
+class PlayersOut(BaseModel):
+    server: str
+    players: list[PlayerOut]
+
+class PlaytimeOut(BaseModel):
+    name: str
+    seconds: int
+    since: dt.datetime | None
+
+# last serialized body per ETag; a poll that changed nothing reuses it
+_bodies: dict[str, bytes] = {}
+
+def _status_dict(snap: ServerSnapshot) -> dict:
+    return {
+        "server": snap.key,
+        "address": snap.address,
+        "map": getattr(snap.info, "map_name", None),
+        "players": getattr(snap.info, "player_count", 0),
+        "max_players": getattr(snap.info, "max_players", 0),
+        "names": snap.names(),
+    }
+
+async def _snapshot(key: str) -> ServerSnapshot:
+    # served from the poller's cache; only a cold start waits on A2S
+    return snapshots.latest(key) or await snapshots.get(key)
+
+def _respond(request: Request, shape: str, snaps: list[ServerSnapshot], render) -> Response:
+    # the shape ("all" / "one") keeps a one-server list and that server's own body apart
+    etag = '"' + hashlib.blake2b(f"{shape}:".encode() + "".join(s.digest for s in snaps).encode(),
+                                 digest_size=8).hexdigest() + '"'
+    max_age = int(max(0.0, min((snapshots.ttl - s.age for s in snaps), default=0.0)))
+    headers = {"ETag": etag, "Cache-Control": f"public, max-age={max_age}"}
+    if etag in request.headers.get("if-none-match", ""):
+        return Response(status_code=304, headers=headers)
+    body = _bodies.get(etag)
+    if body is None:
+        body = json.dumps(render()).encode()
+        if len(_bodies) > 256:
+            _bodies.clear()
+        _bodies[etag] = body
+    return Response(content=body, media_type="application/json", headers=headers)
+
+@router.get("", response_model=StatusListOut)
+async def status_all(request: Request):
+    snaps = [snapshots.latest(k) for k in registry.keys]
+    if None in snaps:
+        snaps = await snapshots.get_many(registry.keys)
+    return _respond(request, "all", snaps, lambda: {"servers": [_status_dict(s) for s in snaps]})
+
+@router.get("/stream")
+async def status_stream(request: Request, servers: str | None = Query(default=None, description="Comma-separated keys; default all")):
+    """Server-Sent Events: one ``snapshot`` event, then a ``delta`` whenever map, player count or roster changes."""
+    keys = {k.strip().lower() for k in servers.split(",") if k.strip()} if servers else None
+    sub = hub.subscribe(keys)
+
+    async def events():
+        try:
+            yield sse("snapshot", {"servers": hub.current(keys)})
+            while True:
+                try:
+                    payload = await asyncio.wait_for(sub.queue.get(), timeout=15)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        break
+                    yield b": ping\n\n"  # keeps proxies from closing an idle stream
+                    continue
+                if payload is None:  # evicted as a slow consumer
+                    yield sse("evicted", {"reason": "slow consumer"})
+                    break
+                yield payload
+        finally:
+            hub.unsubscribe(sub)
+
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@router.get("/{server}/players", response_model=PlayersOut)
+async def players(server: str):
+    """Who is on the server and since when, from the in-memory session index."""
+    server = server.lower()
+    return {"server": server, "players": [
+        {"name": s.name, "joined_at": s.joined_at, "seconds": s.seconds, "score": s.score}
+        for s in sessions.active(server)
+    ]}
+
+@router.get("/players/{name}/playtime", response_model=PlaytimeOut)
+async def playtime(name: str, days: int | None = Query(default=None, ge=1, le=3650, description="Only the last N days")):
+    """Time ``name`` spent on any server: finished sessions plus the one in progress."""
+    since = dt.datetime.now(dt.timezone.utc) - dt.timedelta(days=days) if days else None
+    return {"name": name, "seconds": await sessions.playtime(name, since), "since": since}
+
+@router.get("/{server}", response_model=StatusOut)
+async def status(server: str, request: Request):
+    server = server.lower()
+    if server not in registry:
+        return {"server": server, "address": "", "map": None, "players": 0, "max_players": 0, "names": []}
+    snap = await _snapshot(server)
+    return _respond(request, "one", [snap], lambda: _status_dict(snap))
@@ -0,0 +1,309 @@
+"""In-process fake CS2 servers for benchmarks.
+
+``FakeA2SServer`` answers A2S_INFO / A2S_PLAYER over UDP (with the challenge
+round trip and split packets for big rosters); ``FakeRconServer`` speaks Source
+RCON over TCP. Both add a fixed ``latency`` to every reply and drop a ``loss``
+fraction of incoming packets/commands. The wire format is written out here on
+purpose instead of reusing the client's codec.
+
+The Discord side is faked just far enough for the cogs: ``FakeBot`` for panel
+edits and ``FakeInteraction`` for button/command/modal callbacks.
+"""
+import asyncio
+import itertools
+import random
+import struct
+import time
+
+import discord
+
+_HEADER = b"\xff\xff\xff\xff"
+_SPLIT_PAYLOAD = 1200  # real servers split replies above ~1248 bytes
+
+RCON_EXEC = 2
+RCON_AUTH = 3
+RCON_AUTH_RESPONSE = 2
+RCON_RESPONSE = 0
+
+
+def _cstr(s: str) -> bytes:
+    return s.encode() + b"\x00"
+
+
+class _A2SProtocol(asyncio.DatagramProtocol):
+    def __init__(self, server: "FakeA2SServer"):
+        self.server = server
+        self.transport: asyncio.DatagramTransport | None = None
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data: bytes, addr):
+        srv = self.server
+        srv.received += 1
+        if srv.loss and random.random() < srv.loss:
+            return
+        reply = srv.reply(data)
+        if reply is None:
+            return
+        packets = srv.split(reply)
+        if srv.latency:
+            asyncio.get_running_loop().call_later(srv.latency, self._send, packets, addr)
+        else:
+            self._send(packets, addr)
+
+    def _send(self, packets: list[bytes], addr):
+        if self.transport is not None and not self.transport.is_closing():
+            for p in packets:
+                self.transport.sendto(p, addr)
+
+
+class FakeA2SServer:
+    def __init__(self, players: int = 10, max_players: int = 64, map_name: str = "surf_beginner",
+                 latency: float = 0.0, loss: float = 0.0):
+        self.players = players
+        self.max_players = max_players
+        self.map_name = map_name
+        self.latency = latency
+        self.loss = loss
+        self.challenge = random.randbytes(4)
+        self.received = 0
+        self.port = 0
+        self._split_id = 0
+        self._transport: asyncio.DatagramTransport | None = None
+
+    async def start(self, host: str = "127.0.0.1") -> "FakeA2SServer":
+        loop = asyncio.get_running_loop()
+        self._transport, _ = await loop.create_datagram_endpoint(lambda: _A2SProtocol(self), local_addr=(host, 0))
+        self.port = self._transport.get_extra_info("sockname")[1]
+        return self
+
+    def close(self):
+        if self._transport is not None:
+            self._transport.close()
+
+    def reply(self, data: bytes) -> bytes | None:
+        kind = data[4:5]
+        if kind == b"T":
+            if data[-4:] != self.challenge:
+                return _HEADER + b"A" + self.challenge
+            return _HEADER + self._info()
+        if kind == b"U":
+            if data[5:9] != self.challenge:
+                return _HEADER + b"A" + self.challenge
+            return _HEADER + self._player_list()
+        return None
+
+    def _info(self) -> bytes:
+        return (b"I\x11" + _cstr("Fake CS2") + _cstr(self.map_name) + _cstr("csgo") + _cstr("Counter-Strike 2")
+                + struct.pack("<h", 730) + bytes([min(self.players, 255), self.max_players, 0])
+                + b"dl" + b"\x00\x01" + _cstr("1.0.0.0") + b"\x80" + struct.pack("<H", self.port))
+
+    def _player_list(self) -> bytes:
+        body = bytearray(b"D" + bytes([min(self.players, 255)]))
+        for i in range(self.players):
+            body += bytes([i]) + _cstr(f"player{i:03d}") + struct.pack("<lf", i * 3, 60.0 * i)
+        return bytes(body)
+
+    def split(self, payload: bytes) -> list[bytes]:
+        if len(payload) <= _SPLIT_PAYLOAD:
+            return [payload]
+        self._split_id = (self._split_id + 1) & 0x7FFFFFFF
+        chunks = [payload[i:i + _SPLIT_PAYLOAD] for i in range(0, len(payload), _SPLIT_PAYLOAD)]
+        return [struct.pack("<llBBh", -2, self._split_id, len(chunks), n, _SPLIT_PAYLOAD + 48) + c
+                for n, c in enumerate(chunks)]
+
+
+def _rcon_packet(request_id: int, kind: int, body: str) -> bytes:
+    data = struct.pack("<ll", request_id, kind) + body.encode() + b"\x00\x00"
+    return struct.pack("<l", len(data)) + data
+
+
+class FakeRconServer:
+    def __init__(self, password: str = "bench", latency: float = 0.0, loss: float = 0.0, response_size: int = 64):
+        self.password = password
+        self.latency = latency
+        self.loss = loss
+        self.response = "x" * response_size
+        self.connections = 0
+        self.commands = 0
+        self.port = 0
+        self._server: asyncio.AbstractServer | None = None
+
+    async def start(self, host: str = "127.0.0.1") -> "FakeRconServer":
+        self._server = await asyncio.start_server(self._handle, host, 0)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    def close(self):
+        if self._server is not None:
+            self._server.close()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.connections += 1
+        loop = asyncio.get_running_loop()
+        swallow_sentinel = False
+        try:
+            while True:
+                size, = struct.unpack("<l", await reader.readexactly(4))
+                request_id, kind = struct.unpack("<ll", await reader.readexactly(8))
+                body = (await reader.readexactly(size - 8))[:-2].decode(errors="replace")
+                if kind == RCON_AUTH:
+                    ok = body == self.password
+                    writer.write(_rcon_packet(request_id, RCON_RESPONSE, ""))
+                    writer.write(_rcon_packet(request_id if ok else -1, RCON_AUTH_RESPONSE, ""))
+                    continue
+                if body:
+                    self.commands += 1
+                    if self.loss and random.random() < self.loss:
+                        swallow_sentinel = True  # the client's end-of-response marker is lost with it
+                        continue
+                elif swallow_sentinel:
+                    swallow_sentinel = False
+                    continue
+                reply = _rcon_packet(request_id, RCON_RESPONSE, self.response if body else "")
+                # same delay for every reply keeps them in order, like a server answering on its tick
+                if self.latency:
+                    loop.call_later(self.latency, writer.write, reply)
+                else:
+                    writer.write(reply)
+        except (asyncio.IncompleteReadError, ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            writer.close()
+
+
+class FakePartialMessage:
+    def __init__(self, channel: "FakeChannel", message_id: int):
+        self.channel = channel
+        self.id = message_id
+
+    async def edit(self, **kwargs):
+        await asyncio.sleep(self.channel.bot.latency)
+        self.channel.bot.edits += 1
+
+
+class FakeChannel:
+    def __init__(self, bot: "FakeBot", channel_id: int):
+        self.bot = bot
+        self.id = channel_id
+
+    def get_partial_message(self, message_id: int) -> FakePartialMessage:
+        return FakePartialMessage(self, message_id)
+
+
+class FakeBot:
+    """Just enough of ``commands.Bot`` for ``PortaCog`` panel refreshes; edits take ``latency`` seconds."""
+
+    def __init__(self, latency: float = 0.05):
+        self.latency = latency
+        self.edits = 0
+        self._ready = asyncio.Event()  # never set, so the cog's own refresh loop stays parked
+
+    async def wait_until_ready(self):
+        await self._ready.wait()
+
+    def get_partial_messageable(self, channel_id: int) -> FakeChannel:
+        return FakeChannel(self, channel_id)
+
+
+# snowflake-shaped ids that stay unique across runs (tickets have a unique thread id)
+_ids = itertools.count((int(time.time() * 1000) - 1420070400000) << 22)
+
+
+class FakeMember:
+    def __init__(self, user_id: int, roles: list[discord.Object] | None = None):
+        self.id = user_id
+        self.display_name = f"user{user_id % 10000}"
+        self.roles = roles or []
+        self.mention = f"<@{user_id}>"
+
+
+class FakeThread:
+    def __init__(self, api: "FakeDiscordAPI"):
+        self.api = api
+        self.id = next(_ids)
+
+    async def send(self, *args, **kwargs):
+        await self.api.call("thread.send")
+
+
+class FakeTextChannel(discord.TextChannel):
+    """Passes the cogs' ``isinstance(ch, discord.TextChannel)`` checks without a gateway state."""
+
+    def __init__(self, api: "FakeDiscordAPI"):
+        self.api = api
+        self.id = next(_ids)
+        self.name = "cs2-panel"
+
+    async def create_thread(self, **kwargs) -> FakeThread:
+        await self.api.call("channel.create_thread")
+        return FakeThread(self.api)
+
+
+class FakeDiscordAPI:
+    """Every REST call takes ``latency`` seconds; calls are counted per endpoint."""
+
+    def __init__(self, latency: float = 0.08):
+        self.latency = latency
+        self.calls: dict[str, int] = {}
+
+    async def call(self, endpoint: str):
+        self.calls[endpoint] = self.calls.get(endpoint, 0) + 1
+        await asyncio.sleep(self.latency)
+
+
+class FakeInteractionResponse:
+    def __init__(self, interaction: "FakeInteraction"):
+        self._interaction = interaction
+        self._done = False
+
+    def is_done(self) -> bool:
+        return self._done
+
+    async def _ack(self, endpoint: str):
+        if self._done:
+            raise discord.InteractionResponded(self._interaction)
+        self._done = True
+        await self._interaction.api.call(endpoint)
+        self._interaction.acked_at = time.perf_counter()
+
+    async def defer(self, **kwargs):
+        await self._ack("response.defer")
+
+    async def send_message(self, *args, **kwargs):
+        await self._ack("response.send_message")
+
+    async def send_modal(self, modal):
+        await self._ack("response.send_modal")
+
+    async def edit_message(self, **kwargs):
+        await self._ack("response.edit_message")
+
+
+class FakeFollowup:
+    def __init__(self, interaction: "FakeInteraction"):
+        self._interaction = interaction
+
+    async def send(self, *args, **kwargs):
+        if not self._interaction.response.is_done():
+            raise RuntimeError("followup sent before the interaction was acknowledged")  # Discord answers 404
+        await self._interaction.api.call("followup.send")
+
+
+class FakeInteraction:
+    """Stand-in for ``discord.Interaction``; ``acked_at`` is set when the initial response lands."""
+
+    def __init__(self, api: FakeDiscordAPI, channel: FakeTextChannel, user: FakeMember):
+        self.id = next(_ids)
+        self.api = api
+        self.channel = channel
+        self.user = user
+        self.created_at = time.perf_counter()
+        self.acked_at: float | None = None
+        self.response = FakeInteractionResponse(self)
+        self.followup = FakeFollowup(self)
+
+    @property
+    def ack_delay(self) -> float | None:
+        return None if self.acked_at is None else self.acked_at - self.created_at
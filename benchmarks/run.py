@@ -0,0 +1,147 @@
+"""Benchmark the status/RCON hot paths against in-process fake servers.
+
+    python -m benchmarks.run --servers 1,10,100 --latency-ms 5 --out bench.json
+
+Every benchmark runs at each server count and reports sample count, errors,
+throughput and p50/p99/max latency as JSON, so runs can be diffed or plotted.
+"""
+import argparse
+import asyncio
+import json
+import sys
+import time
+from typing import Awaitable, Callable
+
+from benchmarks.fakes import FakeA2SServer, FakeBot, FakeRconServer
+from benchmarks.stats import latency_stats, run_meta
+from services.portal_cog import PortaCog, build_status_embed
+from services.server_registry import ServerConfig, registry
+from services.status_snapshot import snapshots
+from utils.rcon_cs2 import close_pools, rcon_exec
+from utils.source_query import get_info, get_players
+
+
+def summarize(name: str, servers: int, samples: list[float], errors: int, wall: float) -> dict:
+    return {
+        "bench": name,
+        "servers": servers,
+        "samples": len(samples),
+        "errors": errors,
+        "throughput_per_s": round(len(samples) / wall, 1) if wall else 0.0,
+        **latency_stats(samples),
+    }
+
+
+async def _timed(fn: Callable[[], Awaitable], samples: list[float]) -> bool:
+    started = time.perf_counter()
+    try:
+        await fn()
+    except Exception:
+        return False
+    samples.append(time.perf_counter() - started)
+    return True
+
+
+async def _run_calls(name: str, servers: int, iterations: int, calls: list[Callable[[], Awaitable]]) -> dict:
+    """Fire ``calls`` concurrently ``iterations`` times; one sample per call."""
+    samples: list[float] = []
+    errors = 0
+    started = time.perf_counter()
+    for _ in range(iterations):
+        ok = await asyncio.gather(*(_timed(c, samples) for c in calls))
+        errors += ok.count(False)
+    return summarize(name, servers, samples, errors, time.perf_counter() - started)
+
+
+async def _run_sweeps(name: str, servers: int, iterations: int, sweep: Callable[[], Awaitable]) -> dict:
+    """Run ``sweep`` back to back ``iterations`` times; one sample per sweep."""
+    samples: list[float] = []
+    errors = 0
+    started = time.perf_counter()
+    for _ in range(iterations):
+        errors += not await _timed(sweep, samples)
+    return summarize(name, servers, samples, errors, time.perf_counter() - started)
+
+
+async def bench_servers(n: int, args) -> list[dict]:
+    latency = args.latency_ms / 1000
+    a2s = [await FakeA2SServer(players=args.players, latency=latency, loss=args.loss).start() for _ in range(n)]
+    rcon = [await FakeRconServer(latency=latency, loss=args.loss).start() for _ in range(n)]
+    configs = [
+        ServerConfig(key=f"bench{i:03d}", host="127.0.0.1", port=q.port, rcon_host="127.0.0.1", rcon_port=r.port,
+                     rcon_pass=r.password)
+        for i, (q, r) in enumerate(zip(a2s, rcon))
+    ]
+    registry._index(configs)
+    timeout = snapshots.timeout = args.timeout
+    results = []
+    try:
+        results.append(await _run_calls("a2s_get_info", n, args.iterations,
+                                        [lambda s=s: get_info(s.host, s.port, timeout) for s in configs]))
+        results.append(await _run_calls("a2s_get_players", n, args.iterations,
+                                        [lambda s=s: get_players(s.host, s.port, timeout) for s in configs]))
+
+        rcon_calls = [lambda s=s: rcon_exec(s.rcon_host, s.rcon_port, s.rcon_pass, "status", timeout) for s in configs]
+        await asyncio.gather(*(c() for c in rcon_calls), return_exceptions=True)  # open the pools first
+        results.append(await _run_calls("rcon_exec", n, args.iterations, rcon_calls))
+
+        # one poller tick: every server re-queried through the snapshot store
+        results.append(await _run_sweeps("status_sweep", n, args.iterations, lambda: snapshots.sweep(max_age=0)))
+        # warm cache, as the panels and API see it between polls
+        results.append(await _run_sweeps("build_status_embed", n, args.iterations, build_status_embed))
+
+        # one panel per server, each in its own channel, all out of date
+        bot = FakeBot(latency=args.discord_latency_ms / 1000)
+        cog = PortaCog(bot)
+        panels = [(1000 + i, 2000 + i) for i in range(n)]
+
+        async def panel_sweep():
+            cog._sent.clear()
+            await cog.refresh_panels(panels)
+            while cog.editor.pending():
+                await asyncio.sleep(0.001)
+
+        try:
+            results.append(await _run_sweeps("panel_refresh_sweep", n, args.iterations, panel_sweep))
+        finally:
+            cog.cog_unload()
+    finally:
+        close_pools()
+        for srv in a2s + rcon:
+            srv.close()
+    return results
+
+
+async def main(args) -> dict:
+    results = []
+    for n in args.servers:
+        results.extend(await bench_servers(n, args))
+    return {"meta": run_meta(args), "results": results}
+
+
+def parse_args(argv=None):
+    p = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    p.add_argument("--servers", default="1,10,100", type=lambda s: [int(x) for x in s.split(",")],
+                   help="comma-separated server counts (default 1,10,100)")
+    p.add_argument("--iterations", type=int, default=20, help="rounds per benchmark (default 20)")
+    p.add_argument("--players", type=int, default=10, help="players reported by every fake server")
+    p.add_argument("--latency-ms", type=float, default=0.0, help="added to every fake A2S/RCON reply")
+    p.add_argument("--loss", type=float, default=0.0, help="fraction of requests the fakes drop (0..1)")
+    p.add_argument("--discord-latency-ms", type=float, default=50.0, help="duration of one fake message edit")
+    p.add_argument("--timeout", type=float, default=1.0, help="A2S/RCON timeout in seconds")
+    p.add_argument("--out", help="write JSON here instead of stdout")
+    return p.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    report = asyncio.run(main(args))
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(text + "\n")
+        for r in report["results"]:
+            print(f"{r['bench']:<22} n={r['servers']:<4} p50={r['p50_ms']:>9.3f}ms p99={r['p99_ms']:>9.3f}ms "
+                  f"{r['throughput_per_s']:>9.1f}/s errors={r['errors']}", file=sys.stderr)
+    else:
+        print(text)
@@ -0,0 +1,42 @@
+"""Shared result helpers for the benchmark scripts."""
+import platform
+import statistics
+import subprocess
+import time
+
+
+def percentile(samples: list[float], q: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not samples:
+        return 0.0
+    return samples[min(len(samples) - 1, max(0, round(q / 100 * len(samples) + 0.5) - 1))]
+
+
+def latency_stats(samples: list[float], prefix: str = "") -> dict:
+    """mean/p50/p99/max in milliseconds; ``samples`` are seconds and get sorted in place."""
+    samples.sort()
+    ms = lambda s: round(s * 1000, 3)
+    return {
+        f"{prefix}mean_ms": ms(statistics.fmean(samples)) if samples else 0.0,
+        f"{prefix}p50_ms": ms(percentile(samples, 50)),
+        f"{prefix}p99_ms": ms(percentile(samples, 99)),
+        f"{prefix}max_ms": ms(samples[-1]) if samples else 0.0,
+    }
+
+
+def _git_rev() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_meta(args) -> dict:
+    return {
+        "git_rev": _git_rev(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "started_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "args": {k: v for k, v in vars(args).items() if k != "out"},
+    }
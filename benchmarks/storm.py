@@ -0,0 +1,206 @@
+"""Interaction storm: many users clicking panel buttons / running commands at once.
+
+    python -m benchmarks.storm --clicks 2000 --concurrency 200 --db sqlite+aiosqlite:////tmp/storm.db
+
+Drives the real panel select, per-server button and ``CS2Cog`` callbacks with
+fake interactions against in-process fake game servers and the given database,
+and reports per-scenario handler latency, time to the initial response,
+3-second ack deadline misses and event-loop lag as JSON.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+
+from benchmarks.fakes import (FakeA2SServer, FakeDiscordAPI, FakeInteraction, FakeMember, FakeRconServer,
+                              FakeTextChannel)
+from benchmarks.stats import latency_stats, run_meta
+
+DEFAULT_MIX = "info=35,porta_info=20,cs2info=15,select=5,password=10,ticket=5,map_request=5,restart=5"
+
+
+def _scenarios(ctx: dict) -> dict:
+    from services.cs2_cog import ChangeMapModal, ServerAction
+
+    def map_request(i, key):
+        modal = ChangeMapModal(key)
+        modal.map_name._refresh_state(i, {"value": "de_mirage"})  # what discord.py does on submit
+        return modal.on_submit(i)
+
+    def select(i, key):
+        ctx["panel"].select._refresh_state(i, {"values": [key]})
+        return ctx["panel"].select.callback(i)
+
+    def button(panel, action):
+        # built from the custom_id on every click, as discord.py does for dynamic items
+        return lambda i, key: ServerAction(panel, action, key).callback(i)
+
+    # the panel view is shared by every click, as in the bot's view store
+    return {
+        "info": button("cs2", "info"),
+        "porta_info": button("porta", "info"),
+        "cs2info": lambda i, key: ctx["cog"].cs2info.callback(ctx["cog"], i, key),
+        "select": select,
+        "password": button("cs2", "password"),
+        "ticket": button("cs2", "ticket"),
+        "map_request": map_request,
+        "restart": button("porta", "restart"),
+    }
+
+
+async def _lag_monitor(samples: list[float], stop: asyncio.Event, interval: float = 0.01):
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(interval)
+        samples.append(max(0.0, time.perf_counter() - started - interval))
+
+
+async def main(args) -> dict:
+    # imported late so --db reaches utils.config before the engine is built
+    from models import Base
+    from services.cs2_cog import CS2Cog
+    import services.portal_cog  # noqa: F401  (registers the porta server actions)
+    from services.server_registry import ServerConfig, registry
+    from services.status_snapshot import snapshots
+    from services.write_behind import write_behind
+    from utils.db import engine
+    from utils.rcon_cs2 import close_pools
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    write_behind.start()
+
+    latency = args.latency_ms / 1000
+    a2s = [await FakeA2SServer(players=args.players, latency=latency, loss=args.loss).start()
+           for _ in range(args.servers)]
+    rcon = [await FakeRconServer(latency=latency, loss=args.loss).start() for _ in range(args.servers)]
+    registry._index([
+        ServerConfig(key=f"bench{i:03d}", host="127.0.0.1", port=q.port, rcon_host="127.0.0.1", rcon_port=r.port,
+                     rcon_pass=r.password)
+        for i, (q, r) in enumerate(zip(a2s, rcon))
+    ])
+    snapshots.ttl = args.ttl
+    snapshots.timeout = args.timeout
+    if not args.cold:
+        await snapshots.sweep()
+
+    api = FakeDiscordAPI(latency=args.discord_latency_ms / 1000)
+    channel = FakeTextChannel(api)
+    cog = CS2Cog(bot=None)
+    ctx = {"panel": cog.view, "cog": cog}
+    scenarios = _scenarios(ctx)
+    mix = {name: float(w) for name, w in (part.split("=") for part in args.mix.split(","))}
+    unknown = mix.keys() - scenarios.keys()
+    if unknown:
+        raise SystemExit(f"unknown scenarios: {', '.join(sorted(unknown))} (have {', '.join(scenarios)})")
+    names, weights = list(mix), list(mix.values())
+
+    stats = {n: {"clicks": 0, "errors": {}, "unacked": 0, "deadline_misses": 0, "latency": [], "ack": []}
+             for n in names}
+    remaining = args.clicks
+
+    async def user(uid: int):
+        nonlocal remaining
+        while remaining > 0:
+            remaining -= 1
+            name = random.choices(names, weights)[0]
+            key = random.choice(registry.keys)
+            i = FakeInteraction(api, channel, FakeMember(uid))
+            s = stats[name]
+            s["clicks"] += 1
+            try:
+                await scenarios[name](i, key)
+            except Exception as e:
+                s["errors"][type(e).__name__] = s["errors"].get(type(e).__name__, 0) + 1
+            s["latency"].append(time.perf_counter() - i.created_at)
+            if i.ack_delay is None:
+                s["unacked"] += 1
+                s["deadline_misses"] += 1
+            else:
+                s["ack"].append(i.ack_delay)
+                s["deadline_misses"] += i.ack_delay > args.deadline
+
+    lag: list[float] = []
+    stop = asyncio.Event()
+    monitor = asyncio.create_task(_lag_monitor(lag, stop))
+    started = time.perf_counter()
+    try:
+        await asyncio.gather(*(user(10**6 + n) for n in range(args.concurrency)))
+    finally:
+        wall = time.perf_counter() - started
+        stop.set()
+        await monitor
+        close_pools()
+        for srv in a2s + rcon:
+            srv.close()
+        await write_behind.stop()
+        await engine.dispose()
+
+    results = []
+    for name, s in stats.items():
+        results.append({
+            "scenario": name,
+            "clicks": s["clicks"],
+            "errors": sum(s["errors"].values()),
+            "error_types": s["errors"],
+            "unacked": s["unacked"],
+            "deadline_misses": s["deadline_misses"],
+            **latency_stats(s["latency"]),
+            **latency_stats(s["ack"], prefix="ack_"),
+        })
+    clicks = sum(s["clicks"] for s in stats.values())
+    return {
+        "meta": run_meta(args),
+        "totals": {
+            "clicks": clicks,
+            "wall_s": round(wall, 3),
+            "throughput_per_s": round(clicks / wall, 1) if wall else 0.0,
+            "deadline_misses": sum(s["deadline_misses"] for s in stats.values()),
+            "discord_calls": api.calls,
+            "db_writes_dropped": write_behind.dropped,
+        },
+        "loop_lag": latency_stats(lag),
+        "results": results,
+    }
+
+
+def parse_args(argv=None):
+    p = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    p.add_argument("--clicks", type=int, default=1000, help="total interactions (default 1000)")
+    p.add_argument("--concurrency", type=int, default=100, help="interactions in flight (default 100)")
+    p.add_argument("--mix", default=DEFAULT_MIX, help=f"scenario=weight,... (default {DEFAULT_MIX})")
+    p.add_argument("--servers", type=int, default=2, help="fake game servers (default 2)")
+    p.add_argument("--players", type=int, default=10, help="players reported by every fake server")
+    p.add_argument("--latency-ms", type=float, default=5.0, help="fake A2S/RCON reply latency")
+    p.add_argument("--loss", type=float, default=0.0, help="fraction of A2S/RCON requests the fakes drop")
+    p.add_argument("--discord-latency-ms", type=float, default=80.0, help="duration of one fake Discord REST call")
+    p.add_argument("--ttl", type=float, default=10.0, help="status snapshot TTL in seconds")
+    p.add_argument("--timeout", type=float, default=2.5, help="A2S/RCON timeout in seconds")
+    p.add_argument("--cold", action="store_true", help="start with an empty snapshot cache")
+    p.add_argument("--deadline", type=float, default=3.0, help="ack deadline in seconds (Discord: 3)")
+    p.add_argument("--db", help="SQLAlchemy async URL (default: DATABASE_URL / DB_* settings)")
+    p.add_argument("--out", help="write JSON here instead of stdout")
+    return p.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    if args.db:
+        os.environ["DATABASE_URL"] = args.db
+    report = asyncio.run(main(args))
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(text + "\n")
+        for r in report["results"]:
+            print(f"{r['scenario']:<12} n={r['clicks']:<5} p50={r['p50_ms']:>9.1f}ms p99={r['p99_ms']:>9.1f}ms "
+                  f"ack_p99={r['ack_p99_ms']:>8.1f}ms misses={r['deadline_misses']} errors={r['errors']}",
+                  file=sys.stderr)
+        t = report["totals"]
+        print(f"total {t['clicks']} clicks in {t['wall_s']}s, {t['deadline_misses']} deadline misses, "
+              f"loop lag p99={report['loop_lag']['p99_ms']}ms", file=sys.stderr)
+    else:
+        print(text)
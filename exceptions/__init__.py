@@ -6,3 +6,9 @@ class PermissionDenied(BotError):
 
 class RconError(BotError):
     """Raised when RCON fails."""
+
+class QueryError(BotError):
+    """Raised when an A2S query fails."""
+
+class RconTimeout(RconError, TimeoutError):
+    """Raised when an RCON connect or command times out."""
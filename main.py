@@ -1,54 +1,79 @@
+import time
+_boot = time.perf_counter()
+
 import asyncio
+import contextlib
+import datetime as dt
+import hashlib
+import json
 import logging
+import os
+import signal
 
 import discord
 from discord.ext import commands
-from fastapi import FastAPI
-from pydantic import BaseModel
-
+from fastapi import FastAPI, Response
+from redis.asyncio import Redis
+from sqlalchemy import select
+
+from api.game_router import router as game_router
+from api.history_router import router as history_router
+from api.leaderboard_router import router as leaderboard_router
+from api.rcon_router import router as rcon_router
+from api.status_router import router as status_router
 from utils.config import settings
-from utils.db import engine, Base
+from utils import metrics
+from utils.rcon_cs2 import close_pools
+from utils.db import SessionLocal, migrate
+from utils.logging import CorrelationMiddleware, configure_logging, dropped as log_dropped
+from models import BotState
+from services.alerts import alerts
 from services.cs2_cog import CS2Cog
+from services.leader import LeaderElection
+from services.leaderboards import leaderboards
+from services.panel_registry import panels
+from services.player_sessions import sessions
 from services.portal_cog import PortaCog
 from services.presence_task import PresenceTasks
-from utils.source_query import get_info, get_players
+from services.server_registry import registry
+from services.status_hub import hub
+from services.status_recorder import recorder
+from services.status_relay import StatusMirror, StatusPublisher
+from services.status_snapshot import snapshots
+from services.write_behind import write_behind
 
 # ----- logging
-logging.basicConfig(level=getattr(logging, settings.LOG_LEVEL.upper(), logging.INFO))
+configure_logging(settings.LOG_LEVEL, settings.LOG_FORMAT, settings.LOG_SAMPLE, settings.LOG_QUEUE_SIZE)
 log = logging.getLogger("main")
 
+# ----- startup phases: (name, seconds), logged once the gateway is ready
+_phases: list[tuple[str, float]] = [("imports", time.perf_counter() - _boot)]
+
+@contextlib.contextmanager
+def phase(name: str):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        _phases.append((name, time.perf_counter() - started))
+
 # ----- FastAPI
 app = FastAPI(title="CS2 Bot API")
-
-class StatusOut(BaseModel):
-    server: str
-    address: str
-    map: str | None
-    players: int
-    max_players: int
-    names: list[str]
+app.add_middleware(CorrelationMiddleware)
+app.include_router(rcon_router)
+app.include_router(history_router)
+app.include_router(status_router)
+app.include_router(game_router)
+app.include_router(leaderboard_router)
 
 @app.get("/health")
 async def health():
     return {"ok": True}
 
-@app.get("/status/{server}", response_model=StatusOut)
-async def status(server: str):
-    server = server.lower()
-    if server not in ("surf", "bhop"):
-        return {"server": server, "address": "", "map": None, "players": 0, "max_players": 0, "names": []}
-    s = settings.CS2[server]
-    info = await get_info(s["host"], s["port"])
-    players = await get_players(s["host"], s["port"])
-    names = sorted([p.name for p in players])
-    return {
-        "server": server,
-        "address": f"{s['host']}:{s['port']}",
-        "map": getattr(info, "map_name", None),
-        "players": getattr(info, "player_count", 0),
-        "max_players": getattr(info, "max_players", 0),
-        "names": names
-    }
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    body, content_type = metrics.render()
+    return Response(content=body, media_type=content_type)
 
 # ----- Discord bot
 class CS2Bot(commands.Bot):
@@ -60,39 +85,90 @@ class CS2Bot(commands.Bot):
         self.presence_tasks: PresenceTasks | None = None
 
     async def setup_hook(self) -> None:
-        await self.add_cog(CS2Cog(self))
-        await self.add_cog(PortaCog(self))
+        with phase("cog setup"):
+            await self.add_cog(CS2Cog(self))
+            await self.add_cog(PortaCog(self))
+        with phase("command sync"):
+            await self.sync_commands()
+        self.presence_tasks = PresenceTasks(self)
 
+    async def on_ready(self):
+        global _phases
+        if _phases:  # on_ready fires again after every reconnect
+            log.info("Ready %.2fs after start (%s)", time.perf_counter() - _boot,
+                     ", ".join(f"{name} {secs:.2f}s" for name, secs in _phases))
+            _phases = []
+
+    async def sync_commands(self):
         # sync commands to guild if provided (faster than global)
-        if settings.DISCORD_GUILD_ID:
-            guild = discord.Object(id=settings.DISCORD_GUILD_ID)
-            await self.tree.sync(guild=guild)
-            log.info("Slash commands synced to guild %s", settings.DISCORD_GUILD_ID)
-        else:
-            await self.tree.sync()
-            log.info("Slash commands synced globally")
+        guild = discord.Object(id=settings.DISCORD_GUILD_ID) if settings.DISCORD_GUILD_ID else None
+        where = f"guild {guild.id}" if guild else "globally"
 
-        self.presence_tasks = PresenceTasks(self)
+        # syncing is rate limited and slow; skip it when the tree is the same as last time
+        payload = [cmd.to_dict(self.tree) for cmd in self.tree.get_commands(guild=guild)]
+        digest = hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+        key = f"command_tree:{self.application_id}:{guild.id if guild else 'global'}"
+        try:
+            async with SessionLocal() as ses:
+                synced = await ses.scalar(select(BotState.value).where(BotState.key == key))
+        except Exception as e:
+            log.warning("Reading the command tree hash failed, syncing: %s", e)
+            synced = None
+        if synced == digest and not settings.FORCE_COMMAND_SYNC:
+            log.info("Slash commands unchanged, not syncing %s", where)
+            return
 
-bot = CS2Bot()
+        await self.tree.sync(guild=guild)
+        write_behind.upsert(BotState, ("key",), key=key, value=digest, updated_at=dt.datetime.now(dt.timezone.utc))
+        log.info("Slash commands synced %s", where)
 
-# ----- lifecycle
-@app.on_event("startup")
-async def on_startup():
-    log.info("Starting up…")
-    # DB: create tables if not exist
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
+bot = CS2Bot()
 
-    # Discord
-    token = settings.DISCORD_BOT_TOKEN
-    if not token:
-        log.error("DISCORD_BOT_TOKEN missing")
-        raise SystemExit(1)
+# scrape-time gauges for queues and buffers
+metrics.gauge("cs2_stream_subscribers", "Connected /status/stream clients", lambda: len(hub))
+metrics.gauge("cs2_stream_evicted", "Stream clients evicted as slow consumers", lambda: hub.evicted)
+metrics.gauge("cs2_status_buffered_samples", "Status samples waiting to be flushed", lambda: recorder.buffered)
+metrics.gauge("cs2_status_dropped_samples", "Status samples dropped during DB outages", lambda: recorder.dropped)
+metrics.gauge("cs2_db_writes_pending", "Queued write-behind DB writes", lambda: len(write_behind))
+metrics.gauge("cs2_db_writes_dropped", "Write-behind DB writes dropped", lambda: write_behind.dropped)
+metrics.gauge("cs2_player_sessions_active", "Players currently on a server", lambda: len(sessions))
+metrics.gauge("cs2_alerts_pending", "Game alerts waiting to be posted", alerts.pending)
+metrics.gauge("cs2_alerts_merged", "Game alerts merged into a pending or recent one", lambda: alerts.stats["merged"])
+metrics.gauge("cs2_alerts_dropped", "Game alerts dropped on a full backlog", lambda: alerts.stats["dropped"])
+metrics.gauge("cs2_log_dropped", "Log records dropped on a full log queue", log_dropped)
+metrics.gauge("cs2_status_circuits_open", "Servers treated as offline without querying", snapshots.open_circuits)
+metrics.gauge("cs2_panel_edits_pending", "Queued panel edits",
+              lambda: cog.editor.pending() if (cog := bot.get_cog("PortaCog")) else 0)
+
+# ----- multi-worker mode (REDIS_URL): only the elected leader runs the bot and pollers
+redis: Redis | None = Redis.from_url(settings.REDIS_URL) if settings.REDIS_URL else None
+election: LeaderElection | None = None
+alerts.redis = redis
+mirror: StatusMirror | None = None
+
+async def start_leader():
+    if mirror is not None:
+        mirror.stop()
+    # DB schema is managed by alembic (see README); opt in to upgrading here
+    if settings.DB_AUTO_MIGRATE:
+        with phase("migrate"):
+            await migrate()
+
+    # status poller + time-series recorder
+    snapshots.add_listener(recorder.record)
+    sessions.persist = True
+    if redis is not None:
+        snapshots.add_listener(StatusPublisher(redis).publish)
+    snapshots.poll_task.start()
+    recorder.start()
+    write_behind.start()
+    alerts.start(bot)
+    with phase("panels load"):
+        await panels.start()
 
     async def runner():
         try:
-            await bot.start(token)
+            await bot.start(settings.DISCORD_BOT_TOKEN)
         except Exception as e:
             log.exception("Discord failed: %s", e)
             raise
@@ -101,7 +177,56 @@ async def on_startup():
     loop = asyncio.get_running_loop()
     loop.create_task(runner())
 
+async def stop_leader():
+    snapshots.poll_task.cancel()
+    panels.stop()
+    await recorder.stop()
+    await alerts.stop()  # before the bot, so the last window is still posted
+    await bot.close()
+    await write_behind.stop()  # after the bot, so writes from the last interactions are included
+
+async def step_down():
+    # a closed bot can't log in again; restart the worker so it comes back as a follower
+    await stop_leader()
+    os.kill(os.getpid(), signal.SIGTERM)
+
+# ----- lifecycle
+@app.on_event("startup")
+async def on_startup():
+    global election, mirror
+    log.info("Starting up…")
+    if not settings.DISCORD_BOT_TOKEN:
+        log.error("DISCORD_BOT_TOKEN missing")
+        raise SystemExit(1)
+    with phase("registry reload"):
+        await registry.reload()
+    registry.reload_task.start()
+    with phase("leaderboards load"):
+        await leaderboards.load()
+    leaderboards.refresh_task.start()
+    sessions.add_listener(hub.on_session)
+    snapshots.add_listener(sessions.observe)  # before the hub, which sends the joins/leaves it finds
+    snapshots.add_listener(hub.publish)
+
+    if redis is None:
+        await start_leader()
+        return
+    mirror = StatusMirror(redis, snapshots)
+    mirror.start()
+    election = LeaderElection(redis, "cs2:leader", settings.LEADER_TTL, on_elected=start_leader, on_lost=step_down)
+    election.start()
+
 @app.on_event("shutdown")
 async def on_shutdown():
     log.info("Shutting down…")
-    await bot.close()
+    registry.reload_task.cancel()
+    leaderboards.refresh_task.cancel()
+    if election is None or election.is_leader:
+        await stop_leader()
+    if election is not None:
+        await election.stop()  # after the bot is closed, so two gateways never overlap
+    if mirror is not None:
+        mirror.stop()
+    if redis is not None:
+        await redis.close()
+    close_pools()
@@ -1,6 +1,6 @@
 import datetime as dt
 from typing import Optional
-from sqlalchemy import String, Integer, BigInteger, DateTime, ForeignKey, UniqueConstraint, text
+from sqlalchemy import String, Integer, BigInteger, DateTime, Float, ForeignKey, Index, UniqueConstraint, func
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from utils.db import Base
 
@@ -21,13 +21,35 @@ class CS2Status(Base):
     __tablename__ = "cs2_status"
     id: Mapped[int] = mapped_column(primary_key=True)
     server_id: Mapped[int] = mapped_column(ForeignKey("cs2_servers.id", ondelete="CASCADE"))
-    ts: Mapped[dt.datetime] = mapped_column(DateTime(timezone=True), server_default=text("now()"))
+    ts: Mapped[dt.datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
     map_name: Mapped[Optional[str]] = mapped_column(String(64), nullable=True)
     players: Mapped[int] = mapped_column(Integer, default=0)
     max_players: Mapped[int] = mapped_column(Integer, default=0)
 
     server: Mapped[CS2Server] = relationship(back_populates="status")
 
+    __table_args__ = (
+        Index("ix_cs2_status_server_ts", "server_id", "ts"),  # history range scans
+    )
+
+class CS2StatusRollup(Base):
+    """Aggregated CS2Status samples per server and time bucket ('1m' or '1h')."""
+    __tablename__ = "cs2_status_rollup"
+    id: Mapped[int] = mapped_column(primary_key=True)
+    server_id: Mapped[int] = mapped_column(ForeignKey("cs2_servers.id", ondelete="CASCADE"))
+    resolution: Mapped[str] = mapped_column(String(4))  # '1m' | '1h'
+    bucket: Mapped[dt.datetime] = mapped_column(DateTime(timezone=True))
+    samples: Mapped[int] = mapped_column(Integer, default=0)
+    players_avg: Mapped[float] = mapped_column(Float, default=0.0)
+    players_min: Mapped[int] = mapped_column(Integer, default=0)
+    players_max: Mapped[int] = mapped_column(Integer, default=0)
+    max_players: Mapped[int] = mapped_column(Integer, default=0)
+    map_name: Mapped[Optional[str]] = mapped_column(String(64), nullable=True)  # last map seen in the bucket
+
+    __table_args__ = (
+        UniqueConstraint("server_id", "resolution", "bucket", name="uq_status_rollup_bucket"),
+    )
+
 class MapRequest(Base):
     __tablename__ = "cs2_map_requests"
     id: Mapped[int] = mapped_column(primary_key=True)
@@ -36,7 +58,7 @@ class MapRequest(Base):
     requester_discord_id: Mapped[int] = mapped_column(BigInteger, index=True)
     thread_id: Mapped[Optional[int]] = mapped_column(BigInteger, nullable=True)
     state: Mapped[str] = mapped_column(String(16), default="open")  # open/handled/rejected
-    created_at: Mapped[dt.datetime] = mapped_column(DateTime(timezone=True), server_default=text("now()"))
+    created_at: Mapped[dt.datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
 
 class HelpTicket(Base):
     __tablename__ = "cs2_help_tickets"
@@ -45,7 +67,7 @@ class HelpTicket(Base):
     opener_discord_id: Mapped[int] = mapped_column(BigInteger, index=True)
     thread_id: Mapped[int] = mapped_column(BigInteger, unique=True)
     state: Mapped[str] = mapped_column(String(16), default="open")
-    created_at: Mapped[dt.datetime] = mapped_column(DateTime(timezone=True), server_default=text("now()"))
+    created_at: Mapped[dt.datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
 
     __table_args__ = (
         UniqueConstraint("server_key", "opener_discord_id", "state", name="uq_open_ticket_per_user", sqlite_on_conflict="IGNORE"),
@@ -59,3 +81,42 @@ class CS2PanelMessage(Base):
     __table_args__ = (
         UniqueConstraint("channel_id", name="uq_panel_per_channel"),
     )
+
+class BotState(Base):
+    """Small key/value store for bot bookkeeping, e.g. the hash of the last synced command tree."""
+    __tablename__ = "cs2_bot_state"
+    key: Mapped[str] = mapped_column(String(64), primary_key=True)
+    value: Mapped[str] = mapped_column(String(255))
+    updated_at: Mapped[dt.datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
+
+class PlayerSession(Base):
+    """One finished stay of a player (by A2S name) on a server, from the roster diffs."""
+    __tablename__ = "cs2_player_sessions"
+    id: Mapped[int] = mapped_column(primary_key=True)
+    server_key: Mapped[str] = mapped_column(String(16))
+    name: Mapped[str] = mapped_column(String(64))
+    joined_at: Mapped[dt.datetime] = mapped_column(DateTime(timezone=True))
+    left_at: Mapped[dt.datetime] = mapped_column(DateTime(timezone=True))
+    seconds: Mapped[int] = mapped_column(Integer)
+    score: Mapped[int] = mapped_column(Integer, default=0)  # last score seen
+
+    __table_args__ = (
+        Index("ix_player_sessions_server_left", "server_key", "left_at"),
+        Index("ix_player_sessions_name_left", "name", "left_at"),  # per-player playtime
+    )
+
+class PlayerStats(Base):
+    """Running per-player totals per server, fed by the game plugin through /game/stats."""
+    __tablename__ = "cs2_player_stats"
+    id: Mapped[int] = mapped_column(primary_key=True)
+    server_key: Mapped[str] = mapped_column(String(16), server_default="")  # '' = sent without a server
+    player: Mapped[str] = mapped_column(String(64))  # SteamID64 or name, as the plugin sends it
+    kills: Mapped[int] = mapped_column(Integer, default=0)
+    deaths: Mapped[int] = mapped_column(Integer, default=0)
+    playtime_hours: Mapped[float] = mapped_column(Float, default=0.0)
+    updated_at: Mapped[dt.datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        UniqueConstraint("server_key", "player", name="uq_player_stats_server_player"),
+        Index("ix_player_stats_updated", "updated_at"),  # incremental leaderboard refresh
+    )
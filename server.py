@@ -2,11 +2,15 @@ import uvicorn
 from utils.config import settings
 
 if __name__ == "__main__":
+    if settings.HTTP_WORKERS > 1 and not settings.REDIS_URL:
+        raise SystemExit("HTTP_WORKERS > 1 needs REDIS_URL (otherwise every worker starts its own bot)")
     uvicorn.run(
         "main:app",
         host=settings.HTTP_HOST,
         port=settings.HTTP_PORT,
+        workers=settings.HTTP_WORKERS,
         reload=False,
         log_level=settings.LOG_LEVEL.lower(),
+        log_config=None,  # main.configure_logging() routes uvicorn's loggers through the log queue
         proxy_headers=True
     )
@@ -0,0 +1,186 @@
+"""Queue-backed dispatcher for game alerts (``POST /game/alert/{kind}``).
+
+The endpoint only enqueues. Every ALERT_WINDOW seconds the leader turns what
+arrived into at most one Discord message per kind: a single alert gets its own
+embed, a burst becomes one summary embed. An alert identical to one that is
+pending or was sent within ALERT_DEDUP_WINDOW seconds is merged into it (its
+count goes up) instead of being posted again. The backlog is bounded; alerts
+beyond ALERT_MAX_BACKLOG are dropped and counted.
+
+With Redis, any worker can take the request: alerts are pushed to the
+``cs2:alerts`` list and the leader drains it.
+"""
+import asyncio
+import json
+import logging
+import time
+from dataclasses import dataclass
+
+import discord
+from discord.ext import tasks
+from redis.asyncio import Redis
+
+from utils.config import settings
+from utils.metrics import observe_loop
+
+log = logging.getLogger("alerts")
+
+KEY = "cs2:alerts"
+
+_STYLE = {
+    "rare_loot": ("💎", discord.Color.gold()),
+    "boss": ("🐉", discord.Color.purple()),
+    "suspicious": ("🚨", discord.Color.red()),
+}
+
+
+@dataclass
+class _Alert:
+    kind: str
+    payload: dict
+    count: int = 1
+
+    def line(self) -> str:
+        text = ", ".join(f"{k}={v}" for k, v in self.payload.items()) or "—"
+        return f"`{text[:180]}`" + (f" ×{self.count}" if self.count > 1 else "")
+
+
+def _fingerprint(kind: str, payload: dict) -> str:
+    return kind + json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+
+
+def _embed(kind: str, alerts: list[_Alert], window: float) -> discord.Embed:
+    icon, color = _STYLE.get(kind, ("🔔", discord.Color.blurple()))
+    if len(alerts) == 1 and alerts[0].count == 1:
+        e = discord.Embed(title=f"{icon} {kind}", color=color)
+        for k, v in list(alerts[0].payload.items())[:25]:
+            e.add_field(name=str(k)[:256], value=str(v)[:1024] or "—", inline=True)
+        return e
+    total = sum(a.count for a in alerts)
+    lines, size = [], 0
+    for a in alerts:
+        line = a.line()
+        if size + len(line) > 3900:
+            lines.append(f"… and {len(alerts) - len(lines)} more")
+            break
+        lines.append(line)
+        size += len(line) + 1
+    return discord.Embed(title=f"{icon} {total} × {kind} in the last {window:g}s",
+                         description="\n".join(lines), color=color)
+
+
+class AlertDispatcher:
+    def __init__(self, window: float, dedup_window: float, max_backlog: int):
+        self.window = window
+        self.dedup_window = dedup_window
+        self.max_backlog = max_backlog
+        self.redis: Redis | None = None
+        self.stats = {"received": 0, "merged": 0, "dropped": 0, "sent": 0, "failed": 0}
+        self._bot: discord.Client | None = None
+        self._pending: dict[str, dict[str, _Alert]] = {}  # kind -> fingerprint -> alert
+        self._recent: dict[str, float] = {}  # fingerprint -> monotonic time it was last sent
+        self._pushes: set[asyncio.Task] = set()
+        self._drain: asyncio.Task | None = None
+
+    def pending(self) -> int:
+        return sum(len(p) for p in self._pending.values())
+
+    def submit(self, kind: str, payload: dict) -> bool:
+        """Queue an alert without waiting on Discord (or Redis). False if it was dropped."""
+        if self.redis is not None:
+            task = asyncio.create_task(self._push(kind, payload))
+            self._pushes.add(task)
+            task.add_done_callback(self._pushes.discard)
+            return True
+        return self._add(kind, payload)
+
+    def _add(self, kind: str, payload: dict) -> bool:
+        self.stats["received"] += 1
+        fp = _fingerprint(kind, payload)
+        queued = self._pending.setdefault(kind, {})
+        if fp in queued:
+            queued[fp].count += 1
+            self.stats["merged"] += 1
+            return True
+        if time.monotonic() - self._recent.get(fp, float("-inf")) < self.dedup_window:
+            self.stats["merged"] += 1  # just posted; don't post the same thing again
+            return True
+        if self.pending() >= self.max_backlog:
+            self.stats["dropped"] += 1
+            return False
+        queued[fp] = _Alert(kind, payload)
+        return True
+
+    async def _push(self, kind: str, payload: dict):
+        try:
+            pipe = self.redis.pipeline(transaction=False)
+            pipe.rpush(KEY, json.dumps({"kind": kind, "payload": payload}, default=str))
+            pipe.ltrim(KEY, -self.max_backlog, -1)
+            length, _ = await pipe.execute()
+            if length > self.max_backlog:
+                self.stats["dropped"] += 1  # the oldest queued alert was trimmed
+        except Exception as e:
+            self.stats["dropped"] += 1
+            log.warning("Queuing %s alert in Redis failed: %s", kind, e)
+
+    async def _drain_redis(self):
+        while True:
+            try:
+                item = await self.redis.blpop([KEY], timeout=5)
+                if item is not None:
+                    msg = json.loads(item[1])
+                    self._add(msg["kind"], msg["payload"])
+            except asyncio.CancelledError:
+                raise
+            except (ValueError, KeyError, TypeError) as e:
+                log.warning("Ignoring malformed queued alert: %s", e)
+            except Exception as e:
+                log.warning("Reading queued alerts from Redis failed, retrying: %s", e)
+                await asyncio.sleep(1)
+
+    async def flush(self):
+        if not self._pending:
+            return
+        batches, self._pending = self._pending, {}
+        now = time.monotonic()
+        self._recent = {fp: t for fp, t in self._recent.items() if now - t < self.dedup_window}
+        channel = self._bot and self._bot.get_channel(settings.ALERT_CHANNEL_ID)
+        for kind, queued in batches.items():
+            self._recent.update(dict.fromkeys(queued, now))
+            if channel is None:
+                self.stats["failed"] += len(queued)
+                log.warning("Alert channel %s not available, dropping %d %s alert(s)",
+                            settings.ALERT_CHANNEL_ID, len(queued), kind)
+                continue
+            try:
+                # one message per kind and window; discord.py waits out 429s before returning
+                await channel.send(embed=_embed(kind, list(queued.values()), self.window))
+                self.stats["sent"] += 1
+            except discord.HTTPException as e:
+                self.stats["failed"] += len(queued)
+                log.warning("Posting %d %s alert(s) failed: %s", len(queued), kind, e)
+
+    @tasks.loop(seconds=settings.ALERT_WINDOW)
+    @observe_loop("alerts")
+    async def flush_task(self):
+        await self.flush()
+
+    @flush_task.before_loop
+    async def before_flush(self):
+        await self._bot.wait_until_ready()
+
+    def start(self, bot: discord.Client):
+        self._bot = bot
+        self.flush_task.start()
+        if self.redis is not None:
+            self._drain = asyncio.create_task(self._drain_redis())
+
+    async def stop(self):
+        if self._drain is not None:
+            self._drain.cancel()
+        self.flush_task.cancel()
+        await self.flush()
+
+
+alerts = AlertDispatcher(window=settings.ALERT_WINDOW, dedup_window=settings.ALERT_DEDUP_WINDOW,
+                         max_backlog=settings.ALERT_MAX_BACKLOG)
@@ -1,16 +1,32 @@
+from typing import Awaitable, Callable, Literal
 import discord
 from discord.ext import commands
 from discord import app_commands
 from utils.config import settings
-from utils.source_query import get_info, get_players
+from services.leaderboards import leaderboards
+from services.rcon_broadcast import BroadcastResult, broadcast, resolve_targets
+from services.server_registry import ServerConfig, registry, server_autocomplete
+from services.status_snapshot import snapshot_for_interaction
 from utils.rcon_cs2 import rcon_exec
-from utils.db import SessionLocal
+from services.write_behind import write_behind
+from utils.metrics import observe_interaction, observe_loop
 from models import MapRequest, HelpTicket
 
-SERVER_KEYS = ("surf", "bhop")
+def _srv(key: str) -> ServerConfig:
+    return registry[key]
 
-def _srv(key: str) -> dict:
-    return settings.CS2[key]
+def _unknown_server() -> str:
+    return f"Unknown server. Use one of: {', '.join(registry.keys) or '—'}"
+
+def format_broadcast(result: BroadcastResult) -> str:
+    lines = []
+    for srv in result.servers:
+        for r in srv.results:
+            out = (r.output or "ok") if r.ok else f"FAILED: {r.error}"
+            lines.append(f"{'✅' if r.ok else '❌'} **{srv.server}** `{r.command}` → `{out[:150]}` ({r.elapsed_ms:.0f} ms)")
+    lines.append(f"Total: {result.elapsed_ms:.0f} ms across {len(result.servers)} server(s)")
+    msg = "\n".join(lines)
+    return msg if len(msg) <= 2000 else msg[:1990] + "\n…"
 
 def _is_mod(user: discord.abc.User) -> bool:
     role_ids = {r.id for r in getattr(user, "roles", [])}
@@ -20,70 +36,164 @@ def _is_mod(user: discord.abc.User) -> bool:
     )
     return bool(role_ids & allowed)
 
+# per-server buttons: (panel, action) -> (label, style, handler(interaction, server key))
+_ACTIONS: dict[tuple[str, str], tuple[str, discord.ButtonStyle, Callable[[discord.Interaction, str], Awaitable]]] = {}
+
+def server_action(panel: str, action: str, label: str, style: discord.ButtonStyle):
+    def deco(func):
+        _ACTIONS[panel, action] = (label, style, func)
+        return func
+    return deco
+
+class ServerAction(discord.ui.DynamicItem[discord.ui.Button], template=r"srv:(?P<panel>\w+):(?P<action>\w+):(?P<key>.+)"):
+    """Button for one action on one server. Both live in the custom_id, so the
+    button works from any message, for any user, and across restarts."""
+
+    def __init__(self, panel: str, action: str, key: str):
+        label, style, self.handler = _ACTIONS[panel, action]
+        super().__init__(discord.ui.Button(label=label, style=style, custom_id=f"srv:{panel}:{action}:{key}"))
+        self.key = key
+
+    @classmethod
+    async def from_custom_id(cls, interaction: discord.Interaction, item: discord.ui.Button, match):
+        return cls(match["panel"], match["action"], match["key"])
+
+    async def callback(self, interaction: discord.Interaction):
+        if self.key not in registry:
+            return await interaction.response.send_message(_unknown_server(), ephemeral=True)
+        await self.handler(interaction, self.key)
+
+def server_actions(panel: str, key: str) -> discord.ui.View:
+    view = discord.ui.View(timeout=600)  # clicks after the timeout are still handled via ServerAction
+    for p, action in _ACTIONS:
+        if p == panel:
+            view.add_item(ServerAction(panel, action, key))
+    return view
+
+class ServerSelect(discord.ui.Select):
+    """Server picker built from the registry (Discord allows 25 options).
+
+    Picking a server answers with that server's buttons, ephemeral, so nobody's
+    choice is stored on the shared view.
+    """
+
+    def __init__(self, panel: str, row: int = 0):
+        super().__init__(custom_id=f"{panel}_panel:server", placeholder="Select server", options=self._options(), row=row)
+        self.panel = panel
+
+    @staticmethod
+    def _options() -> list[discord.SelectOption]:
+        return [discord.SelectOption(label=k, value=k) for k in registry.keys[:25]] or [discord.SelectOption(label="—")]
+
+    def sync(self) -> bool:
+        """Pick up registry changes. Returns True if the options changed."""
+        options = self._options()
+        if [o.value for o in options] == [o.value for o in self.options]:
+            return False
+        self.options = options
+        return True
+
+    @observe_interaction("ServerSelect.callback")
+    async def callback(self, interaction: discord.Interaction):
+        key = self.values[0]
+        if key not in registry:
+            return await interaction.response.send_message(_unknown_server(), ephemeral=True)
+        await interaction.response.send_message(f"**{key.upper()}**", view=server_actions(self.panel, key), ephemeral=True)
+
 class CS2PanelView(discord.ui.View):
-    def __init__(self, default="surf", timeout=None):
-        super().__init__(timeout=timeout)
-        self.server_key = default
-
-    # server toggles
-    @discord.ui.button(label="Surf", style=discord.ButtonStyle.primary)
-    async def btn_surf(self, interaction: discord.Interaction, button: discord.ui.Button):
-        self.server_key = "surf"
-        await interaction.response.edit_message(view=self)
-
-    @discord.ui.button(label="Bhop", style=discord.ButtonStyle.primary)
-    async def btn_bhop(self, interaction: discord.Interaction, button: discord.ui.Button):
-        self.server_key = "bhop"
-        await interaction.response.edit_message(view=self)
-
-    # actions
-    @discord.ui.button(label="Server Info", style=discord.ButtonStyle.secondary)
-    async def btn_info(self, interaction: discord.Interaction, button: discord.ui.Button):
-        await interaction.response.defer(ephemeral=True, thinking=True)
-        s = _srv(self.server_key)
-        try:
-            info = await get_info(s["host"], s["port"])
-            players = await get_players(s["host"], s["port"])
-            names = ", ".join(sorted([p.name for p in players])) or "—"
-            emb = discord.Embed(title=f"CS2 • {self.server_key.upper()} status", color=discord.Color.green())
-            emb.add_field(name="Address", value=f"{s['host']}:{s['port']}", inline=True)
-            emb.add_field(name="Map", value=getattr(info, "map_name", "?"), inline=True)
-            emb.add_field(name="Players", value=f"{info.player_count}/{info.max_players}", inline=True)
-            emb.add_field(name="Player names", value=names[:1024], inline=False)
-            await interaction.followup.send(embed=emb, ephemeral=True)
-        except Exception as e:
-            await interaction.followup.send(f"Failed to query: `{e}`", ephemeral=True)
+    """The /cs2panel view. One instance serves every panel message and is registered with ``bot.add_view``."""
 
-    @discord.ui.button(label="Server Password", style=discord.ButtonStyle.secondary, row=1)
-    async def btn_password(self, interaction: discord.Interaction, button: discord.ui.Button):
-        s = _srv(self.server_key)
-        pw = s["server_pass"] or "— (no password)"
-        await interaction.response.send_message(f"**{self.server_key.upper()} password:** ||{pw}||", ephemeral=True)
+    def __init__(self):
+        super().__init__(timeout=None)
+        self.select = ServerSelect("cs2", row=0)
+        self.add_item(self.select)
 
-    @discord.ui.button(label="Change Map Request", style=discord.ButtonStyle.success, row=1)
-    async def btn_change_map(self, interaction: discord.Interaction, button: discord.ui.Button):
-        await interaction.response.send_modal(ChangeMapModal(self.server_key))
+# actions
+@server_action("cs2", "info", "Server Info", discord.ButtonStyle.secondary)
+@observe_interaction("CS2PanelView.btn_info")
+async def btn_info(interaction: discord.Interaction, key: str):
+    snap = await snapshot_for_interaction(interaction, key)
+    send = interaction.followup.send if interaction.response.is_done() else interaction.response.send_message
+    if not snap.online:
+        return await send(f"Failed to query: {snap.offline_reason()}", ephemeral=True)
+    info = snap.info
+    names = ", ".join(snap.names()) or "—"
+    emb = discord.Embed(title=f"CS2 • {key.upper()} status", color=discord.Color.green())
+    emb.add_field(name="Address", value=snap.address, inline=True)
+    emb.add_field(name="Map", value=info.map_name or "?", inline=True)
+    emb.add_field(name="Players", value=f"{info.player_count}/{info.max_players}", inline=True)
+    emb.add_field(name="Player names", value=names[:1024], inline=False)
+    await send(embed=emb, ephemeral=True)
 
-    @discord.ui.button(label="Admin Help / Ticket", style=discord.ButtonStyle.danger, row=1)
-    async def btn_admin(self, interaction: discord.Interaction, button: discord.ui.Button):
-        ch = interaction.channel
-        if not isinstance(ch, (discord.TextChannel, discord.Thread)):
-            return await interaction.response.send_message("Unsupported channel.", ephemeral=True)
+@server_action("cs2", "password", "Server Password", discord.ButtonStyle.secondary)
+@observe_interaction("CS2PanelView.btn_password")
+async def btn_password(interaction: discord.Interaction, key: str):
+    pw = _srv(key).server_pass or "— (no password)"
+    await interaction.response.send_message(f"**{key.upper()} password:** ||{pw}||", ephemeral=True)
 
-        roles = []
-        roles += [f"<@&{rid}>" for rid in settings.roles_from_csv(settings.DISCORD_ADMIN_ROLE_IDS)]
-        roles += [f"<@&{rid}>" for rid in settings.roles_from_csv(settings.DISCORD_MOD_ROLE_IDS)]
+@server_action("cs2", "change_map", "Change Map Request", discord.ButtonStyle.success)
+@observe_interaction("CS2PanelView.btn_change_map")
+async def btn_change_map(interaction: discord.Interaction, key: str):
+    await interaction.response.send_modal(ChangeMapModal(key))
 
-        thread = await ch.create_thread(
-            name=f"CS2 help • {self.server_key} • {interaction.user.display_name}",
-            type=discord.ChannelType.public_thread
-        )
-        await thread.send(f"{' '.join(roles)} — help requested by <@{interaction.user.id}> for **{self.server_key}**.")
-        # store in DB
-        async with SessionLocal() as ses:
-            ses.add(HelpTicket(server_key=self.server_key, opener_discord_id=interaction.user.id, thread_id=thread.id))
-            await ses.commit()
-        await interaction.response.send_message("Ticket created — check the new thread.", ephemeral=True)
+@server_action("cs2", "ticket", "Admin Help / Ticket", discord.ButtonStyle.danger)
+@observe_interaction("CS2PanelView.btn_admin")
+async def btn_admin(interaction: discord.Interaction, key: str):
+    ch = interaction.channel
+    if not isinstance(ch, (discord.TextChannel, discord.Thread)):
+        return await interaction.response.send_message("Unsupported channel.", ephemeral=True)
+
+    roles = []
+    roles += [f"<@&{rid}>" for rid in settings.roles_from_csv(settings.DISCORD_ADMIN_ROLE_IDS)]
+    roles += [f"<@&{rid}>" for rid in settings.roles_from_csv(settings.DISCORD_MOD_ROLE_IDS)]
+
+    thread = await ch.create_thread(
+        name=f"CS2 help • {key} • {interaction.user.display_name}",
+        type=discord.ChannelType.public_thread
+    )
+    await thread.send(f"{' '.join(roles)} — help requested by <@{interaction.user.id}> for **{key}**.")
+    # store in DB (queued; a second open ticket for the same user and server is ignored)
+    write_behind.insert(HelpTicket, ignore_conflicts=True,
+                        server_key=key, opener_discord_id=interaction.user.id, thread_id=thread.id)
+    await interaction.response.send_message("Ticket created — check the new thread.", ephemeral=True)
+
+# ---------- leaderboards
+
+LEADERBOARD_PAGE = 10
+_BOARD_TITLES = {"kills": "Kills", "kd": "K/D", "playtime": "Playtime (h)"}
+
+def leaderboard_page(board: str, server: str, page: int) -> tuple[discord.Embed, discord.ui.View]:
+    total, rows = leaderboards.top(board, server or None, page * LEADERBOARD_PAGE, LEADERBOARD_PAGE)
+    pages = max(1, -(-total // LEADERBOARD_PAGE))
+    lines = [f"`#{rank:>3}` **{discord.utils.escape_markdown(player)}** — {score:g}" for rank, player, score, _ in rows]
+    emb = discord.Embed(title=f"🏆 {_BOARD_TITLES[board]} • {server.upper() if server else 'all servers'}",
+                        description="\n".join(lines) or "No stats yet.", color=discord.Color.gold())
+    emb.set_footer(text=f"Page {page + 1}/{pages} • {total} players")
+    view = discord.ui.View(timeout=600)  # paging keeps working afterwards via LeaderboardPage
+    view.add_item(LeaderboardPage(board, server, max(page - 1, 0), "prev", disabled=page == 0))
+    view.add_item(LeaderboardPage(board, server, page + 1, "next", disabled=page + 1 >= pages))
+    return emb, view
+
+class LeaderboardPage(discord.ui.DynamicItem[discord.ui.Button],
+                      template=r"lb:(?P<board>\w+):(?P<server>[^:]*):(?P<page>\d+):(?P<dir>prev|next)"):
+    """Prev/next button; the page to show lives in the custom_id."""
+
+    def __init__(self, board: str, server: str, page: int, direction: str, disabled: bool = False):
+        super().__init__(discord.ui.Button(
+            label="◀" if direction == "prev" else "▶", style=discord.ButtonStyle.secondary, disabled=disabled,
+            custom_id=f"lb:{board}:{server}:{page}:{direction}"))
+        self.board, self.server, self.page = board, server, page
+
+    @classmethod
+    async def from_custom_id(cls, interaction: discord.Interaction, item: discord.ui.Button, match):
+        return cls(match["board"], match["server"], int(match["page"]), match["dir"])
+
+    @observe_interaction("LeaderboardPage.callback")
+    async def callback(self, interaction: discord.Interaction):
+        if self.board not in _BOARD_TITLES:
+            return await interaction.response.send_message("Unknown leaderboard.", ephemeral=True)
+        emb, view = leaderboard_page(self.board, self.server, self.page)
+        await interaction.response.edit_message(embed=emb, view=view)
 
 class ChangeMapModal(discord.ui.Modal, title="Request Map Change"):
     map_name = discord.ui.TextInput(label="Map (e.g., de_mirage)", required=True, max_length=64)
@@ -92,6 +202,7 @@ class ChangeMapModal(discord.ui.Modal, title="Request Map Change"):
         super().__init__()
         self.server_key = server_key
 
+    @observe_interaction("ChangeMapModal.on_submit")
     async def on_submit(self, interaction: discord.Interaction):
         ch = interaction.channel
         roles = []
@@ -106,76 +217,115 @@ class ChangeMapModal(discord.ui.Modal, title="Request Map Change"):
             f"{' '.join(roles)} — **Map change requested** by <@{interaction.user.id}> on **{self.server_key}** → `{self.map_name.value}`.\n"
             f"Moderators: use `/cs2 changemap server:{self.server_key} map:{self.map_name.value}` to apply."
         )
-        # store in DB
-        async with SessionLocal() as ses:
-            ses.add(MapRequest(server_key=self.server_key, map_name=self.map_name.value,
-                               requester_discord_id=interaction.user.id, thread_id=thread.id))
-            await ses.commit()
+        # store in DB (queued)
+        write_behind.insert(MapRequest, server_key=self.server_key, map_name=self.map_name.value,
+                            requester_discord_id=interaction.user.id, thread_id=thread.id)
         await interaction.response.send_message("Request posted — thanks!", ephemeral=True)
 
 class CS2Cog(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
+        self.view = CS2PanelView()
+
+    async def cog_load(self):
+        # registered once: panel buttons keep working after a restart without re-posting
+        self.bot.add_view(self.view)
+        self.bot.add_dynamic_items(ServerAction, LeaderboardPage)
+
+    def cog_unload(self):
+        self.view.stop()
 
     # Slash: post the panel (mods only)
     @app_commands.command(name="cs2panel", description="Post the CS2 control panel in this channel (mods only)")
+    @observe_interaction("CS2Cog.cs2panel")
     async def cs2panel(self, interaction: discord.Interaction):
         if not _is_mod(interaction.user):
             return await interaction.response.send_message("No permission.", ephemeral=True)
         emb = discord.Embed(
-            title="CS2 Servers • Surf & Bhop",
-            description="Use the buttons below to get info, password, open tickets, or request a map change.",
+            title="CS2 Servers",
+            description="Pick a server below to get info, password, open tickets, or request a map change.",
             color=discord.Color.blurple()
         )
-        view = CS2PanelView(default="surf")
-        await interaction.response.send_message(embed=emb, view=view)
+        self.view.select.sync()
+        await interaction.response.send_message(embed=emb, view=self.view)
 
     # Slash: info (ephemeral)
     @app_commands.command(name="cs2info", description="Get server info")
-    @app_commands.describe(server="surf or bhop")
+    @app_commands.describe(server="Server key, e.g. surf")
+    @app_commands.autocomplete(server=server_autocomplete)
+    @observe_interaction("CS2Cog.cs2info")
     async def cs2info(self, interaction: discord.Interaction, server: str):
         server = server.lower()
-        if server not in SERVER_KEYS:
-            return await interaction.response.send_message("Use 'surf' or 'bhop'.", ephemeral=True)
-        await interaction.response.defer(ephemeral=True, thinking=True)
-        s = _srv(server)
-        try:
-            info = await get_info(s["host"], s["port"])
-            players = await get_players(s["host"], s["port"])
-            emb = discord.Embed(title=f"CS2 • {server.upper()}", color=discord.Color.green())
-            emb.add_field(name="Address", value=f"{s['host']}:{s['port']}", inline=True)
-            emb.add_field(name="Map", value=getattr(info, "map_name", "?"), inline=True)
-            emb.add_field(name="Players", value=f"{info.player_count}/{info.max_players}", inline=True)
-            if players:
-                names = ", ".join(sorted([p.name for p in players]))[:1024]
-                emb.add_field(name="Player names", value=names, inline=False)
-            await interaction.followup.send(embed=emb, ephemeral=True)
-        except Exception as e:
-            await interaction.followup.send(f"Failed to query: `{e}`", ephemeral=True)
+        if server not in registry:
+            return await interaction.response.send_message(_unknown_server(), ephemeral=True)
+        snap = await snapshot_for_interaction(interaction, server)
+        send = interaction.followup.send if interaction.response.is_done() else interaction.response.send_message
+        if not snap.online:
+            return await send(f"Failed to query: {snap.offline_reason()}", ephemeral=True)
+        info = snap.info
+        emb = discord.Embed(title=f"CS2 • {server.upper()}", color=discord.Color.green())
+        emb.add_field(name="Address", value=snap.address, inline=True)
+        emb.add_field(name="Map", value=info.map_name or "?", inline=True)
+        emb.add_field(name="Players", value=f"{info.player_count}/{info.max_players}", inline=True)
+        if snap.players:
+            names = ", ".join(snap.names())[:1024]
+            emb.add_field(name="Player names", value=names, inline=False)
+        await send(embed=emb, ephemeral=True)
 
     # Slash: password (ephemeral)
     @app_commands.command(name="cs2password", description="Show server password (ephemeral)")
-    @app_commands.describe(server="surf or bhop")
+    @app_commands.describe(server="Server key, e.g. surf")
+    @app_commands.autocomplete(server=server_autocomplete)
+    @observe_interaction("CS2Cog.cs2password")
     async def cs2password(self, interaction: discord.Interaction, server: str):
         server = server.lower()
-        if server not in SERVER_KEYS:
-            return await interaction.response.send_message("Use 'surf' or 'bhop'.", ephemeral=True)
-        pw = _srv(server)["server_pass"] or "— (no password)"
+        if server not in registry:
+            return await interaction.response.send_message(_unknown_server(), ephemeral=True)
+        pw = _srv(server).server_pass or "— (no password)"
         await interaction.response.send_message(f"**{server.upper()} password:** ||{pw}||", ephemeral=True)
 
+    # Slash: leaderboards, from memory
+    @app_commands.command(name="leaderboard", description="Top players by kills, K/D or playtime")
+    @app_commands.describe(board="What to rank by", server="Server key; leave empty for all servers")
+    @app_commands.autocomplete(server=server_autocomplete)
+    @observe_interaction("CS2Cog.leaderboard")
+    async def leaderboard(self, interaction: discord.Interaction,
+                          board: Literal["kills", "kd", "playtime"] = "kills", server: str | None = None):
+        emb, view = leaderboard_page(board, (server or "").lower(), 0)
+        await interaction.response.send_message(embed=emb, view=view)
+
     # Slash (mods): admin action via RCON
     @app_commands.command(name="cs2", description="CS2 admin actions")
-    @app_commands.describe(action="changemap", server="surf/bhop", map="e.g. de_mirage")
+    @app_commands.describe(action="changemap", server="Server key, e.g. surf", map="e.g. de_mirage")
+    @app_commands.autocomplete(server=server_autocomplete)
+    @observe_interaction("CS2Cog.cs2")
     async def cs2(self, interaction: discord.Interaction, action: str, server: str, map: str):
         if not _is_mod(interaction.user):
             return await interaction.response.send_message("No permission.", ephemeral=True)
         action = action.lower(); server = server.lower()
-        if action != "changemap" or server not in SERVER_KEYS:
-            return await interaction.response.send_message("Usage: action=changemap server=surf|bhop map=<map>", ephemeral=True)
+        if action != "changemap" or server not in registry:
+            return await interaction.response.send_message(
+                f"Usage: action=changemap server={'|'.join(registry.keys)} map=<map>", ephemeral=True)
         s = _srv(server)
         try:
             await interaction.response.defer(ephemeral=True, thinking=True)
-            out = await rcon_exec(s["rcon_host"], s["rcon_port"], s["rcon_pass"], f"changelevel {map}")
+            out = await rcon_exec(s.rcon_host, s.rcon_port, s.rcon_pass, f"changelevel {map}")
             await interaction.followup.send(f"RCON: `{out.strip() or 'ok'}`", ephemeral=True)
         except Exception as e:
             await interaction.followup.send(f"RCON failed: `{e}`", ephemeral=True)
+
+    # Slash (mods): same command(s) on many servers at once
+    @app_commands.command(name="cs2broadcast", description="Run RCON command(s) on several servers at once (mods only)")
+    @app_commands.describe(commands="Command(s), separate several with ';'", servers="'all' or comma-separated keys, e.g. surf,bhop")
+    @observe_interaction("CS2Cog.cs2broadcast")
+    async def cs2broadcast(self, interaction: discord.Interaction, commands: str, servers: str = "all"):
+        if not _is_mod(interaction.user):
+            return await interaction.response.send_message("No permission.", ephemeral=True)
+        keys, unknown = resolve_targets(servers.lower())
+        cmds = [c.strip() for c in commands.split(";") if c.strip()]
+        if unknown or not keys or not cmds:
+            return await interaction.response.send_message(
+                f"Usage: commands=<cmd;cmd> servers=all|{','.join(registry.keys)}", ephemeral=True)
+        await interaction.response.defer(ephemeral=True, thinking=True)
+        result = await broadcast(keys, cmds)
+        await interaction.followup.send(format_broadcast(result), ephemeral=True)
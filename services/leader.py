@@ -0,0 +1,108 @@
+"""Redis leader lock: exactly one process runs the Discord gateway and pollers.
+
+Every worker campaigns for ``cs2:leader`` with ``SET NX PX``; the holder renews
+it every third of the TTL. If a leader dies the key expires and another
+worker takes over within ``LEADER_TTL`` seconds. A leader whose renewals fail
+steps down one renewal period before its lock expires, which leaves it that
+long to shut down before anybody else can be elected. ``on_elected`` runs in
+its own task: startup work (migrations, DB loads) can take longer than the
+TTL, and renewals must not wait for it.
+"""
+import asyncio
+import logging
+import os
+import socket
+import time
+import uuid
+from typing import Awaitable, Callable
+
+from redis.asyncio import Redis
+
+log = logging.getLogger("leader")
+
+# compare-and-act, so a process never extends or deletes somebody else's lock
+_RENEW = "if redis.call('get', KEYS[1]) == ARGV[1] then return redis.call('pexpire', KEYS[1], ARGV[2]) end return 0"
+_RELEASE = "if redis.call('get', KEYS[1]) == ARGV[1] then return redis.call('del', KEYS[1]) end return 0"
+
+
+class LeaderElection:
+    def __init__(self, redis: Redis, key: str, ttl: float,
+                 on_elected: Callable[[], Awaitable[None]], on_lost: Callable[[], Awaitable[None]]):
+        self.redis = redis
+        self.key = key
+        self.ttl_ms = int(ttl * 1000)
+        self.token = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.on_elected = on_elected
+        self.on_lost = on_lost
+        self.is_leader = False
+        self.stepped_down = False  # no campaigning after losing the lock; the worker restarts as a follower
+        self._valid_until = 0.0
+        self._task: asyncio.Task | None = None
+        self._elected: asyncio.Task | None = None
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        period = self.ttl_ms / 3000
+        while not self.stepped_down:
+            try:
+                sent = time.monotonic()  # the lock's TTL starts when Redis sees the command, not when we hear back
+                async with asyncio.timeout(period):
+                    if self.is_leader:
+                        renewed = await self.redis.eval(_RENEW, 1, self.key, self.token, self.ttl_ms)
+                    else:
+                        renewed = None
+                        elected = await self.redis.set(self.key, self.token, nx=True, px=self.ttl_ms)
+                if renewed is not None:
+                    if renewed:
+                        self._valid_until = sent + self.ttl_ms / 1000
+                    else:
+                        await self._lose("lock taken over")
+                elif elected:
+                    self.is_leader = True
+                    self._valid_until = sent + self.ttl_ms / 1000
+                    log.info("Elected leader (%s)", self.token)
+                    self._elected = asyncio.create_task(self._start_leading())
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                log.warning("Leader lock check failed: %s", e)
+                # step down while the lock is still ours: if the next attempt could land after expiry,
+                # another worker may be elected before we notice, and two gateways would overlap
+                if self.is_leader and time.monotonic() + period >= self._valid_until:
+                    await self._lose("could not renew before expiry")
+            await asyncio.sleep(period)
+
+    async def _start_leading(self):
+        try:
+            await self.on_elected()
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            log.exception("Leader startup failed")
+            await self._lose("startup failed")
+
+    def _cancel_startup(self):
+        if self._elected is not None and self._elected is not asyncio.current_task():
+            self._elected.cancel()
+
+    async def _lose(self, reason: str):
+        if not self.is_leader:
+            return
+        self.is_leader = False
+        self.stepped_down = True
+        self._cancel_startup()
+        log.error("Lost leadership: %s", reason)
+        await self.on_lost()
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+        self._cancel_startup()
+        if self.is_leader:
+            self.is_leader = False
+            try:
+                await self.redis.eval(_RELEASE, 1, self.key, self.token)  # hand over without waiting for the TTL
+            except Exception as e:
+                log.warning("Leader lock release failed: %s", e)
@@ -0,0 +1,138 @@
+"""In-memory leaderboards over ``cs2_player_stats``.
+
+Every board (kills, K/D, playtime) exists per server and globally, as a list
+kept sorted with ``bisect``: a stat update moves one entry, and a top-N page
+is a slice, so reads never touch the database. The boards are built from one
+read of the table at startup; after that, ``/game/stats`` applies the rows its
+upsert returns, and every worker picks up writes made elsewhere by reading
+only the rows whose ``updated_at`` moved (indexed).
+"""
+import datetime as dt
+import logging
+from bisect import bisect_left, insort
+from dataclasses import dataclass
+
+from discord.ext import tasks
+from sqlalchemy import select
+
+from models import PlayerStats
+from utils.config import settings
+from utils.db import SessionLocal
+from utils.metrics import observe_loop
+
+log = logging.getLogger("leaderboards")
+
+BOARDS = ("kills", "kd", "playtime")
+GLOBAL = "*"
+OVERLAP = dt.timedelta(seconds=30)  # re-read window for transactions that committed late; updates are idempotent
+
+
+@dataclass
+class Totals:
+    kills: int = 0
+    deaths: int = 0
+    playtime_hours: float = 0.0
+
+    def score(self, board: str) -> float:
+        if board == "kills":
+            return self.kills
+        if board == "kd":
+            return round(self.kills / max(self.deaths, 1), 2)
+        return round(self.playtime_hours, 2)
+
+
+class Board:
+    """Players ranked by one score, highest first."""
+
+    def __init__(self):
+        self._keys: list[tuple[float, str]] = []  # (-score, player), ascending
+        self._scores: dict[str, float] = {}
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def set(self, player: str, score: float):
+        old = self._scores.get(player)
+        if old == score:
+            return
+        if old is not None:
+            del self._keys[bisect_left(self._keys, (-old, player))]
+        insort(self._keys, (-score, player))
+        self._scores[player] = score
+
+    def page(self, offset: int, limit: int) -> list[tuple[str, float]]:
+        return [(player, -neg) for neg, player in self._keys[offset:offset + limit]]
+
+    def rank(self, player: str) -> int | None:
+        score = self._scores.get(player)
+        return None if score is None else bisect_left(self._keys, (-score, player)) + 1
+
+
+class Leaderboards:
+    def __init__(self):
+        self.loaded = False
+        self._totals: dict[str, dict[str, Totals]] = {}  # scope (server key or GLOBAL) -> player -> totals
+        self._boards: dict[tuple[str, str], Board] = {}  # (scope, board) -> ranking
+        self._since: dt.datetime | None = None  # newest updated_at applied
+
+    def update(self, server: str, player: str, kills: int, deaths: int, playtime_hours: float):
+        """Apply a player's current totals on one server (absolute values, so repeats are harmless)."""
+        per_server = self._totals.setdefault(server, {})
+        prev = per_server.get(player) or Totals()
+        new = Totals(kills, deaths, playtime_hours)
+        if new == prev:
+            return
+        per_server[player] = new
+        total = self._totals.setdefault(GLOBAL, {}).setdefault(player, Totals())
+        total.kills += new.kills - prev.kills
+        total.deaths += new.deaths - prev.deaths
+        total.playtime_hours += new.playtime_hours - prev.playtime_hours
+        for scope, t in ((server, new), (GLOBAL, total)):
+            for board in BOARDS:
+                self._boards.setdefault((scope, board), Board()).set(player, t.score(board))
+
+    def top(self, board: str, server: str | None = None, offset: int = 0, limit: int = 10):
+        """(players on the board, [(rank, player, score, totals)]) for one page."""
+        scope = server or GLOBAL
+        ranking = self._boards.get((scope, board))
+        if ranking is None:
+            return 0, []
+        totals = self._totals[scope]
+        return len(ranking), [(offset + i + 1, player, score, totals[player])
+                              for i, (player, score) in enumerate(ranking.page(offset, limit))]
+
+    def rank(self, board: str, player: str, server: str | None = None) -> int | None:
+        ranking = self._boards.get((server or GLOBAL, board))
+        return ranking.rank(player) if ranking else None
+
+    async def refresh(self) -> int:
+        """Apply rows changed since the last refresh (everything on the first call). Returns rows read."""
+        q = select(PlayerStats.server_key, PlayerStats.player, PlayerStats.kills, PlayerStats.deaths,
+                   PlayerStats.playtime_hours, PlayerStats.updated_at)
+        if self._since is not None:
+            q = q.where(PlayerStats.updated_at >= self._since - OVERLAP)
+        async with SessionLocal() as ses:
+            rows = (await ses.execute(q)).all()
+        for server, player, kills, deaths, hours, updated_at in rows:
+            self.update(server, player, kills, deaths, hours)
+            if self._since is None or updated_at > self._since:
+                self._since = updated_at
+        self.loaded = True
+        return len(rows)
+
+    async def load(self):
+        try:
+            log.info("Leaderboards loaded from %d row(s)", await self.refresh())
+        except Exception as e:
+            log.warning("Loading leaderboards failed, retrying in the background: %s", e)
+
+    @tasks.loop(seconds=settings.LEADERBOARD_REFRESH)
+    @observe_loop("leaderboards")
+    async def refresh_task(self):
+        try:
+            await self.refresh()
+        except Exception as e:
+            log.warning("Leaderboard refresh failed: %s", e)
+
+
+leaderboards = Leaderboards()
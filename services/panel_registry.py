@@ -0,0 +1,119 @@
+"""In-memory registry of posted panel messages (``cs2_panel_messages``).
+
+Loaded once, then changed in place: creating or dropping a panel updates the
+index immediately and queues the row write plus a ``NOTIFY cs2_panels`` in the
+same write-behind transaction. Every process LISTENs on that channel, so other
+replicas apply the same change without re-reading the table. The panel refresh
+loop therefore never touches the DB, and keeps running through DB outages.
+After a (re)connect of the listener the table is re-read once to catch up.
+"""
+import asyncio
+import json
+import logging
+
+import asyncpg
+from sqlalchemy import select
+
+from models import CS2PanelMessage
+from services.write_behind import write_behind
+from utils.db import SessionLocal, engine
+
+log = logging.getLogger("panel_registry")
+
+CHANNEL = "cs2_panels"
+
+
+class PanelRegistry:
+    def __init__(self):
+        self.loaded = False
+        self._by_channel: dict[int, int] = {}  # channel id -> message id
+        self._by_message: dict[int, int] = {}  # message id -> channel id
+        self._listener: asyncio.Task | None = None
+
+    def __len__(self) -> int:
+        return len(self._by_message)
+
+    def get(self, channel_id: int) -> int | None:
+        return self._by_channel.get(channel_id)
+
+    def all(self) -> list[tuple[int, int]]:
+        """(channel id, message id) of every panel."""
+        return list(self._by_channel.items())
+
+    async def load(self) -> bool:
+        try:
+            async with SessionLocal() as ses:
+                rows = (await ses.execute(select(CS2PanelMessage.channel_id, CS2PanelMessage.message_id))).all()
+        except Exception as e:
+            log.warning("Loading panels failed, keeping %d cached: %s", len(self), e)
+            return False
+        self._by_channel = {c: m for c, m in rows}
+        self._by_message = {m: c for c, m in rows}
+        self.loaded = True
+        return True
+
+    def _set(self, channel_id: int, message_id: int):
+        old = self._by_channel.get(channel_id)
+        if old is not None:
+            self._by_message.pop(old, None)
+        self._by_channel[channel_id] = message_id
+        self._by_message[message_id] = channel_id
+
+    def _remove(self, message_id: int):
+        channel_id = self._by_message.pop(message_id, None)
+        if channel_id is not None and self._by_channel.get(channel_id) == message_id:
+            del self._by_channel[channel_id]
+
+    def set(self, channel_id: int, message_id: int):
+        """Record the panel message of a channel (one per channel)."""
+        self._set(channel_id, message_id)
+        write_behind.upsert(CS2PanelMessage, ("channel_id",), channel_id=channel_id, message_id=message_id)
+        write_behind.notify(CHANNEL, json.dumps({"op": "set", "channel_id": channel_id, "message_id": message_id}))
+
+    def remove(self, message_id: int):
+        self._remove(message_id)
+        write_behind.delete(CS2PanelMessage, message_id=message_id)
+        write_behind.notify(CHANNEL, json.dumps({"op": "remove", "message_id": message_id}))
+
+    def _on_notify(self, conn, pid, channel, payload: str):
+        # our own notifications come back too; applying them again is a no-op
+        try:
+            msg = json.loads(payload)
+            if msg["op"] == "set":
+                self._set(msg["channel_id"], msg["message_id"])
+            elif msg["op"] == "remove":
+                self._remove(msg["message_id"])
+        except (ValueError, KeyError, TypeError) as e:
+            log.warning("Ignoring malformed panel notification %r: %s", payload, e)
+
+    async def _listen(self):
+        dsn = engine.url.set(drivername="postgresql").render_as_string(hide_password=False)
+        while True:
+            conn = None
+            try:
+                conn = await asyncpg.connect(dsn)
+                await conn.add_listener(CHANNEL, self._on_notify)
+                await self.load()  # changes made while we weren't listening
+                while not conn.is_closed():
+                    await asyncio.sleep(30)
+                    await conn.execute("SELECT 1")  # notice a dead connection even when nothing is notified
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                log.warning("Panel LISTEN connection lost, reconnecting: %s", e)
+            finally:
+                if conn is not None:
+                    conn.terminate()
+            await asyncio.sleep(5)
+
+    async def start(self):
+        await self.load()
+        if engine.dialect.name == "postgresql":
+            self._listener = asyncio.create_task(self._listen())
+
+    def stop(self):
+        if self._listener is not None:
+            self._listener.cancel()
+
+
+panels = PanelRegistry()
@@ -0,0 +1,124 @@
+"""Rate-limit-aware scheduler for panel message edits.
+
+Discord buckets message edits per channel, so every channel gets its own worker
+and different channels are edited concurrently (bounded by a global cap that
+stays well below the 50 req/s global limit). Pending edits to the same message
+are merged, latest wins. discord.py waits out 429s on the channel's bucket by
+itself; a 429 it gives up on, or a lost permission (which may come back), only
+holds that channel's edits back for a while. Only "message or channel gone"
+errors drop the panel.
+"""
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable
+
+import discord
+
+log = logging.getLogger("panel_scheduler")
+
+MAX_ATTEMPTS = 3
+FORBIDDEN_BACKOFF = 300.0  # seconds a channel we lost access to is left alone
+
+
+@dataclass
+class EditJob:
+    channel_id: int
+    message_id: int
+    kwargs: dict[str, Any]
+    on_success: Callable[[], None] | None = None
+    attempts: int = 0
+    not_before: float = field(default=0.0)
+
+
+class PanelEditScheduler:
+    def __init__(self, bot: discord.Client, on_gone: Callable[[int, int], Awaitable[None]], concurrency: int = 5):
+        self.bot = bot
+        self.on_gone = on_gone
+        self._sem = asyncio.Semaphore(concurrency)
+        self._pending: dict[int, dict[int, EditJob]] = {}  # channel id -> message id -> job
+        self._workers: dict[int, asyncio.Task] = {}
+        self._blocked_until: dict[int, float] = {}  # channel id -> monotonic time its bucket resets
+        self.stats = {"sent": 0, "merged": 0, "rate_limited": 0, "forbidden": 0, "gone": 0, "failed": 0}
+
+    def submit(self, channel_id: int, message_id: int, on_success: Callable[[], None] | None = None, **kwargs):
+        queue = self._pending.setdefault(channel_id, {})
+        if message_id in queue:
+            self.stats["merged"] += 1
+        queue[message_id] = EditJob(channel_id, message_id, kwargs, on_success)
+        worker = self._workers.get(channel_id)
+        if worker is None or worker.done():
+            self._workers[channel_id] = asyncio.create_task(self._worker(channel_id))
+
+    def pending(self) -> int:
+        return sum(len(q) for q in self._pending.values())
+
+    async def _worker(self, channel_id: int):
+        queue = self._pending[channel_id]
+        try:
+            while queue:
+                message_id, job = next(iter(queue.items()))
+                delay = max(self._blocked_until.get(channel_id, 0.0), job.not_before) - time.monotonic()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                    continue  # the job may have been replaced while we slept
+                del queue[message_id]
+                await self._run(job)
+        finally:
+            if not queue:
+                self._pending.pop(channel_id, None)
+            self._workers.pop(channel_id, None)
+
+    def _requeue(self, job: EditJob):
+        # a newer edit for the same message supersedes the failed one
+        self._pending.setdefault(job.channel_id, {}).setdefault(job.message_id, job)
+
+    async def _run(self, job: EditJob):
+        msg = self.bot.get_partial_messageable(job.channel_id).get_partial_message(job.message_id)
+        job.attempts += 1
+        try:
+            async with self._sem:
+                await msg.edit(**job.kwargs)
+        except discord.NotFound as e:
+            self.stats["gone"] += 1
+            log.info("Panel %s/%s gone (%s), dropping it", job.channel_id, job.message_id, e)
+            await self.on_gone(job.channel_id, job.message_id)
+        except discord.Forbidden as e:
+            # permissions can be given back; keep the panel, skip this edit and hold the channel back
+            self.stats["forbidden"] += 1
+            self._blocked_until[job.channel_id] = time.monotonic() + FORBIDDEN_BACKOFF
+            log.warning("No access to panel %s/%s (%s), retrying in %gs",
+                        job.channel_id, job.message_id, e, FORBIDDEN_BACKOFF)
+        except discord.HTTPException as e:
+            if e.status == 429:
+                self._rate_limited(job, float(e.response.headers.get("Retry-After", 5)))
+            else:
+                self._retry_later(job, e)
+        except (OSError, asyncio.TimeoutError) as e:
+            self._retry_later(job, e)
+        else:
+            self.stats["sent"] += 1
+            if job.on_success is not None:
+                job.on_success()
+
+    def _rate_limited(self, job: EditJob, retry_after: float):
+        self.stats["rate_limited"] += 1
+        self._blocked_until[job.channel_id] = time.monotonic() + retry_after
+        job.attempts -= 1  # rate limits are not failures
+        self._requeue(job)
+
+    def _retry_later(self, job: EditJob, exc: BaseException):
+        if job.attempts >= MAX_ATTEMPTS:
+            self.stats["failed"] += 1
+            log.warning("Panel %s/%s edit failed %d times, giving up this round: %s",
+                        job.channel_id, job.message_id, job.attempts, exc)
+            return
+        job.not_before = time.monotonic() + 2 ** job.attempts
+        self._requeue(job)
+
+    def close(self):
+        for worker in self._workers.values():
+            worker.cancel()
+        self._workers.clear()
+        self._pending.clear()
@@ -0,0 +1,109 @@
+"""Player sessions from successive A2S rosters.
+
+Each snapshot's roster is diffed against the previous one for that server:
+new names are joins, missing names are leaves. Active sessions stay in memory
+(name, join time, score); finished ones are queued as ``cs2_player_sessions``
+rows through the write-behind queue, so a round end that empties a server is
+one bulk insert. A2S has no player ids, so a player is their name per server,
+and a connected time that went backwards means the name left and rejoined.
+The join time comes from A2S' connected time, so a restart does not reset it.
+Offline polls, and polls whose player query failed, change nothing: the
+roster is unknown, not empty.
+"""
+import datetime as dt
+import logging
+from dataclasses import dataclass
+from typing import Callable
+
+from sqlalchemy import func, select
+
+from models import PlayerSession
+from services.status_snapshot import ServerSnapshot
+from services.write_behind import write_behind
+from utils.db import SessionLocal
+
+log = logging.getLogger("player_sessions")
+
+REJOIN_SLACK = 5.0  # seconds the A2S connected time may jitter backwards
+
+
+@dataclass
+class Session:
+    server: str
+    name: str
+    joined_at: dt.datetime
+    last_seen: dt.datetime
+    score: int = 0
+    duration: float = 0.0  # A2S connected time at last_seen
+
+    @property
+    def seconds(self) -> int:
+        return int((self.last_seen - self.joined_at).total_seconds())
+
+
+class PlayerSessions:
+    def __init__(self):
+        self.persist = False  # only the leader writes finished sessions
+        self._active: dict[str, dict[str, Session]] = {}  # server key -> name -> session
+        self._listeners: list[Callable[[str, Session], None]] = []
+
+    def __len__(self) -> int:
+        return sum(len(r) for r in self._active.values())
+
+    def add_listener(self, fn: Callable[[str, Session], None]):
+        """Call ``fn("join" | "leave", session)`` for every roster change."""
+        self._listeners.append(fn)
+
+    def active(self, key: str) -> list[Session]:
+        """Sessions on a server, longest first."""
+        return sorted(self._active.get(key, {}).values(), key=lambda s: s.joined_at)
+
+    def observe(self, snap: ServerSnapshot):
+        """Snapshot listener."""
+        if not snap.online or snap.players_error is not None:
+            return
+        seen = dt.datetime.now(dt.timezone.utc) - dt.timedelta(seconds=snap.age)
+        roster = self._active.setdefault(snap.key, {})
+        current = {}
+        for p in snap.players:
+            if p.name and p.name not in current:  # connecting players have no name yet
+                current[p.name] = p
+
+        for name in roster.keys() - current.keys():
+            self._leave(roster.pop(name))
+        for name, p in current.items():
+            sess = roster.get(name)
+            if sess is not None and p.duration + REJOIN_SLACK < sess.duration:
+                self._leave(roster.pop(name))
+                sess = None
+            if sess is None:
+                joined = seen - dt.timedelta(seconds=p.duration)
+                sess = roster[name] = Session(snap.key, name, joined, seen, p.score, p.duration)
+                self._emit("join", sess)
+            else:
+                sess.last_seen, sess.score, sess.duration = seen, p.score, p.duration
+
+    def _leave(self, sess: Session):
+        if self.persist:
+            write_behind.insert(PlayerSession, server_key=sess.server, name=sess.name[:64], joined_at=sess.joined_at,
+                                left_at=sess.last_seen, seconds=sess.seconds, score=sess.score)
+        self._emit("leave", sess)
+
+    def _emit(self, kind: str, sess: Session):
+        for fn in self._listeners:
+            try:
+                fn(kind, sess)
+            except Exception:
+                log.exception("Session listener failed")
+
+    async def playtime(self, name: str, since: dt.datetime | None = None) -> int:
+        """Seconds played by ``name`` on all servers: finished sessions plus the ones in progress."""
+        q = select(func.coalesce(func.sum(PlayerSession.seconds), 0)).where(PlayerSession.name == name[:64])
+        if since is not None:
+            q = q.where(PlayerSession.left_at >= since)
+        async with SessionLocal() as ses:
+            total = await ses.scalar(q)
+        return int(total) + sum(r[name].seconds for r in self._active.values() if name in r)
+
+
+sessions = PlayerSessions()
@@ -1,19 +1,20 @@
-import asyncio
+import hashlib
+import json
 import discord
 from discord.ext import commands, tasks
 from discord import app_commands
-from sqlalchemy import select, delete
-
 from utils.config import settings
-from utils.source_query import get_info, get_players
+from services.cs2_cog import ServerAction, ServerSelect, format_broadcast, server_action
+from services.panel_registry import panels
+from services.panel_scheduler import PanelEditScheduler
+from services.rcon_broadcast import broadcast
+from services.server_registry import ServerConfig, registry
+from services.status_snapshot import snapshots, snapshot_for_interaction
 from utils.rcon_cs2 import rcon_exec
-from utils.db import SessionLocal
-from models import CS2PanelMessage
-
-SERVER_KEYS = ("surf", "bhop")
+from utils.metrics import observe_interaction, observe_loop
 
-def _srv(key: str) -> dict:
-    return settings.CS2[key]
+def _srv(key: str) -> ServerConfig:
+    return registry[key]
 
 def _is_mod(user: discord.abc.User) -> bool:
     role_ids = {r.id for r in getattr(user, "roles", [])}
@@ -27,47 +28,48 @@ def _is_mod(user: discord.abc.User) -> bool:
 
 async def build_status_embed() -> discord.Embed:
     e = discord.Embed(
-        title="CS2 Servers — Surf & Bhop",
+        title="CS2 Servers",
         description="Live status. Use buttons below for actions.",
         color=discord.Color.blurple()
     )
-    for key in SERVER_KEYS:
-        s = _srv(key)
-        name = key.upper()
-        try:
-            info = await get_info(s["host"], s["port"])
-            players = await get_players(s["host"], s["port"])
-            names = ", ".join(sorted([p.name for p in players])) or "—"
+    snaps = await snapshots.get_many(registry.keys[:25])  # embeds hold at most 25 fields
+    names_budget = min(512, 4000 // max(len(snaps), 1))  # keep the whole embed under Discord's 6000 chars
+    for snap in snaps:
+        name = snap.key.upper()
+        if snap.online:
+            info = snap.info
+            names = ", ".join(snap.names()) or "—"
             value = (
-                f"**Address:** `{s['host']}:{s['port']}`\n"
-                f"**Map:** `{getattr(info, 'map_name', '?')}`\n"
-                f"**Players:** `{getattr(info, 'player_count', 0)}/{getattr(info, 'max_players', 0)}`\n"
-                f"**Names:** {names[:512]}"
+                f"**Address:** `{snap.address}`\n"
+                f"**Map:** `{info.map_name or '?'}`\n"
+                f"**Players:** `{info.player_count}/{info.max_players}`\n"
+                f"**Names:** {names[:names_budget]}"
             )
             e.add_field(name=f"{name} — ONLINE", value=value, inline=False)
-        except Exception as ex:
+        else:
             e.add_field(
                 name=f"{name} — OFFLINE",
-                value=f"**Address:** `{s['host']}:{s['port']}`\nCannot query A2S: `{ex}`",
+                value=f"**Address:** `{snap.address}`\nCannot query A2S: {snap.offline_reason()}",
                 inline=False
             )
     return e
 
 async def _ephemeral_info(interaction: discord.Interaction, key: str):
-    s = _srv(key)
-    try:
-        await interaction.response.defer(ephemeral=True, thinking=True)
-        info = await get_info(s["host"], s["port"])
-        players = await get_players(s["host"], s["port"])
-        names = ", ".join(sorted([p.name for p in players])) or "—"
-        emb = discord.Embed(title=f"{key.upper()} status", color=discord.Color.green())
-        emb.add_field(name="Address", value=f"{s['host']}:{s['port']}", inline=True)
-        emb.add_field(name="Map", value=getattr(info, "map_name", "?"), inline=True)
-        emb.add_field(name="Players", value=f"{info.player_count}/{info.max_players}", inline=True)
-        emb.add_field(name="Player names", value=names[:1024], inline=False)
-        await interaction.followup.send(embed=emb, ephemeral=True)
-    except Exception as e:
-        await interaction.followup.send(f"Failed to query: `{e}`", ephemeral=True)
+    snap = await snapshot_for_interaction(interaction, key)
+    send = interaction.followup.send if interaction.response.is_done() else interaction.response.send_message
+    if not snap.online:
+        return await send(f"Failed to query: {snap.offline_reason()}", ephemeral=True)
+    info = snap.info
+    names = ", ".join(snap.names()) or "—"
+    emb = discord.Embed(title=f"{key.upper()} status", color=discord.Color.green())
+    emb.add_field(name="Address", value=snap.address, inline=True)
+    emb.add_field(name="Map", value=info.map_name or "?", inline=True)
+    emb.add_field(name="Players", value=f"{info.player_count}/{info.max_players}", inline=True)
+    emb.add_field(name="Player names", value=names[:1024], inline=False)
+    await send(embed=emb, ephemeral=True)
+
+def embed_fingerprint(embed: discord.Embed) -> str:
+    return hashlib.sha1(json.dumps(embed.to_dict(), sort_keys=True).encode()).hexdigest()
 
 # ---------- UI
 
@@ -78,11 +80,12 @@ class ChangeMapModal(discord.ui.Modal, title="Change Map"):
         super().__init__()
         self.server_key = server_key
 
+    @observe_interaction("porta.ChangeMapModal.on_submit")
     async def on_submit(self, interaction: discord.Interaction):
         s = _srv(self.server_key)
         try:
             await interaction.response.defer(ephemeral=True, thinking=True)
-            out = await rcon_exec(s["rcon_host"], s["rcon_port"], s["rcon_pass"], f"changelevel {self.map_name.value}")
+            out = await rcon_exec(s.rcon_host, s.rcon_port, s.rcon_pass, f"changelevel {self.map_name.value}")
             await interaction.followup.send(f"{self.server_key.upper()} → changelevel `{self.map_name.value}` → `{out.strip() or 'ok'}`", ephemeral=True)
         except Exception as e:
             await interaction.followup.send(f"RCON failed: `{e}`", ephemeral=True)
@@ -94,11 +97,12 @@ class SayModal(discord.ui.Modal, title="Say (server chat)"):
         super().__init__()
         self.server_key = server_key
 
+    @observe_interaction("SayModal.on_submit")
     async def on_submit(self, interaction: discord.Interaction):
         s = _srv(self.server_key)
         try:
             await interaction.response.defer(ephemeral=True, thinking=True)
-            out = await rcon_exec(s["rcon_host"], s["rcon_port"], s["rcon_pass"], f'say {self.text.value}')
+            out = await rcon_exec(s.rcon_host, s.rcon_port, s.rcon_pass, f'say {self.text.value}')
             await interaction.followup.send(f"{self.server_key.upper()} → say → `{out.strip() or 'ok'}`", ephemeral=True)
         except Exception as e:
             await interaction.followup.send(f"RCON failed: `{e}`", ephemeral=True)
@@ -110,107 +114,122 @@ class RconModal(discord.ui.Modal, title="Custom RCON (mods only)"):
         super().__init__()
         self.server_key = server_key
 
+    @observe_interaction("RconModal.on_submit")
     async def on_submit(self, interaction: discord.Interaction):
         if not _is_mod(interaction.user):
             return await interaction.response.send_message("No permission.", ephemeral=True)
         s = _srv(self.server_key)
         try:
             await interaction.response.defer(ephemeral=True, thinking=True)
-            out = await rcon_exec(s["rcon_host"], s["rcon_port"], s["rcon_pass"], self.command.value)
+            out = await rcon_exec(s.rcon_host, s.rcon_port, s.rcon_pass, self.command.value)
             await interaction.followup.send(f"{self.server_key.upper()} → `{self.command.value}` → `{out.strip() or 'ok'}`", ephemeral=True)
         except Exception as e:
             await interaction.followup.send(f"RCON failed: `{e}`", ephemeral=True)
 
-class PortaView(discord.ui.View):
-    def __init__(self, timeout=None):
-        super().__init__(timeout=timeout)
-
-    # SURF row
-    @discord.ui.button(label="Surf: Info", style=discord.ButtonStyle.secondary, row=0)
-    async def surf_info(self, interaction: discord.Interaction, button: discord.ui.Button):
-        await _ephemeral_info(interaction, "surf")
-
-    @discord.ui.button(label="Surf: Password", style=discord.ButtonStyle.secondary, row=0)
-    async def surf_pw(self, interaction: discord.Interaction, button: discord.ui.Button):
-        s = _srv("surf")
-        await interaction.response.send_message(f"**SURF password:** ||{s['server_pass'] or '— (no password)'}||", ephemeral=True)
-
-    @discord.ui.button(label="Surf: Change Map", style=discord.ButtonStyle.primary, row=0)
-    async def surf_chmap(self, interaction: discord.Interaction, button: discord.ui.Button):
-        await interaction.response.send_modal(ChangeMapModal("surf"))
-
-    @discord.ui.button(label="Surf: Restart", style=discord.ButtonStyle.danger, row=0)
-    async def surf_restart(self, interaction: discord.Interaction, button: discord.ui.Button):
-        s = _srv("surf")
-        try:
-            await interaction.response.defer(ephemeral=True, thinking=True)
-            out = await rcon_exec(s["rcon_host"], s["rcon_port"], s["rcon_pass"], "mp_restartgame 1")
-            await interaction.followup.send(f"SURF restart → `{out.strip() or 'ok'}`", ephemeral=True)
-        except Exception as e:
-            await interaction.followup.send(f"RCON failed: `{e}`", ephemeral=True)
-
-    @discord.ui.button(label="Surf: Say", style=discord.ButtonStyle.success, row=0)
-    async def surf_say(self, interaction: discord.Interaction, button: discord.ui.Button):
-        await interaction.response.send_modal(SayModal("surf"))
-
-    # BHOP row
-    @discord.ui.button(label="Bhop: Info", style=discord.ButtonStyle.secondary, row=1)
-    async def bhop_info(self, interaction: discord.Interaction, button: discord.ui.Button):
-        await _ephemeral_info(interaction, "bhop")
-
-    @discord.ui.button(label="Bhop: Password", style=discord.ButtonStyle.secondary, row=1)
-    async def bhop_pw(self, interaction: discord.Interaction, button: discord.ui.Button):
-        s = _srv("bhop")
-        await interaction.response.send_message(f"**BHOP password:** ||{s['server_pass'] or '— (no password)'}||", ephemeral=True)
+class BroadcastSayModal(discord.ui.Modal, title="Say on all servers"):
+    text = discord.ui.TextInput(label="Message", required=True, max_length=190)
 
-    @discord.ui.button(label="Bhop: Change Map", style=discord.ButtonStyle.primary, row=1)
-    async def bhop_chmap(self, interaction: discord.Interaction, button: discord.ui.Button):
-        await interaction.response.send_modal(ChangeMapModal("bhop"))
+    @observe_interaction("BroadcastSayModal.on_submit")
+    async def on_submit(self, interaction: discord.Interaction):
+        if not _is_mod(interaction.user):
+            return await interaction.response.send_message("No permission.", ephemeral=True)
+        await interaction.response.defer(ephemeral=True, thinking=True)
+        result = await broadcast(registry.keys, [f"say {self.text.value}"])
+        await interaction.followup.send(format_broadcast(result), ephemeral=True)
 
-    @discord.ui.button(label="Bhop: Restart", style=discord.ButtonStyle.danger, row=1)
-    async def bhop_restart(self, interaction: discord.Interaction, button: discord.ui.Button):
-        s = _srv("bhop")
-        try:
-            await interaction.response.defer(ephemeral=True, thinking=True)
-            out = await rcon_exec(s["rcon_host"], s["rcon_port"], s["rcon_pass"], "mp_restartgame 1")
-            await interaction.followup.send(f"BHOP restart → `{out.strip() or 'ok'}`", ephemeral=True)
-        except Exception as e:
-            await interaction.followup.send(f"RCON failed: `{e}`", ephemeral=True)
+class PortaView(discord.ui.View):
+    """The porta panel view. One instance serves every panel message and is registered with ``bot.add_view``."""
 
-    @discord.ui.button(label="Bhop: Say", style=discord.ButtonStyle.success, row=1)
-    async def bhop_say(self, interaction: discord.Interaction, button: discord.ui.Button):
-        await interaction.response.send_modal(SayModal("bhop"))
+    def __init__(self):
+        super().__init__(timeout=None)
+        self.select = ServerSelect("porta", row=0)
+        self.add_item(self.select)
 
     # Tools row
-    @discord.ui.button(label="Connect Links", style=discord.ButtonStyle.secondary, row=2)
+    @discord.ui.button(label="Connect Links", style=discord.ButtonStyle.secondary, row=1, custom_id="porta_panel:connect_links")
+    @observe_interaction("PortaView.connect_links")
     async def connect_links(self, interaction: discord.Interaction, button: discord.ui.Button):
-        s1 = _srv("surf"); s2 = _srv("bhop")
-        msg = (
-            f"**Surf**: `steam://connect/{s1['host']}:{s1['port']}`\n"
-            f"**Bhop**: `steam://connect/{s2['host']}:{s2['port']}`"
-        )
-        await interaction.response.send_message(msg, ephemeral=True)
-
-    @discord.ui.button(label="RCON (mods)", style=discord.ButtonStyle.secondary, row=2)
-    async def custom_rcon(self, interaction: discord.Interaction, button: discord.ui.Button):
+        msg = "\n".join(f"**{s.key.capitalize()}**: `steam://connect/{s.address}`" for s in registry.all())
+        await interaction.response.send_message(msg[:2000] or "No servers configured.", ephemeral=True)
+
+    @discord.ui.button(label="Say (all servers)", style=discord.ButtonStyle.success, row=1, custom_id="porta_panel:say_all")
+    @observe_interaction("PortaView.say_all")
+    async def say_all(self, interaction: discord.Interaction, button: discord.ui.Button):
         if not _is_mod(interaction.user):
             return await interaction.response.send_message("No permission.", ephemeral=True)
-        await interaction.response.send_modal(RconModal("surf"))
+        await interaction.response.send_modal(BroadcastSayModal())
+
+# server actions (buttons shown after picking a server in the panel)
+@server_action("porta", "info", "Info", discord.ButtonStyle.secondary)
+@observe_interaction("PortaView.info")
+async def porta_info(interaction: discord.Interaction, key: str):
+    await _ephemeral_info(interaction, key)
+
+@server_action("porta", "pw", "Password", discord.ButtonStyle.secondary)
+@observe_interaction("PortaView.pw")
+async def porta_pw(interaction: discord.Interaction, key: str):
+    s = _srv(key)
+    await interaction.response.send_message(f"**{s.key.upper()} password:** ||{s.server_pass or '— (no password)'}||", ephemeral=True)
+
+@server_action("porta", "chmap", "Change Map", discord.ButtonStyle.primary)
+@observe_interaction("PortaView.chmap")
+async def porta_chmap(interaction: discord.Interaction, key: str):
+    await interaction.response.send_modal(ChangeMapModal(key))
+
+@server_action("porta", "restart", "Restart", discord.ButtonStyle.danger)
+@observe_interaction("PortaView.restart")
+async def porta_restart(interaction: discord.Interaction, key: str):
+    s = _srv(key)
+    try:
+        await interaction.response.defer(ephemeral=True, thinking=True)
+        out = await rcon_exec(s.rcon_host, s.rcon_port, s.rcon_pass, "mp_restartgame 1")
+        await interaction.followup.send(f"{s.key.upper()} restart → `{out.strip() or 'ok'}`", ephemeral=True)
+    except Exception as e:
+        await interaction.followup.send(f"RCON failed: `{e}`", ephemeral=True)
+
+@server_action("porta", "say", "Say", discord.ButtonStyle.success)
+@observe_interaction("PortaView.say")
+async def porta_say(interaction: discord.Interaction, key: str):
+    await interaction.response.send_modal(SayModal(key))
+
+@server_action("porta", "custom_rcon", "RCON (mods)", discord.ButtonStyle.secondary)
+@observe_interaction("PortaView.custom_rcon")
+async def porta_custom_rcon(interaction: discord.Interaction, key: str):
+    if not _is_mod(interaction.user):
+        return await interaction.response.send_message("No permission.", ephemeral=True)
+    await interaction.response.send_modal(RconModal(key))
 
 # ---------- Cog
 
 class PortaCog(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
+        self.view = PortaView()
+        self._sent: dict[int, str] = {}  # panel message id -> fingerprint of the embed it shows
+        self._components: dict[int, tuple[str, ...]] = {}  # panel message id -> server options it shows
+        self.editor = PanelEditScheduler(bot, on_gone=self._panel_gone)
         self.refresh_task.start()
 
+    async def cog_load(self):
+        # registered once: panel buttons keep working after a restart without re-posting
+        self.bot.add_view(self.view)
+        self.bot.add_dynamic_items(ServerAction)
+
     def cog_unload(self):
         self.refresh_task.cancel()
+        self.editor.close()
+        self.view.stop()
+
+    async def _panel_gone(self, channel_id: int, message_id: int):
+        self._sent.pop(message_id, None)
+        self._components.pop(message_id, None)
+        panels.remove(message_id)
 
     @app_commands.command(
         name="cs2panel_porta",
         description="Post or update the CS2 porta panel in this channel (mods only)"
     )
+    @observe_interaction("PortaCog.cs2panel_porta")
     async def cs2panel_porta(self, interaction: discord.Interaction):
         if not _is_mod(interaction.user):
             return await interaction.response.send_message("No permission.", ephemeral=True)
@@ -219,52 +238,74 @@ class PortaCog(commands.Cog):
         if not isinstance(ch, discord.TextChannel):
             return await interaction.response.send_message("Run this in a text channel.", ephemeral=True)
 
-        # check existing panel record for this channel
-        async with SessionLocal() as ses:
-            row = (await ses.execute(
-                select(CS2PanelMessage).where(CS2PanelMessage.channel_id == ch.id)
-            )).scalar_one_or_none()
+        # existing panel for this channel
+        message_id = panels.get(ch.id)
 
         embed = await build_status_embed()
-        view = PortaView()
+        self.view.select.sync()
+        view = self.view
 
-        if row:
+        if message_id:
             # edit existing message
             try:
-                msg = await ch.fetch_message(row.message_id)
-                await msg.edit(embed=embed, view=view)
+                await ch.get_partial_message(message_id).edit(embed=embed, view=view)
+                self._sent[message_id] = embed_fingerprint(embed)
+                self._components[message_id] = self._options()
                 return await interaction.response.send_message("Panel updated.", ephemeral=True)
-            except Exception:
+            except discord.NotFound:
                 # message missing — recreate
-                pass
+                self._sent.pop(message_id, None)
 
         # create new
         sent = await ch.send(embed=embed, view=view)
-        async with SessionLocal() as ses:
-            await ses.merge(CS2PanelMessage(channel_id=ch.id, message_id=sent.id))
-            await ses.commit()
+        self._sent[sent.id] = embed_fingerprint(embed)
+        self._components[sent.id] = self._options()
+        panels.set(ch.id, sent.id)
         await interaction.response.send_message("Panel posted.", ephemeral=True)
 
     @tasks.loop(seconds=30)
+    @observe_loop("panel_refresh")
     async def refresh_task(self):
-        # iterate over all panels and refresh embeds
-        async with SessionLocal() as ses:
-            rows = (await ses.execute(select(CS2PanelMessage))).scalars().all()
+        # iterate over all panels and refresh embeds; the registry is in memory, so no DB round trip
+        if not panels.loaded and not await panels.load():
+            return
+        await self.refresh_panels(panels.all())
 
-        for row in rows:
-            try:
-                ch = self.bot.get_channel(row.channel_id)
-                if not isinstance(ch, discord.TextChannel):
-                    continue
-                msg = await ch.fetch_message(row.message_id)
-                embed = await build_status_embed()
-                await msg.edit(embed=embed, view=PortaView())
-                await asyncio.sleep(0.2)  # be polite to rate limits
-            except Exception:
-                # if message/channel vanished, cleanup
-                async with SessionLocal() as ses:
-                    await ses.execute(delete(CS2PanelMessage).where(CS2PanelMessage.id == row.id))
-                    await ses.commit()
+    async def refresh_panels(self, panels: list[tuple[int, int]]):
+        """Queue edits for the (channel id, message id) panels whose embed is out of date."""
+        if not panels:
+            return
+
+        # one embed per tick, shared by every panel; only panels showing something else get edited
+        embed = await build_status_embed()
+        digest = embed_fingerprint(embed)
+        self.view.select.sync()
+        options = self._options()
+        live = {message_id for _, message_id in panels}
+        for message_id in self._sent.keys() - live:
+            del self._sent[message_id]
+        for message_id in self._components.keys() - live:
+            del self._components[message_id]
+
+        for channel_id, message_id in panels:
+            # the view is persistent and shared; components are only resent when the server list
+            # changed (or once after a restart, which also upgrades panels posted by older versions)
+            resend_view = self._components.get(message_id) != options
+            if self._sent.get(message_id) == digest and not resend_view:
+                continue
+            # queued per channel; a newer tick's edit replaces one still waiting on a rate limit
+            self.editor.submit(
+                channel_id, message_id,
+                on_success=lambda mid=message_id, d=digest: self._sent_ok(mid, d, options),
+                embed=embed, **({"view": self.view} if resend_view else {}),
+            )
+
+    def _options(self) -> tuple[str, ...]:
+        return tuple(o.value for o in self.view.select.options)
+
+    def _sent_ok(self, message_id: int, digest: str, options: tuple[str, ...]):
+        self._sent[message_id] = digest
+        self._components[message_id] = options
 
     @refresh_task.before_loop
     async def before_refresh(self):
@@ -1,19 +1,22 @@
 import asyncio
 from discord.ext import tasks
 import discord
-from utils.config import settings
-from utils.source_query import get_info
+from services.status_snapshot import snapshots
+from utils.metrics import observe_loop
 
 async def _compose_presence():
-    s = settings.CS2
+    snaps = await snapshots.sweep()
     parts = []
-    for key in ("surf", "bhop"):
-        try:
-            info = await get_info(s[key]["host"], s[key]["port"])
-            parts.append(f"{key.capitalize()} {info.player_count}/{info.max_players}")
-        except Exception:
-            parts.append(f"{key.capitalize()} offline")
-    return " | ".join(parts)
+    for snap in snaps:
+        if snap.online:
+            parts.append(f"{snap.key.capitalize()} {snap.info.player_count}/{snap.info.max_players}")
+        else:
+            parts.append(f"{snap.key.capitalize()} offline")
+    txt = " | ".join(parts)
+    if len(txt) > 128:  # activity name limit; summarise big fleets
+        online = [s for s in snaps if s.online]
+        txt = f"{len(online)}/{len(snaps)} servers • {sum(s.info.player_count for s in online)} players"
+    return txt
 
 class PresenceTasks:
     def __init__(self, bot: discord.Client):
@@ -21,6 +24,7 @@ class PresenceTasks:
         self.loop.start()
 
     @tasks.loop(seconds=60)
+    @observe_loop("presence")
     async def loop(self):
         try:
             txt = await _compose_presence()
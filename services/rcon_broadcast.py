@@ -0,0 +1,79 @@
+"""Run RCON commands on many servers at once.
+
+Servers are handled concurrently, commands within one server run in order, so a
+fleet-wide announcement takes about as long as the slowest server.
+"""
+import asyncio
+import time
+from dataclasses import dataclass, field
+from typing import Iterable
+
+from services.server_registry import registry
+from utils.config import settings
+from utils.rcon_cs2 import rcon_exec
+
+
+@dataclass
+class CommandResult:
+    command: str
+    output: str | None = None
+    error: str | None = None
+    elapsed_ms: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+@dataclass
+class ServerResult:
+    server: str
+    results: list[CommandResult] = field(default_factory=list)
+    elapsed_ms: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return all(r.ok for r in self.results)
+
+
+@dataclass
+class BroadcastResult:
+    servers: list[ServerResult]
+    elapsed_ms: float
+
+    @property
+    def ok(self) -> bool:
+        return all(s.ok for s in self.servers)
+
+
+def resolve_targets(spec: str | Iterable[str] | None) -> tuple[list[str], list[str]]:
+    """Turn ``"all"``/``None``, a comma list or an iterable of keys into (known, unknown) server keys."""
+    if spec is None or spec == "all":
+        return list(registry.keys), []
+    keys = [k.strip().lower() for k in (spec.split(",") if isinstance(spec, str) else spec) if k.strip()]
+    keys = list(dict.fromkeys(keys))
+    return [k for k in keys if k in registry], [k for k in keys if k not in registry]
+
+
+async def _run_on_server(key: str, commands: list[str], timeout: float) -> ServerResult:
+    s = registry[key]
+    out = ServerResult(server=key)
+    started = time.perf_counter()
+    for command in commands:
+        t0 = time.perf_counter()
+        res = CommandResult(command=command)
+        try:
+            res.output = (await rcon_exec(s.rcon_host, s.rcon_port, s.rcon_pass, command, timeout)).strip()
+        except Exception as e:
+            res.error = str(e) or type(e).__name__
+        res.elapsed_ms = (time.perf_counter() - t0) * 1000
+        out.results.append(res)
+    out.elapsed_ms = (time.perf_counter() - started) * 1000
+    return out
+
+
+async def broadcast(keys: Iterable[str], commands: list[str], timeout: float | None = None) -> BroadcastResult:
+    timeout = settings.RCON_TIMEOUT if timeout is None else timeout
+    started = time.perf_counter()
+    servers = await asyncio.gather(*(_run_on_server(k, commands, timeout) for k in keys))
+    return BroadcastResult(servers=list(servers), elapsed_ms=(time.perf_counter() - started) * 1000)
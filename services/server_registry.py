@@ -0,0 +1,129 @@
+"""In-memory registry of CS2 servers, loaded from the ``cs2_servers`` table.
+
+The table is re-read periodically and swapped in atomically, so servers can be
+added or re-addressed without a restart. Until the first successful load (or
+while the table is empty) the env-configured servers in ``settings.CS2`` are used.
+RCON passwords stay in the environment (``CS2_<KEY>_RCON_PASSWORD``).
+"""
+import logging
+import os
+import time
+from dataclasses import dataclass
+
+import discord
+from discord import app_commands
+from discord.ext import tasks
+from sqlalchemy import select
+
+from models import CS2Server
+from utils.config import settings
+from utils.db import SessionLocal
+from utils.metrics import observe_loop, set_server_resolver
+
+log = logging.getLogger("registry")
+
+
+@dataclass(frozen=True)
+class ServerConfig:
+    key: str
+    host: str
+    port: int
+    rcon_host: str
+    rcon_port: int
+    rcon_pass: str = ""
+    server_pass: str = ""
+    id: int | None = None  # cs2_servers.id; None for env-only servers
+
+    @property
+    def address(self) -> str:
+        return f"{self.host}:{self.port}"
+
+
+def _env(key: str, name: str) -> str:
+    return os.getenv(f"CS2_{key.upper()}_{name}", "")
+
+
+def _from_settings() -> list[ServerConfig]:
+    return [
+        ServerConfig(key=key, host=s["host"], port=s["port"], rcon_host=s["rcon_host"], rcon_port=s["rcon_port"],
+                     rcon_pass=s["rcon_pass"], server_pass=s["server_pass"])
+        for key, s in settings.CS2.items()
+    ]
+
+
+def _from_row(row: CS2Server) -> ServerConfig:
+    return ServerConfig(
+        key=row.key,
+        host=row.host,
+        port=row.port,
+        rcon_host=row.rcon_host,
+        rcon_port=row.rcon_port,
+        rcon_pass=_env(row.key, "RCON_PASSWORD"),
+        server_pass=row.server_pass or _env(row.key, "PASSWORD"),
+        id=row.id,
+    )
+
+
+class ServerRegistry:
+    def __init__(self, servers: list[ServerConfig]):
+        self.loaded_at = 0.0
+        self._index(servers)
+
+    def _index(self, servers: list[ServerConfig]):
+        # build fresh dicts and swap references, so readers never see a half-built index
+        self._by_key = {s.key: s for s in servers}
+        self._by_id = {s.id: s for s in servers if s.id is not None}
+        self._by_addr = {addr: s for s in servers for addr in ((s.rcon_host, s.rcon_port), (s.host, s.port))}
+        self.keys: tuple[str, ...] = tuple(self._by_key)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._by_key
+
+    def __getitem__(self, key: str) -> ServerConfig:
+        return self._by_key[key]
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def get(self, key: str) -> ServerConfig | None:
+        return self._by_key.get(key)
+
+    def by_id(self, server_id: int) -> ServerConfig | None:
+        return self._by_id.get(server_id)
+
+    def by_address(self, host: str, port: int) -> ServerConfig | None:
+        """The server with this A2S or RCON address."""
+        return self._by_addr.get((host, port))
+
+    def all(self) -> list[ServerConfig]:
+        return list(self._by_key.values())
+
+    async def reload(self) -> bool:
+        """Re-read ``cs2_servers``. Returns True if the server set changed."""
+        try:
+            async with SessionLocal() as ses:
+                rows = (await ses.execute(select(CS2Server).order_by(CS2Server.id))).scalars().all()
+        except Exception as e:
+            log.warning("Server registry reload failed, keeping %d cached servers: %s", len(self), e)
+            return False
+        servers = [_from_row(r) for r in rows] if rows else _from_settings()
+        self.loaded_at = time.monotonic()
+        if servers == self.all():
+            return False
+        self._index(servers)
+        log.info("Server registry loaded: %s", ", ".join(self.keys) or "—")
+        return True
+
+    @tasks.loop(seconds=settings.REGISTRY_RELOAD_INTERVAL)
+    @observe_loop("registry_reload")
+    async def reload_task(self):
+        await self.reload()
+
+
+registry = ServerRegistry(_from_settings())
+set_server_resolver(lambda host, port: getattr(registry.by_address(host, port), "key", None))
+
+
+async def server_autocomplete(interaction: discord.Interaction, current: str) -> list[app_commands.Choice[str]]:
+    current = current.lower()
+    return [app_commands.Choice(name=k, value=k) for k in registry.keys if current in k][:25]
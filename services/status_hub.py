@@ -0,0 +1,109 @@
+"""Fan-out of live status changes to streaming clients (SSE).
+
+The hub listens to the snapshot store, so it rides on the single poller. It
+only emits when a server's map, player count, roster or online state changes,
+serializes each event once, and hands the same bytes to every subscriber.
+Joins and leaves come from the player session tracker (``on_session``), which
+has already diffed the rosters; the hub only collects them per server.
+Each subscriber has a bounded queue; one that falls behind is evicted instead
+of buffering without limit or slowing everybody else down.
+"""
+import asyncio
+import json
+import logging
+
+from services.player_sessions import Session
+from services.status_snapshot import ServerSnapshot
+from utils.config import settings
+
+log = logging.getLogger("status_hub")
+
+
+def _state(snap: ServerSnapshot) -> dict:
+    return {
+        "server": snap.key,
+        "online": snap.online,
+        "map": getattr(snap.info, "map_name", None),
+        "players": getattr(snap.info, "player_count", 0),
+        "max_players": getattr(snap.info, "max_players", 0),
+        "names": snap.names(),
+    }
+
+
+def sse(event: str, data: dict) -> bytes:
+    return f"event: {event}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n".encode()
+
+
+class Subscriber:
+    def __init__(self, keys: set[str] | None, queue_size: int):
+        self.keys = keys
+        self.queue: asyncio.Queue[bytes | None] = asyncio.Queue(queue_size)
+        self.evicted = False
+
+    def wants(self, key: str) -> bool:
+        return self.keys is None or key in self.keys
+
+
+class StatusHub:
+    def __init__(self, queue_size: int = 32):
+        self.queue_size = queue_size
+        self.evicted = 0
+        self._subscribers: set[Subscriber] = set()
+        self._last: dict[str, ServerSnapshot] = {}
+        self._changes: dict[str, dict[str, list[str]]] = {}  # server key -> "joined"/"left" -> names
+
+    def __len__(self) -> int:
+        return len(self._subscribers)
+
+    def current(self, keys: set[str] | None = None) -> list[dict]:
+        return [_state(s) for k, s in self._last.items() if keys is None or k in keys]
+
+    def subscribe(self, keys: set[str] | None = None) -> Subscriber:
+        sub = Subscriber(keys, self.queue_size)
+        self._subscribers.add(sub)
+        return sub
+
+    def unsubscribe(self, sub: Subscriber):
+        self._subscribers.discard(sub)
+
+    def on_session(self, kind: str, sess: Session):
+        """Session listener; runs before ``publish`` for the same snapshot."""
+        changes = self._changes.setdefault(sess.server, {})
+        changes.setdefault("joined" if kind == "join" else "left", []).append(sess.name)
+
+    def publish(self, snap: ServerSnapshot):
+        """Snapshot listener: emit a delta if anything visible changed."""
+        prev = self._last.get(snap.key)
+        self._last[snap.key] = snap
+        changes = self._changes.pop(snap.key, None)
+        if prev is not None and prev.digest == snap.digest and not changes:  # a rejoin keeps the digest
+            return
+        state = _state(snap)
+        delta = {"server": snap.key}
+        if prev is None:
+            delta.update(state)  # the full roster; its joins are implied
+        else:
+            old = _state(prev)
+            delta.update({k: v for k, v in state.items() if k != "names" and v != old[k]})
+            delta.update({k: sorted(names) for k, names in (changes or {}).items()})
+        payload = sse("delta", delta)
+        for sub in list(self._subscribers):
+            if not sub.wants(snap.key):
+                continue
+            try:
+                sub.queue.put_nowait(payload)
+            except asyncio.QueueFull:
+                self._evict(sub)
+
+    def _evict(self, sub: Subscriber):
+        sub.evicted = True
+        self.evicted += 1
+        self._subscribers.discard(sub)
+        # make room for the end-of-stream marker so the client's generator wakes up and exits
+        while not sub.queue.empty():
+            sub.queue.get_nowait()
+        sub.queue.put_nowait(None)
+        log.info("Evicted slow status stream subscriber (%d active)", len(self._subscribers))
+
+
+hub = StatusHub(queue_size=settings.STREAM_QUEUE_SIZE)
@@ -0,0 +1,141 @@
+"""Status time series: buffered CS2Status samples, rollups and retention.
+
+Every snapshot fetched by the poller becomes a sample in memory. Samples are
+written in bulk when the buffer reaches STATUS_FLUSH_SIZE or every
+STATUS_FLUSH_INTERVAL seconds. Once a minute the recent raw rows are rolled up
+into 1-minute and 1-hour buckets (``cs2_status_rollup``), and rows past their
+retention window are pruned. Offline polls are not stored: a gap is downtime.
+"""
+import asyncio
+import datetime as dt
+import logging
+
+from discord.ext import tasks
+from sqlalchemy import insert, text
+
+from models import CS2Status
+from services.server_registry import registry
+from services.status_snapshot import ServerSnapshot
+from utils.config import settings
+from utils.db import SessionLocal
+from utils.metrics import observe_loop
+
+log = logging.getLogger("status_recorder")
+
+_ROLLUP_MINUTE = text("""
+INSERT INTO cs2_status_rollup
+    (server_id, resolution, bucket, samples, players_avg, players_min, players_max, max_players, map_name)
+SELECT server_id, '1m', date_trunc('minute', ts), count(*), avg(players), min(players), max(players),
+       max(max_players), (array_agg(map_name ORDER BY ts DESC))[1]
+FROM cs2_status
+WHERE ts >= :since AND ts < :until
+GROUP BY server_id, date_trunc('minute', ts)
+ON CONFLICT (server_id, resolution, bucket) DO UPDATE SET
+    samples = excluded.samples, players_avg = excluded.players_avg, players_min = excluded.players_min,
+    players_max = excluded.players_max, max_players = excluded.max_players, map_name = excluded.map_name
+""")
+
+_ROLLUP_HOUR = text("""
+INSERT INTO cs2_status_rollup
+    (server_id, resolution, bucket, samples, players_avg, players_min, players_max, max_players, map_name)
+SELECT server_id, '1h', date_trunc('hour', bucket), sum(samples),
+       sum(players_avg * samples) / nullif(sum(samples), 0), min(players_min), max(players_max),
+       max(max_players), (array_agg(map_name ORDER BY bucket DESC))[1]
+FROM cs2_status_rollup
+WHERE resolution = '1m' AND bucket >= :since AND bucket < :until
+GROUP BY server_id, date_trunc('hour', bucket)
+ON CONFLICT (server_id, resolution, bucket) DO UPDATE SET
+    samples = excluded.samples, players_avg = excluded.players_avg, players_min = excluded.players_min,
+    players_max = excluded.players_max, max_players = excluded.max_players, map_name = excluded.map_name
+""")
+
+_PRUNE_RAW = text("DELETE FROM cs2_status WHERE ts < :cutoff")
+_PRUNE_ROLLUP = text("DELETE FROM cs2_status_rollup WHERE resolution = :resolution AND bucket < :cutoff")
+
+
+class StatusRecorder:
+    def __init__(self, flush_size: int, max_buffer: int):
+        self.flush_size = flush_size
+        self.max_buffer = max_buffer
+        self.dropped = 0
+        self._buffer: list[dict] = []
+        self._flush_lock = asyncio.Lock()
+        self._flush_pending: asyncio.Task | None = None
+        self._last_prune: dt.datetime | None = None
+
+    def record(self, snap: ServerSnapshot):
+        """Snapshot listener; cheap enough to run inline on every poll."""
+        server = registry.get(snap.key)
+        if not snap.online or server is None or server.id is None:
+            return  # env-only servers have no cs2_servers row to reference
+        self._buffer.append({
+            "server_id": server.id,
+            "ts": dt.datetime.now(dt.timezone.utc),
+            "map_name": snap.info.map_name[:64] or None,
+            "players": snap.info.player_count,
+            "max_players": snap.info.max_players,
+        })
+        if len(self._buffer) >= self.flush_size and (self._flush_pending is None or self._flush_pending.done()):
+            self._flush_pending = asyncio.create_task(self.flush())
+
+    async def flush(self):
+        async with self._flush_lock:
+            if not self._buffer:
+                return
+            rows, self._buffer = self._buffer, []
+            try:
+                async with SessionLocal() as ses:
+                    await ses.execute(insert(CS2Status), rows)  # executemany, batched by the driver
+                    await ses.commit()
+            except Exception as e:
+                # keep the samples for the next attempt, but never grow without bound during an outage
+                merged = rows + self._buffer
+                self.dropped += max(0, len(merged) - self.max_buffer)
+                self._buffer = merged[-self.max_buffer:]
+                log.warning("Status flush of %d samples failed: %s", len(rows), e)
+
+    async def rollup(self, now: dt.datetime | None = None):
+        now = now or dt.datetime.now(dt.timezone.utc)
+        minute = now.replace(second=0, microsecond=0)
+        hour = minute.replace(minute=0)
+        async with SessionLocal() as ses:
+            # recompute a few recent buckets so late flushes are still counted (upserts are idempotent)
+            await ses.execute(_ROLLUP_MINUTE, {"since": minute - dt.timedelta(minutes=5), "until": minute})
+            await ses.execute(_ROLLUP_HOUR, {"since": hour - dt.timedelta(hours=1), "until": minute})
+            if self._last_prune is None or now - self._last_prune >= dt.timedelta(hours=1):
+                await ses.execute(_PRUNE_RAW, {"cutoff": now - dt.timedelta(days=settings.STATUS_RAW_RETENTION_DAYS)})
+                await ses.execute(_PRUNE_ROLLUP, {
+                    "resolution": "1m", "cutoff": now - dt.timedelta(days=settings.STATUS_MINUTE_RETENTION_DAYS)})
+                await ses.execute(_PRUNE_ROLLUP, {
+                    "resolution": "1h", "cutoff": now - dt.timedelta(days=settings.STATUS_HOURLY_RETENTION_DAYS)})
+                self._last_prune = now
+            await ses.commit()
+
+    @property
+    def buffered(self) -> int:
+        return len(self._buffer)
+
+    @tasks.loop(seconds=settings.STATUS_FLUSH_INTERVAL)
+    @observe_loop("status_flush")
+    async def flush_task(self):
+        await self.flush()
+
+    @tasks.loop(seconds=60)
+    @observe_loop("status_rollup")
+    async def rollup_task(self):
+        try:
+            await self.rollup()
+        except Exception as e:
+            log.warning("Status rollup failed: %s", e)
+
+    def start(self):
+        self.flush_task.start()
+        self.rollup_task.start()
+
+    async def stop(self):
+        self.flush_task.cancel()
+        self.rollup_task.cancel()
+        await self.flush()
+
+
+recorder = StatusRecorder(flush_size=settings.STATUS_FLUSH_SIZE, max_buffer=settings.STATUS_FLUSH_SIZE * 20)
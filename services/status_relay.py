@@ -0,0 +1,90 @@
+"""Status snapshots shared through Redis.
+
+The leader publishes every fetched snapshot: the latest one per server goes to
+the ``cs2:status`` hash (so a worker that starts late can catch up) and the
+same JSON is broadcast on the ``cs2:status`` channel. Other workers mirror
+both into their read-only snapshot store, so ``/status``, ETags and the SSE
+stream work the same on every worker.
+"""
+import asyncio
+import json
+import logging
+
+from redis.asyncio import Redis
+
+from services.status_snapshot import ServerSnapshot, StatusSnapshots
+
+log = logging.getLogger("status_relay")
+
+KEY = "cs2:status"
+
+
+class StatusPublisher:
+    """Snapshot listener on the leader. Writes of one poll sweep go out in one pipeline."""
+
+    def __init__(self, redis: Redis):
+        self.redis = redis
+        self._dirty: dict[str, ServerSnapshot] = {}
+        self._flushing: asyncio.Task | None = None
+
+    def publish(self, snap: ServerSnapshot):
+        self._dirty[snap.key] = snap
+        if self._flushing is None or self._flushing.done():
+            self._flushing = asyncio.create_task(self._flush())
+
+    async def _flush(self):
+        await asyncio.sleep(0)  # let the rest of the sweep land first
+        while self._dirty:
+            batch, self._dirty = self._dirty, {}
+            pipe = self.redis.pipeline(transaction=False)
+            for key, snap in batch.items():
+                payload = json.dumps(snap.to_dict(), separators=(",", ":"))
+                pipe.hset(KEY, key, payload)
+                pipe.publish(KEY, payload)
+            try:
+                await pipe.execute()
+            except Exception as e:
+                log.warning("Publishing %d snapshot(s) to Redis failed: %s", len(batch), e)
+
+
+class StatusMirror:
+    """Feeds a read-only snapshot store from the leader's publications."""
+
+    def __init__(self, redis: Redis, store: StatusSnapshots):
+        self.redis = redis
+        self.store = store
+        self._task: asyncio.Task | None = None
+
+    def start(self):
+        self.store.readonly = True
+        self._task = asyncio.create_task(self._run())
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+        self.store.readonly = False
+
+    def _put(self, payload: bytes | str):
+        try:
+            self.store.put(ServerSnapshot.from_dict(json.loads(payload)))
+        except (ValueError, KeyError, TypeError) as e:
+            log.warning("Ignoring malformed status payload: %s", e)
+
+    async def _run(self):
+        while True:
+            pubsub = self.redis.pubsub(ignore_subscribe_messages=True)
+            try:
+                # subscribe before the catch-up read so nothing published in between is missed
+                await pubsub.subscribe(KEY)
+                for payload in (await self.redis.hgetall(KEY)).values():
+                    self._put(payload)
+                async for message in pubsub.listen():
+                    if message["type"] == "message":
+                        self._put(message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                log.warning("Status mirror disconnected, retrying: %s", e)
+                await asyncio.sleep(1)
+            finally:
+                await pubsub.close()
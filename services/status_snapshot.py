@@ -0,0 +1,280 @@
+"""Shared A2S status snapshots.
+
+Every status consumer (HTTP API, panels, presence, info buttons) reads from
+one in-memory store. A snapshot younger than the TTL is served from memory;
+concurrent requests for a stale server share a single in-flight query.
+
+The poller is adaptive: a server with players is polled every
+STATUS_POLL_INTERVAL, an empty one every STATUS_POLL_IDLE (and its snapshot is
+served that long). After STATUS_BREAKER_FAILURES failed polls in a row a
+server's circuit opens: readers get its last snapshot ("offline, last seen …")
+without any query, and a single background probe after a growing cooldown
+(half-open) decides whether it closes again.
+
+In a multi-worker deployment only the leader queries servers; the other
+workers run the store ``readonly`` and are fed through ``put()`` from Redis.
+"""
+import asyncio
+import hashlib
+import logging
+import time
+from dataclasses import asdict, dataclass, field
+from functools import cached_property
+from typing import Callable, Iterable
+
+import discord
+from discord.ext import tasks
+
+from services.server_registry import registry
+from utils.config import settings
+from utils.metrics import STATUS_FETCH_SECONDS, observe_loop
+from utils.source_query import Player, SourceInfo, get_info, get_players
+
+log = logging.getLogger("status")
+
+
+@dataclass
+class ServerSnapshot:
+    key: str
+    host: str
+    port: int
+    info: SourceInfo | None = None
+    players: list[Player] = field(default_factory=list)
+    error: str | None = None
+    players_error: str | None = None  # info answered but the roster didn't; ``players`` is the previous one
+    fetched_at: float = 0.0  # time.monotonic()
+    last_seen: float | None = None  # time.time() of the last successful query
+
+    @property
+    def online(self) -> bool:
+        return self.info is not None
+
+    @property
+    def address(self) -> str:
+        return f"{self.host}:{self.port}"
+
+    @property
+    def age(self) -> float:
+        return time.monotonic() - self.fetched_at
+
+    def names(self) -> list[str]:
+        return sorted(p.name for p in self.players)
+
+    def offline_reason(self) -> str:
+        """Error text for Discord, with a relative "last seen" timestamp when known."""
+        seen = f" — last seen <t:{int(self.last_seen)}:R>" if self.last_seen else ""
+        return f"`{self.error}`{seen}"
+
+    def to_dict(self) -> dict:
+        return {
+            "key": self.key, "host": self.host, "port": self.port,
+            "info": asdict(self.info) if self.info else None,
+            "players": [asdict(p) for p in self.players],
+            "error": self.error,
+            "players_error": self.players_error,
+            "fetched_wall": time.time() - self.age,  # monotonic clocks don't cross processes
+            "last_seen": self.last_seen,
+        }
+
+    @classmethod
+    def from_dict(cls, d: dict) -> "ServerSnapshot":
+        return cls(
+            key=d["key"], host=d["host"], port=d["port"],
+            info=SourceInfo(**d["info"]) if d["info"] else None,
+            players=[Player(**p) for p in d["players"]],
+            error=d["error"],
+            players_error=d.get("players_error"),
+            fetched_at=time.monotonic() - max(0.0, time.time() - d["fetched_wall"]),
+            last_seen=d.get("last_seen"),
+        )
+
+    @cached_property
+    def digest(self) -> str:
+        """Content hash of what clients see; equal digests mean nothing visible changed."""
+        info = self.info
+        state = (self.key, self.address, self.online, info and info.map_name, info and info.player_count,
+                 info and info.max_players, tuple(self.names()))
+        return hashlib.blake2b(repr(state).encode(), digest_size=8).hexdigest()
+
+
+@dataclass
+class _Health:
+    """Poll schedule and circuit breaker state of one server."""
+    failures: int = 0  # consecutive failed queries
+    cooldown: float = 0.0  # current open-circuit period
+    retry_at: float = 0.0  # monotonic; when an open circuit may be probed
+    due: float = 0.0  # monotonic; next scheduled poll
+    fresh_for: float | None = None  # seconds the last snapshot may be served (None: the store's ttl)
+
+
+class StatusSnapshots:
+    def __init__(self, ttl: float, timeout: float, poll_interval: float = 15.0, idle_interval: float = 60.0,
+                 breaker_failures: int = 3, cooldown: float = 30.0, max_cooldown: float = 300.0):
+        self.ttl = ttl
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+        self.idle_interval = idle_interval
+        self.breaker_failures = breaker_failures
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.readonly = False  # True on non-leader workers: never query, serve what put() delivered
+        self._snapshots: dict[str, ServerSnapshot] = {}
+        self._inflight: dict[str, asyncio.Task] = {}
+        self._health: dict[str, _Health] = {}
+        self._listeners: list[Callable[[ServerSnapshot], None]] = []
+
+    def add_listener(self, fn: Callable[[ServerSnapshot], None]):
+        """Call ``fn`` with every freshly fetched snapshot."""
+        self._listeners.append(fn)
+
+    def is_open(self, key: str) -> bool:
+        """True while the server's circuit breaker is open (it is known to be offline)."""
+        h = self._health.get(key)
+        return h is not None and h.failures >= self.breaker_failures
+
+    def open_circuits(self) -> int:
+        return sum(h.failures >= self.breaker_failures for h in self._health.values())
+
+    def peek(self, key: str, max_age: float | None = None) -> ServerSnapshot | None:
+        """Return the cached snapshot if it is fresh enough, without querying."""
+        snap = self._snapshots.get(key)
+        if snap is None:
+            return None
+        if self.is_open(key):
+            return snap  # offline; answered from memory until a probe says otherwise
+        if max_age is None:
+            h = self._health.get(key)
+            max_age = self.ttl if h is None or h.fresh_for is None else h.fresh_for
+        return snap if snap.age <= max_age else None
+
+    def latest(self, key: str) -> ServerSnapshot | None:
+        """Last known snapshot regardless of age (the poller keeps it fresh)."""
+        return self._snapshots.get(key)
+
+    async def get(self, key: str, max_age: float | None = None) -> ServerSnapshot:
+        snap = self.peek(key, max_age)
+        if snap is not None:
+            if not self.readonly and self.is_open(key) and time.monotonic() >= self._health[key].retry_at:
+                self._start(key)  # half-open: probe in the background, nobody waits on a dead server
+            return snap
+        if self.readonly:
+            return self._snapshots.get(key) or self._placeholder(key)
+        # shield: one impatient caller must not cancel the query everybody else waits on
+        return await asyncio.shield(self._start(key))
+
+    def _start(self, key: str) -> asyncio.Task:
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(self._fetch(key))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _t, k=key: self._inflight.pop(k, None))
+        return task
+
+    async def get_many(self, keys: Iterable[str], max_age: float | None = None) -> list[ServerSnapshot]:
+        return list(await asyncio.gather(*(self.get(k, max_age) for k in keys)))
+
+    async def sweep(self, max_age: float | None = None) -> list[ServerSnapshot]:
+        """Snapshots of every registered server; all stale ones are queried concurrently."""
+        return await self.get_many(registry.keys, max_age)
+
+    async def _fetch(self, key: str) -> ServerSnapshot:
+        s = registry[key]
+        snap = ServerSnapshot(key=key, host=s.host, port=s.port)
+        started = time.perf_counter()
+        # each query carries its own deadline, so a sweep costs ~one timeout regardless of server count
+        info, players = await asyncio.gather(
+            get_info(s.host, s.port, self.timeout),
+            get_players(s.host, s.port, self.timeout),
+            return_exceptions=True,
+        )
+        prev = self._snapshots.get(key)
+        if isinstance(info, BaseException):
+            snap.error = str(info) or type(info).__name__
+            snap.last_seen = prev and prev.last_seen
+        else:
+            snap.info = info
+            if isinstance(players, BaseException):
+                # a lost player packet says nothing about who is on the server: keep the last roster
+                snap.players_error = str(players) or type(players).__name__
+                snap.players = prev.players if prev is not None and prev.online else []
+            else:
+                snap.players = players
+            snap.last_seen = time.time()
+        snap.fetched_at = time.monotonic()
+        STATUS_FETCH_SECONDS.labels(key, "online" if snap.online else "offline").observe(time.perf_counter() - started)
+        self._schedule(snap)
+        self.put(snap)
+        return snap
+
+    def _schedule(self, snap: ServerSnapshot):
+        """Update the breaker and pick the next poll from what the query found."""
+        h = self._health.setdefault(snap.key, _Health())
+        now = snap.fetched_at
+        if snap.online:
+            if h.failures >= self.breaker_failures:
+                log.info("%s answers again, closing its circuit", snap.key)
+            h.failures, h.cooldown = 0, 0.0
+            busy = snap.info.player_count > 0
+            h.due = now + (self.poll_interval if busy else self.idle_interval)
+            h.fresh_for = None if busy else max(self.ttl, self.idle_interval + self.timeout)
+            return
+        h.failures += 1
+        h.fresh_for = None
+        log.debug("%s poll failed (%d in a row): %s", snap.key, h.failures, snap.error)
+        if h.failures < self.breaker_failures:
+            h.due = now + self.poll_interval
+            return
+        if h.failures == self.breaker_failures:
+            log.warning("%s failed %d polls in a row, opening its circuit: %s", snap.key, h.failures, snap.error)
+        h.cooldown = min(self.max_cooldown, h.cooldown * 2 if h.cooldown else self.cooldown)
+        h.retry_at = h.due = now + h.cooldown
+
+    def put(self, snap: ServerSnapshot):
+        """Store a snapshot fetched here or elsewhere and notify the listeners."""
+        current = self._snapshots.get(snap.key)
+        if current is not None and current.fetched_at > snap.fetched_at:
+            return  # out-of-order delivery
+        self._snapshots[snap.key] = snap
+        for fn in self._listeners:
+            try:
+                fn(snap)
+            except Exception:
+                log.exception("Snapshot listener failed")
+
+    def _placeholder(self, key: str) -> ServerSnapshot:
+        s = registry[key]
+        return ServerSnapshot(key=key, host=s.host, port=s.port, error="no status published yet")
+
+    def poll_due(self) -> int:
+        """Start a query for every server whose next poll is due. Returns how many were started."""
+        now = time.monotonic()
+        due = [k for k in registry.keys if k not in self._inflight and self._health.get(k, _Health()).due <= now]
+        for key in due:
+            self._start(key)  # not awaited: a slow server never holds up the others' schedule
+        return len(due)
+
+    @tasks.loop(seconds=1)
+    @observe_loop("status_poll")
+    async def poll_task(self):
+        """Keep every server's snapshot warm so readers rarely wait on A2S."""
+        self.poll_due()
+
+
+snapshots = StatusSnapshots(
+    ttl=settings.STATUS_TTL, timeout=settings.A2S_TIMEOUT,
+    poll_interval=settings.STATUS_POLL_INTERVAL, idle_interval=settings.STATUS_POLL_IDLE,
+    breaker_failures=settings.STATUS_BREAKER_FAILURES, cooldown=settings.STATUS_BREAKER_COOLDOWN,
+    max_cooldown=settings.STATUS_BREAKER_MAX_COOLDOWN,
+)
+
+
+async def snapshot_for_interaction(interaction: discord.Interaction, key: str) -> ServerSnapshot:
+    """Answer from memory when fresh; otherwise defer first so the ack deadline is met.
+
+    Callers respond via ``interaction.followup`` if ``interaction.response.is_done()``.
+    """
+    snap = snapshots.peek(key)
+    if snap is None:
+        await interaction.response.defer(ephemeral=True, thinking=True)
+        snap = await snapshots.get(key)
+    return snap
@@ -0,0 +1,184 @@
+"""Write-behind queue for small bot writes (tickets, map requests, panel rows).
+
+Interaction handlers enqueue and return; nothing on the interaction path waits
+on Postgres. Queued writes are applied in order, in one transaction per batch,
+every WRITE_BEHIND_INTERVAL seconds or as soon as WRITE_BEHIND_BATCH are
+waiting. Runs of the same kind of write become a single multi-row statement.
+Connection-level failures keep the batch queued and retry with backoff; a
+batch that fails for any other reason is replayed one write at a time so a
+single bad row is dropped instead of blocking everything behind it.
+"""
+import asyncio
+import itertools
+import logging
+import time
+from dataclasses import dataclass
+from typing import Any
+
+from discord.ext import tasks
+from sqlalchemy import delete, text
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import DBAPIError, InterfaceError, OperationalError
+
+from utils.config import settings
+from utils.db import Base, SessionLocal, engine
+from utils.metrics import observe_loop
+
+log = logging.getLogger("write_behind")
+
+_NOTIFY = text("SELECT pg_notify(:channel, :payload)")
+
+
+@dataclass
+class _Write:
+    kind: str  # "insert" | "upsert" | "delete" | "notify"
+    model: type[Base] | None
+    values: dict[str, Any]
+    conflict: tuple[str, ...] = ()  # upsert: the unique columns; insert: non-empty means ignore conflicts
+
+    @property
+    def group(self) -> tuple:
+        return self.kind, self.model, self.conflict, tuple(self.values) if self.kind == "delete" else ()
+
+
+def _transient(exc: BaseException) -> bool:
+    if isinstance(exc, DBAPIError) and exc.connection_invalidated:
+        return True
+    return isinstance(exc, (OperationalError, InterfaceError, OSError, asyncio.TimeoutError))
+
+
+def _insert(model: type[Base]):
+    dialect = sqlite if engine.dialect.name == "sqlite" else postgresql
+    return dialect.insert(model)
+
+
+class WriteBehind:
+    def __init__(self, batch_size: int, max_queue: int):
+        self.batch_size = batch_size
+        self.max_queue = max_queue
+        self.dropped = 0  # lost to a full queue or failed permanently
+        self._queue: list[_Write] = []
+        self._inflight = 0  # writes taken off the queue by the running flush
+        self._lock = asyncio.Lock()
+        self._flush_pending: asyncio.Task | None = None
+        self._failures = 0
+        self._retry_at = 0.0
+
+    def __len__(self) -> int:
+        return len(self._queue) + self._inflight
+
+    def insert(self, model: type[Base], ignore_conflicts: bool = False, **values):
+        self._enqueue(_Write("insert", model, values, ("*",) if ignore_conflicts else ()))
+
+    def upsert(self, model: type[Base], conflict: tuple[str, ...], **values):
+        """Insert, or update the non-``conflict`` columns of the row matching ``conflict``."""
+        self._enqueue(_Write("upsert", model, values, conflict))
+
+    def delete(self, model: type[Base], **where):
+        assert len(where) == 1, "delete by a single column"
+        self._enqueue(_Write("delete", model, where))
+
+    def notify(self, channel: str, payload: str):
+        """``pg_notify`` in the same transaction as the writes queued before it (Postgres only)."""
+        if engine.dialect.name == "postgresql":
+            self._enqueue(_Write("notify", None, {"channel": channel, "payload": payload}))
+
+    def _enqueue(self, write: _Write):
+        self._queue.append(write)
+        if len(self._queue) > self.max_queue:
+            self.dropped += 1
+            del self._queue[0]
+        if len(self._queue) >= self.batch_size and time.monotonic() >= self._retry_at and \
+                (self._flush_pending is None or self._flush_pending.done()):
+            self._flush_pending = asyncio.create_task(self.flush())
+
+    async def _commit(self, writes: list[_Write]):
+        async with SessionLocal() as ses:
+            # consecutive writes of the same shape become one statement; order between runs is kept
+            for (kind, model, conflict, _), run in itertools.groupby(writes, key=lambda w: w.group):
+                run = list(run)
+                if kind == "insert":
+                    stmt = _insert(model)
+                    if conflict:
+                        stmt = stmt.on_conflict_do_nothing()
+                    await ses.execute(stmt, [w.values for w in run])
+                elif kind == "upsert":
+                    # one statement can't touch a row twice, so the last write per key wins
+                    rows = list({tuple(w.values[c] for c in conflict): w.values for w in run}.values())
+                    stmt = _insert(model)
+                    update = {c: stmt.excluded[c] for c in rows[0] if c not in conflict}
+                    stmt = stmt.on_conflict_do_update(index_elements=list(conflict), set_=update)
+                    await ses.execute(stmt, rows)
+                elif kind == "notify":
+                    for w in run:
+                        await ses.execute(_NOTIFY, w.values)
+                else:
+                    (col, _), = run[0].values.items()
+                    await ses.execute(delete(model).where(getattr(model, col).in_([w.values[col] for w in run])))
+            await ses.commit()
+
+    async def _commit_each(self, writes: list[_Write]) -> int:
+        """Apply one at a time, dropping writes that fail permanently. Returns how many were handled."""
+        for n, w in enumerate(writes):
+            try:
+                await self._commit([w])
+            except Exception as e:
+                if _transient(e):
+                    return n
+                self.dropped += 1
+                log.warning("Dropping %s on %s %s: %s", w.kind, getattr(w.model, "__tablename__", "-"), w.values, e)
+        return len(writes)
+
+    def _requeue(self, writes: list[_Write]):
+        """Put writes that weren't applied back in front of the ones queued meanwhile."""
+        self._queue[:0] = writes
+        overflow = len(self._queue) - self.max_queue
+        if overflow > 0:
+            self.dropped += overflow
+            del self._queue[:overflow]
+
+    async def flush(self):
+        async with self._lock:
+            while self._queue:
+                # take the batch off the queue first: _enqueue may trim the queue while we commit
+                batch = self._queue[:self.batch_size]
+                del self._queue[:len(batch)]
+                self._inflight = len(batch)
+                try:
+                    await self._commit(batch)
+                    done = len(batch)
+                except Exception as e:
+                    if _transient(e):
+                        self._failures += 1
+                        self._retry_at = time.monotonic() + min(60, 2 ** self._failures)
+                        log.warning("DB write of %d queued row(s) failed, retrying later: %s", len(batch), e)
+                        self._requeue(batch)
+                        return
+                    log.warning("DB write batch failed, replaying one by one: %s", e)
+                    done = await self._commit_each(batch)
+                finally:
+                    self._inflight = 0
+                if done < len(batch):
+                    self._requeue(batch[done:])
+                    return  # went transient half-way; the rest waits for the next tick
+                self._failures = 0
+                self._retry_at = 0.0
+
+    @tasks.loop(seconds=settings.WRITE_BEHIND_INTERVAL)
+    @observe_loop("write_behind")
+    async def flush_task(self):
+        if time.monotonic() >= self._retry_at:
+            await self.flush()
+
+    def start(self):
+        self.flush_task.start()
+
+    async def stop(self):
+        self.flush_task.cancel()
+        self._retry_at = 0.0
+        await self.flush()
+        if self._queue:
+            log.error("Shutting down with %d unwritten DB write(s)", len(self._queue))
+
+
+write_behind = WriteBehind(batch_size=settings.WRITE_BEHIND_BATCH, max_queue=settings.WRITE_BEHIND_BATCH * 20)
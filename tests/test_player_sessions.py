@@ -0,0 +1,56 @@
+import unittest
+
+from benchmarks.fakes import FakeA2SServer
+from services.player_sessions import PlayerSessions
+from services.server_registry import ServerConfig, registry
+from services.status_snapshot import StatusSnapshots
+
+
+class _NoPlayersServer(FakeA2SServer):
+    """Answers A2S_INFO; A2S_PLAYER queries are dropped while ``drop_players`` is set."""
+
+    drop_players = False
+
+    def reply(self, data: bytes) -> bytes | None:
+        if self.drop_players and data[4:5] == b"U":
+            return None
+        return super().reply(data)
+
+
+class PlayerSessionsTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.srv = await _NoPlayersServer(players=3).start()
+        self.addCleanup(self.srv.close)
+        servers = registry.all()
+        registry._index([ServerConfig("test", "127.0.0.1", self.srv.port, "127.0.0.1", 0)])
+        self.addCleanup(registry._index, servers)
+        self.store = StatusSnapshots(ttl=0, timeout=0.2)
+        self.sessions = PlayerSessions()
+        self.events: list[tuple[str, str]] = []
+        self.sessions.add_listener(lambda kind, sess: self.events.append((kind, sess.name)))
+        self.store.add_listener(self.sessions.observe)
+
+    async def test_joins_and_leaves(self):
+        await self.store._fetch("test")
+        self.assertEqual(sorted(self.events), [("join", "player000"), ("join", "player001"), ("join", "player002")])
+        self.events.clear()
+        self.srv.players = 2
+        await self.store._fetch("test")
+        self.assertEqual(self.events, [("leave", "player002")])
+
+    async def test_failed_player_query_keeps_the_sessions(self):
+        await self.store._fetch("test")
+        self.events.clear()
+        self.srv.drop_players = True
+        snap = await self.store._fetch("test")
+        self.assertTrue(snap.online)
+        self.assertIsNotNone(snap.players_error)
+        self.assertEqual(snap.names(), ["player000", "player001", "player002"])  # the last known roster
+        self.assertEqual(len(self.sessions.active("test")), 3)
+        self.srv.drop_players = False
+        await self.store._fetch("test")
+        self.assertEqual(self.events, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,98 @@
+import asyncio
+import unittest
+
+from benchmarks.fakes import FakeRconServer
+from exceptions import RconError, RconTimeout
+from utils.rcon_cs2 import RconPool
+
+
+class _DroppingRconServer(FakeRconServer):
+    """Keeps the server side of every connection so a test can cut it."""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.writers: list[asyncio.StreamWriter] = []
+
+    async def _handle(self, reader, writer):
+        self.writers.append(writer)
+        await super()._handle(reader, writer)
+
+    def drop(self):
+        for w in self.writers:
+            w.transport.abort()
+        self.writers.clear()
+
+
+class RconPoolTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.pools: list[RconPool] = []
+
+    async def asyncTearDown(self):
+        for pool in self.pools:
+            pool.close()
+
+    async def pool(self, srv: FakeRconServer, password: str = "bench", size: int = 2) -> RconPool:
+        await srv.start()
+        self.addCleanup(srv.close)
+        pool = RconPool("127.0.0.1", srv.port, password, size=size, keepalive=0)
+        self.pools.append(pool)
+        return pool
+
+    async def test_execute_reuses_the_connection(self):
+        srv = FakeRconServer(response_size=1000)
+        pool = await self.pool(srv)
+        for _ in range(3):
+            self.assertEqual(await pool.execute("status", timeout=1), "x" * 1000)
+        self.assertEqual(srv.connections, 1)
+
+    async def test_concurrent_commands_share_the_pool(self):
+        srv = FakeRconServer(latency=0.05)
+        pool = await self.pool(srv, size=2)
+        await pool.execute("status", timeout=1)
+        replies = await asyncio.gather(*(pool.execute("status", timeout=1) for _ in range(10)))
+        self.assertEqual(len(replies), 10)
+        self.assertLessEqual(srv.connections, 2)
+
+    async def test_cold_burst_stays_within_pool_size(self):
+        srv = FakeRconServer(latency=0.02)
+        pool = await self.pool(srv, size=2)
+        replies = await asyncio.gather(*(pool.execute("status", timeout=2) for _ in range(20)))
+        self.assertEqual(len(replies), 20)
+        self.assertLessEqual(srv.connections, 2)
+        self.assertLessEqual(len(pool._conns), 2)
+
+    async def test_bad_password(self):
+        pool = await self.pool(FakeRconServer(), password="wrong")
+        with self.assertRaises(RconError):
+            await pool.execute("status", timeout=1)
+
+    async def test_timeout(self):
+        pool = await self.pool(FakeRconServer(loss=1.0))
+        with self.assertRaises(RconTimeout):
+            await pool.execute("status", timeout=0.1)
+
+    async def test_reconnects_after_idle_connection_was_dropped(self):
+        srv = _DroppingRconServer()
+        pool = await self.pool(srv)
+        await pool.execute("status", timeout=1)
+        srv.drop()
+        await asyncio.sleep(0.05)
+        self.assertEqual(await pool.execute("status", timeout=1), "x" * 64)
+        self.assertEqual(srv.connections, 2)
+
+    async def test_command_lost_in_flight_is_not_sent_again(self):
+        srv = _DroppingRconServer(latency=0.2)
+        pool = await self.pool(srv)
+        await pool.execute("status", timeout=1)
+        task = asyncio.create_task(pool.execute("mp_restartgame 1", timeout=2))
+        while srv.commands < 2:
+            await asyncio.sleep(0.01)
+        srv.drop()  # the server got the command but the reply never comes back
+        with self.assertRaises(RconError):
+            await task
+        await asyncio.sleep(0.05)
+        self.assertEqual(srv.commands, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,54 @@
+import asyncio
+import unittest
+
+from benchmarks.fakes import FakeA2SServer
+from exceptions import QueryError
+from utils.source_query import A2SClient
+
+
+class A2SClientTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.client = A2SClient()
+
+    async def asyncTearDown(self):
+        self.client.close()
+
+    async def server(self, **kwargs) -> FakeA2SServer:
+        srv = await FakeA2SServer(**kwargs).start()
+        self.addCleanup(srv.close)
+        return srv
+
+    async def test_info(self):
+        srv = await self.server(players=7, max_players=32, map_name="de_dust2")
+        info = await self.client.info("127.0.0.1", srv.port, timeout=1)
+        self.assertEqual((info.map_name, info.player_count, info.max_players), ("de_dust2", 7, 32))
+        self.assertEqual(info.port, srv.port)
+
+    async def test_split_player_list(self):
+        srv = await self.server(players=120)  # well above one datagram
+        players = await self.client.players("127.0.0.1", srv.port, timeout=1)
+        self.assertEqual([p.name for p in players], [f"player{i:03d}" for i in range(120)])
+        self.assertEqual(players[5].score, 15)
+
+    async def test_late_reply_is_not_taken_for_the_next_query(self):
+        srv = await self.server(latency=0.05)
+        for timeout in (0.03, 0.06):  # the challenge round trip alone takes 0.05
+            with self.assertRaises(TimeoutError):
+                await self.client.players("127.0.0.1", srv.port, timeout=timeout)
+        # the player list (and challenge) answering the timed-out queries arrive while this one waits
+        info = await self.client.info("127.0.0.1", srv.port, timeout=1)
+        self.assertEqual(info.map_name, "surf_beginner")
+
+    async def test_timeout_when_nothing_answers(self):
+        srv = await self.server(loss=1.0)
+        with self.assertRaises(TimeoutError):
+            await self.client.info("127.0.0.1", srv.port, timeout=0.1)
+
+    async def test_concurrent_servers(self):
+        servers = [await self.server(players=n) for n in (1, 2, 3)]
+        infos = await asyncio.gather(*(self.client.info("127.0.0.1", s.port, timeout=1) for s in servers))
+        self.assertEqual([i.player_count for i in infos], [1, 2, 3])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -13,8 +13,10 @@ class Settings:
     DISCORD_BOT_TOKEN: str = os.getenv("DISCORD_BOT_TOKEN", "")
     DISCORD_GUILD_ID: int = int(os.getenv("DISCORD_GUILD_ID", "0"))
     PANEL_CHANNEL_ID: int = int(os.getenv("DISCORD_PANEL_CHANNEL_ID", "0"))
+    ALERT_CHANNEL_ID: int = int(os.getenv("DISCORD_ALERT_CHANNEL_ID", "0"))  # where /game/alert posts
     DISCORD_ADMIN_ROLE_IDS: str = os.getenv("DISCORD_ADMIN_ROLE_IDS", "")
     DISCORD_MOD_ROLE_IDS: str = os.getenv("DISCORD_MOD_ROLE_IDS", "")
+    FORCE_COMMAND_SYNC: bool = os.getenv("FORCE_COMMAND_SYNC", "0") == "1"  # sync even if the command tree is unchanged
 
     # DB
     DB_HOST: str = os.getenv("DB_HOST", "localhost")
@@ -22,14 +24,50 @@ class Settings:
     DB_USER: str = os.getenv("DB_USER", "vsb")
     DB_PASSWORD: str = os.getenv("DB_PASSWORD", "vsbpass")
     DB_NAME: str = os.getenv("DB_NAME", "vsb_bot")
+    DATABASE_URL: str = os.getenv("DATABASE_URL", "")  # full SQLAlchemy async URL; overrides the DB_* parts
+    DB_AUTO_MIGRATE: bool = os.getenv("DB_AUTO_MIGRATE", "0") == "1"  # run alembic upgrade head at startup
 
     # HTTP
     HTTP_HOST: str = os.getenv("HTTP_HOST", "0.0.0.0")
     HTTP_PORT: int = int(os.getenv("HTTP_PORT", "8080"))
     LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO")
+    LOG_FORMAT: str = os.getenv("LOG_FORMAT", "json")  # "json" (one object per line) or "text"
+    LOG_SAMPLE: str = os.getenv("LOG_SAMPLE", "")  # e.g. "status=0.1,rcon=0.2": keep that share of DEBUG/INFO records
+    LOG_QUEUE_SIZE: int = int(os.getenv("LOG_QUEUE_SIZE", "10000"))  # records beyond this are dropped, not waited on
+    RCON_API_TOKEN: str = os.getenv("RCON_API_TOKEN", "")  # bearer token for /rcon/*; empty disables the endpoints
+    GAME_EVENT_TOKEN: str = os.getenv("GAME_EVENT_TOKEN", "")  # bearer token for /game/*; empty disables the endpoints
+    ALERT_WINDOW: float = float(os.getenv("ALERT_WINDOW", "5"))  # seconds alerts are collected into one message per kind
+    ALERT_DEDUP_WINDOW: float = float(os.getenv("ALERT_DEDUP_WINDOW", "60"))  # identical alerts within this are merged
+    ALERT_MAX_BACKLOG: int = int(os.getenv("ALERT_MAX_BACKLOG", "500"))
+    GAME_STATS_MAX_BATCH: int = int(os.getenv("GAME_STATS_MAX_BATCH", "5000"))  # stat deltas per request
+    HTTP_WORKERS: int = int(os.getenv("HTTP_WORKERS", "1"))  # >1 needs REDIS_URL
+
+    # Redis (optional): leader election + shared status for multi-worker deployments
+    REDIS_URL: str = os.getenv("REDIS_URL", "")
+    LEADER_TTL: float = float(os.getenv("LEADER_TTL", "15"))  # seconds a dead leader keeps the lock
 
     # CS2
     CS2: dict = None  # filled below
+    A2S_TIMEOUT: float = float(os.getenv("A2S_TIMEOUT", "2.5"))
+    REGISTRY_RELOAD_INTERVAL: float = float(os.getenv("REGISTRY_RELOAD_INTERVAL", "60"))
+    STATUS_TTL: float = float(os.getenv("STATUS_TTL", "10"))  # seconds a status snapshot is served from memory
+    STATUS_POLL_INTERVAL: float = float(os.getenv("STATUS_POLL_INTERVAL", "15"))  # servers with players
+    STATUS_POLL_IDLE: float = float(os.getenv("STATUS_POLL_IDLE", "60"))  # empty servers
+    STATUS_BREAKER_FAILURES: int = int(os.getenv("STATUS_BREAKER_FAILURES", "3"))  # failed polls that open the circuit
+    STATUS_BREAKER_COOLDOWN: float = float(os.getenv("STATUS_BREAKER_COOLDOWN", "30"))  # first probe delay, doubles per failure
+    STATUS_BREAKER_MAX_COOLDOWN: float = float(os.getenv("STATUS_BREAKER_MAX_COOLDOWN", "300"))
+    STATUS_FLUSH_SIZE: int = int(os.getenv("STATUS_FLUSH_SIZE", "500"))  # buffered samples that trigger a flush
+    STATUS_FLUSH_INTERVAL: float = float(os.getenv("STATUS_FLUSH_INTERVAL", "30"))
+    STATUS_RAW_RETENTION_DAYS: int = int(os.getenv("STATUS_RAW_RETENTION_DAYS", "7"))
+    STATUS_MINUTE_RETENTION_DAYS: int = int(os.getenv("STATUS_MINUTE_RETENTION_DAYS", "60"))
+    STATUS_HOURLY_RETENTION_DAYS: int = int(os.getenv("STATUS_HOURLY_RETENTION_DAYS", "730"))
+    WRITE_BEHIND_INTERVAL: float = float(os.getenv("WRITE_BEHIND_INTERVAL", "2"))  # seconds between batched bot writes
+    WRITE_BEHIND_BATCH: int = int(os.getenv("WRITE_BEHIND_BATCH", "200"))
+    LEADERBOARD_REFRESH: float = float(os.getenv("LEADERBOARD_REFRESH", "10"))  # seconds between picking up stats written elsewhere
+    STREAM_QUEUE_SIZE: int = int(os.getenv("STREAM_QUEUE_SIZE", "32"))  # pending events before a stream client is evicted
+    RCON_TIMEOUT: float = float(os.getenv("RCON_TIMEOUT", "3"))
+    RCON_POOL_SIZE: int = int(os.getenv("RCON_POOL_SIZE", "2"))  # persistent connections per server
+    RCON_KEEPALIVE: float = float(os.getenv("RCON_KEEPALIVE", "30"))  # idle seconds before a keepalive ping
 
     def roles_from_csv(self, s: str) -> Sequence[int]:
         return _csv_ints(s)
@@ -1,12 +1,44 @@
+import time
+from pathlib import Path
+from sqlalchemy import event
+from sqlalchemy.engine import Connection
 from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.orm import DeclarativeBase
 from utils.config import settings
+from utils.metrics import DB_CONNECTION_SECONDS
 
 class Base(DeclarativeBase):
     pass
 
 def _dsn() -> str:
+    if settings.DATABASE_URL:
+        return settings.DATABASE_URL
     return f"postgresql+asyncpg://{settings.DB_USER}:{settings.DB_PASSWORD}@{settings.DB_HOST}:{settings.DB_PORT}/{settings.DB_NAME}"
 
 engine: AsyncEngine = create_async_engine(_dsn(), echo=False, pool_pre_ping=True)
 SessionLocal = async_sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
+
+def _upgrade(connection: Connection):
+    from alembic import command
+    from alembic.config import Config
+    root = Path(__file__).resolve().parent.parent
+    cfg = Config(str(root / "alembic.ini"))
+    cfg.set_main_option("script_location", str(root / "alembic"))
+    cfg.attributes["connection"] = connection
+    command.upgrade(cfg, "head")
+
+async def migrate():
+    """``alembic upgrade head`` on the app's engine."""
+    async with engine.begin() as conn:
+        await conn.run_sync(_upgrade)
+
+# time each pool checkout -> checkin, i.e. how long SessionLocal users hold a connection
+@event.listens_for(engine.sync_engine.pool, "checkout")
+def _on_checkout(dbapi_conn, record, proxy):
+    record.info["checked_out_at"] = time.perf_counter()
+
+@event.listens_for(engine.sync_engine.pool, "checkin")
+def _on_checkin(dbapi_conn, record):
+    started = record.info.pop("checked_out_at", None)
+    if started is not None:
+        DB_CONNECTION_SECONDS.observe(time.perf_counter() - started)
@@ -1,11 +1,161 @@
+"""Logging off the event loop.
+
+Every logger hands records to a bounded in-memory queue (``QueueHandler``);
+formatting and writing to stdout happen on a ``QueueListener`` thread, so the
+loop shared by the gateway and FastAPI only pays for merging the message
+arguments and an enqueue. Records are JSON lines carrying the correlation id
+of the HTTP request or Discord interaction they were logged under. Noisy loggers can be sampled
+(``LOG_SAMPLE=status=0.1``); sampling happens before the enqueue, and
+warnings and errors are always kept. When the queue is full, records are
+dropped and counted instead of blocking.
+"""
+import atexit
+import datetime as dt
+import json
 import logging
+import queue
+import random
 import sys
+import uuid
+from contextvars import ContextVar
+from logging.handlers import QueueHandler, QueueListener
+
+correlation_id: ContextVar[str | None] = ContextVar("correlation_id", default=None)
+
+_STD_ATTRS = frozenset(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime", "cid", "sample_rate"}
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        out = {
+            "ts": dt.datetime.fromtimestamp(record.created, dt.timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        if record.cid:
+            out["cid"] = record.cid
+        if record.sample_rate < 1.0:
+            out["sample_rate"] = record.sample_rate
+        # fields passed with extra={...}
+        out.update({k: v for k, v in vars(record).items() if k not in _STD_ATTRS and not k.startswith("_")})
+        if record.exc_info:
+            out["exc"] = self.formatException(record.exc_info)
+        if record.stack_info:
+            out["stack"] = record.stack_info
+        return json.dumps(out, default=str, ensure_ascii=False)
+
+
+class TextFormatter(logging.Formatter):
+    def __init__(self):
+        super().__init__("[%(asctime)s] [%(levelname)s] %(name)s: %(message)s")
+
+    def format(self, record: logging.LogRecord) -> str:
+        text = super().format(record)
+        return f"{text} [cid={record.cid}]" if record.cid else text
+
+
+class _Sampler(logging.Filter):
+    """Keeps a fraction of the DEBUG/INFO records from the configured loggers (and their children)."""
+
+    def __init__(self, rates: dict[str, float]):
+        super().__init__()
+        self.rates = rates
+        self._resolved: dict[str, float] = {}
+
+    def _rate(self, name: str) -> float:
+        rate = self._resolved.get(name)
+        if rate is None:
+            parts = name.split(".")
+            rate = next((self.rates[p] for p in (".".join(parts[:i]) for i in range(len(parts), 0, -1))
+                         if p in self.rates), 1.0)
+            self._resolved[name] = rate
+        return rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        rate = 1.0 if record.levelno >= logging.WARNING else self._rate(record.name)
+        record.sample_rate = rate
+        record.cid = correlation_id.get()  # read in the caller's context, before the record changes threads
+        return rate >= 1.0 or random.random() < rate
+
+
+class _AsyncQueueHandler(QueueHandler):
+    def __init__(self, q: queue.Queue):
+        super().__init__(q)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # merge the args now: they may be mutable objects the loop changes before the listener runs.
+        # Tracebacks, JSON and I/O are left to the listener thread.
+        record.msg = record.getMessage()
+        record.args = None
+        return record
 
-def configure_logging(level: str = "INFO"):
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+_handler: _AsyncQueueHandler | None = None
+
+
+def parse_sample(spec: str) -> dict[str, float]:
+    """``"status=0.1,rcon=0.5"`` -> ``{"status": 0.1, "rcon": 0.5}``."""
+    rates = {}
+    for part in filter(None, (p.strip() for p in spec.split(","))):
+        name, _, rate = part.partition("=")
+        rates[name.strip()] = min(1.0, max(0.0, float(rate)))
+    return rates
+
+
+def dropped() -> int:
+    return _handler.dropped if _handler else 0
+
+
+def configure_logging(level: str = "INFO", fmt: str = "json", sample: str = "", queue_size: int = 10000):
+    global _handler
     root = logging.getLogger()
-    root.setLevel(level)
-    handler = logging.StreamHandler(sys.stdout)
-    handler.setFormatter(logging.Formatter(
-        "[%(asctime)s] [%(levelname)s] %(name)s: %(message)s"
-    ))
-    root.addHandler(handler)
+    root.setLevel(getattr(logging, level.upper(), logging.INFO))
+    for h in root.handlers[:]:
+        root.removeHandler(h)
+
+    out = logging.StreamHandler(sys.stdout)
+    out.setFormatter(JsonFormatter() if fmt == "json" else TextFormatter())
+    _handler = _AsyncQueueHandler(queue.Queue(queue_size))
+    _handler.addFilter(_Sampler(parse_sample(sample)))
+    root.addHandler(_handler)
+    listener = QueueListener(_handler.queue, out, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)  # drains the queue; after uvicorn's own shutdown messages
+
+    # uvicorn gives its loggers their own (synchronous) handlers; route them through the queue too
+    for name in ("uvicorn", "uvicorn.error", "uvicorn.access"):
+        lg = logging.getLogger(name)
+        lg.handlers.clear()
+        lg.propagate = True
+
+
+class CorrelationMiddleware:
+    """ASGI middleware: every HTTP request gets a correlation id (``X-Request-ID``, or a new one)."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        cid = next((v.decode("latin-1") for k, v in scope["headers"] if k == b"x-request-id"), None)
+        cid = (cid or uuid.uuid4().hex[:16])[:64]
+        token = correlation_id.set(cid)
+
+        async def send_with_id(message):
+            if message["type"] == "http.response.start":
+                message.setdefault("headers", []).append((b"x-request-id", cid.encode("latin-1")))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            correlation_id.reset(token)
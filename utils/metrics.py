@@ -0,0 +1,101 @@
+"""Prometheus metrics for the hot paths, exposed at ``/metrics``.
+
+Observations are a couple of microseconds each; queue/buffer sizes are gauges
+evaluated only when scraped.
+"""
+import functools
+import time
+from typing import Callable
+
+import discord
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+
+from utils.logging import correlation_id
+
+_FAST = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+_SLOW = (0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+A2S_SECONDS = Histogram("cs2_a2s_query_seconds", "A2S query latency", ["server", "kind", "outcome"], buckets=_FAST)
+STATUS_FETCH_SECONDS = Histogram("cs2_status_fetch_seconds", "Snapshot refresh (info+players) latency",
+                                 ["server", "outcome"], buckets=_FAST)
+RCON_SECONDS = Histogram("cs2_rcon_command_seconds", "RCON command round trip", ["server", "outcome"], buckets=_FAST)
+RCON_CONNECTS = Counter("cs2_rcon_connects_total", "RCON connections opened", ["server", "outcome"])
+INTERACTION_SECONDS = Histogram("cs2_interaction_seconds", "Discord interaction handler duration",
+                                ["handler", "outcome"], buckets=_SLOW)
+DB_CONNECTION_SECONDS = Histogram("cs2_db_connection_held_seconds", "Time a DB connection is checked out of the pool",
+                                  buckets=_FAST)
+LOOP_SECONDS = Histogram("cs2_loop_iteration_seconds", "Background loop iteration duration", ["loop", "outcome"],
+                         buckets=_SLOW)
+
+
+_server_at: Callable[[str, int], str | None] = lambda host, port: None
+
+
+def set_server_resolver(fn: Callable[[str, int], str | None]):
+    """How ``server_label`` maps an address to a server key (the registry installs one)."""
+    global _server_at
+    _server_at = fn
+
+
+def server_label(host: str, port: int) -> str:
+    """``server`` label for an A2S/RCON address: the registry key, so it joins the status metrics."""
+    return _server_at(host, port) or f"{host}:{port}"
+
+
+def outcome(exc: BaseException | None) -> str:
+    if exc is None:
+        return "ok"
+    if isinstance(exc, TimeoutError):
+        return "timeout"
+    return "error"
+
+
+def observe_interaction(name: str):
+    """Decorator for interaction handlers (slash commands, buttons, modals).
+
+    Also tags everything the handler logs with the interaction id.
+    """
+    def deco(func: Callable):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            exc = None
+            interaction = next((a for a in args if isinstance(a, discord.Interaction)), None)
+            if interaction is not None:
+                correlation_id.set(f"i-{interaction.id}")  # handlers run in their own task, so no reset needed
+            try:
+                return await func(*args, **kwargs)
+            except BaseException as e:
+                exc = e
+                raise
+            finally:
+                INTERACTION_SECONDS.labels(name, outcome(exc)).observe(time.perf_counter() - started)
+        return wrapper
+    return deco
+
+
+def observe_loop(name: str):
+    """Decorator for ``tasks.loop`` bodies; apply below ``@tasks.loop``."""
+    def deco(func: Callable):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            exc = None
+            try:
+                return await func(*args, **kwargs)
+            except BaseException as e:
+                exc = e
+                raise
+            finally:
+                LOOP_SECONDS.labels(name, outcome(exc)).observe(time.perf_counter() - started)
+        return wrapper
+    return deco
+
+
+def gauge(name: str, doc: str, fn: Callable[[], float]):
+    """Gauge computed at scrape time, so there is no cost on the hot path."""
+    Gauge(name, doc).set_function(fn)
+
+
+def render() -> tuple[bytes, str]:
+    return generate_latest(), CONTENT_TYPE_LATEST
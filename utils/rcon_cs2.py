@@ -1,9 +1,284 @@
+"""Native asyncio Source RCON client with pooled, persistent connections.
+
+Each server gets a small pool of authenticated TCP connections. Commands are
+multiplexed by request id, so several can be in flight on one connection; a
+command therefore costs one round trip instead of connect + auth + command.
+
+Multi-packet responses are terminated with the usual trick: right after the
+command an empty SERVERDATA_EXECCOMMAND is sent, and since the server answers
+in order, its reply marks the end of the command's response.
+"""
 import asyncio
-from rcon.source import Client
-
-async def rcon_exec(host: str, port: int, password: str, command: str, timeout: float = 3.0) -> str:
-    loop = asyncio.get_running_loop()
-    def run():
-        with Client(host, port, passwd=password, timeout=timeout) as c:
-            return c.run(command)
-    return await loop.run_in_executor(None, run)
+import itertools
+import logging
+import struct
+import time
+
+from exceptions import RconError, RconTimeout
+from utils.config import settings
+from utils.metrics import RCON_CONNECTS, RCON_SECONDS, outcome, server_label
+
+log = logging.getLogger("rcon")
+
+SERVERDATA_AUTH = 3
+SERVERDATA_AUTH_RESPONSE = 2
+SERVERDATA_EXECCOMMAND = 2
+SERVERDATA_RESPONSE_VALUE = 0
+
+MAX_PACKET_SIZE = 4096 + 10
+
+
+def _packet(req_id: int, kind: int, body: str) -> bytes:
+    payload = struct.pack("<ii", req_id, kind) + body.encode("utf-8") + b"\x00\x00"
+    return struct.pack("<i", len(payload)) + payload
+
+
+async def _read_packet(reader: asyncio.StreamReader) -> tuple[int, int, bytes]:
+    (size,) = struct.unpack("<i", await reader.readexactly(4))
+    if size < 10 or size > MAX_PACKET_SIZE:
+        raise RconError(f"invalid RCON packet size {size}")
+    payload = await reader.readexactly(size)
+    req_id, kind = struct.unpack_from("<ii", payload)
+    return req_id, kind, payload[8:-2]
+
+
+class _NotSent(ConnectionError):
+    """The connection was unusable before the command went out, so retrying can't run it twice."""
+
+
+class _Request:
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self.future: asyncio.Future[str] = loop.create_future()
+        self.chunks: list[bytes] = []
+
+
+class RconConnection:
+    def __init__(self, host: str, port: int, password: str):
+        self.host = host
+        self.port = port
+        self.password = password
+        self.last_used = time.monotonic()
+        self._ids = itertools.count(1)
+        self._reader: asyncio.StreamReader | None = None
+        self._writer: asyncio.StreamWriter | None = None
+        self._read_task: asyncio.Task | None = None
+        self._commands: dict[int, _Request] = {}   # command id -> request
+        self._sentinels: dict[int, int] = {}       # sentinel id -> command id
+
+    @property
+    def closed(self) -> bool:
+        return self._writer is None or self._writer.is_closing()
+
+    @property
+    def inflight(self) -> int:
+        return len(self._commands)
+
+    def _next_id(self) -> int:
+        req_id = next(self._ids)
+        if req_id >= 2**31 - 1:
+            self._ids = itertools.count(1)
+            req_id = next(self._ids)
+        return req_id
+
+    async def connect(self, timeout: float):
+        try:
+            async with asyncio.timeout(timeout):
+                self._reader, self._writer = await asyncio.open_connection(self.host, self.port)
+                self._writer.write(_packet(self._next_id(), SERVERDATA_AUTH, self.password))
+                await self._writer.drain()
+                while True:
+                    # servers send an empty RESPONSE_VALUE before the AUTH_RESPONSE
+                    req_id, kind, _ = await _read_packet(self._reader)
+                    if kind == SERVERDATA_AUTH_RESPONSE:
+                        break
+        except BaseException:
+            self.close()
+            raise
+        if req_id == -1:
+            self.close()
+            raise RconError(f"RCON authentication failed for {self.host}:{self.port}")
+        self._read_task = asyncio.create_task(self._read_loop())
+
+    async def _read_loop(self):
+        exc: BaseException = ConnectionError("RCON connection closed")
+        try:
+            while True:
+                req_id, kind, body = await _read_packet(self._reader)
+                if req_id in self._sentinels:
+                    request = self._commands.pop(self._sentinels.pop(req_id), None)
+                    if request is not None and not request.future.done():
+                        request.future.set_result(b"".join(request.chunks).decode("utf-8", errors="replace"))
+                elif req_id in self._commands:
+                    self._commands[req_id].chunks.append(body)
+        except (asyncio.IncompleteReadError, OSError, RconError) as e:
+            exc = ConnectionError(f"RCON connection lost: {e}")
+        except asyncio.CancelledError:
+            pass
+        finally:
+            self._fail_all(exc)
+            self.close()
+
+    def _fail_all(self, exc: BaseException):
+        for request in self._commands.values():
+            if not request.future.done():
+                request.future.set_exception(exc)
+        self._commands.clear()
+        self._sentinels.clear()
+
+    async def execute(self, command: str, timeout: float) -> str:
+        if self.closed:
+            raise _NotSent("RCON connection closed")
+        cmd_id, sentinel_id = self._next_id(), self._next_id()
+        request = _Request(asyncio.get_running_loop())
+        self._commands[cmd_id] = request
+        self._sentinels[sentinel_id] = cmd_id
+        self.last_used = time.monotonic()
+        try:
+            try:
+                self._writer.write(_packet(cmd_id, SERVERDATA_EXECCOMMAND, command)
+                                   + _packet(sentinel_id, SERVERDATA_EXECCOMMAND, ""))
+                await self._writer.drain()
+            except (ConnectionError, OSError) as e:
+                raise _NotSent(f"RCON write failed: {e}") from e
+            async with asyncio.timeout(timeout):
+                return await request.future
+        finally:
+            self._commands.pop(cmd_id, None)
+            self._sentinels.pop(sentinel_id, None)
+
+    def close(self):
+        if self._read_task is not None and self._read_task is not asyncio.current_task():
+            self._read_task.cancel()
+        if self._writer is not None:
+            self._writer.close()
+        self._writer = None
+
+
+class RconPool:
+    """Authenticated connections to one server, reused across commands."""
+
+    def __init__(self, host: str, port: int, password: str, size: int, keepalive: float):
+        self.host = host
+        self.port = port
+        self.password = password
+        self.size = max(1, size)
+        self.keepalive = keepalive
+        self._conns: list[RconConnection] = []
+        self._connecting = 0
+        self._connect_done: asyncio.Future | None = None  # resolved whenever a connect attempt ends
+        self._keepalive_task: asyncio.Task | None = None
+
+    async def _connect(self, timeout: float) -> RconConnection:
+        conn = RconConnection(self.host, self.port, self.password)
+        try:
+            await conn.connect(timeout)
+        except BaseException:
+            RCON_CONNECTS.labels(server_label(self.host, self.port), "error").inc()
+            raise
+        RCON_CONNECTS.labels(server_label(self.host, self.port), "ok").inc()
+        return conn
+
+    async def _acquire(self, timeout: float) -> RconConnection:
+        deadline = time.monotonic() + timeout
+        while True:
+            self._conns = [c for c in self._conns if not c.closed]
+            idle = [c for c in self._conns if c.inflight == 0]
+            if idle:
+                return idle[0]
+            if len(self._conns) + self._connecting < self.size:
+                self._connecting += 1
+                try:
+                    conn = await self._connect(deadline - time.monotonic())
+                    self._conns.append(conn)
+                finally:
+                    self._connecting -= 1
+                    if self._connect_done is not None:
+                        self._connect_done.set_result(None)
+                        self._connect_done = None
+                self._ensure_keepalive()
+                return conn
+            if self._conns:
+                # pool is full: multiplex onto the least busy connection
+                return min(self._conns, key=lambda c: c.inflight)
+            # every slot is still connecting (cold burst): wait for one, then look again
+            if self._connect_done is None:
+                self._connect_done = asyncio.get_running_loop().create_future()
+            async with asyncio.timeout(deadline - time.monotonic()):
+                await asyncio.shield(self._connect_done)
+
+    async def execute(self, command: str, timeout: float) -> str:
+        started = time.perf_counter()
+        exc = None
+        try:
+            return await self._execute(command, timeout)
+        except BaseException as e:
+            exc = e
+            raise
+        finally:
+            RCON_SECONDS.labels(server_label(self.host, self.port), outcome(exc)).observe(time.perf_counter() - started)
+
+    async def _execute(self, command: str, timeout: float) -> str:
+        deadline = time.monotonic() + timeout
+        for attempt in range(2):
+            conn = None
+            try:
+                conn = await self._acquire(deadline - time.monotonic())
+                return await conn.execute(command, deadline - time.monotonic())
+            except TimeoutError:
+                raise RconTimeout(f"RCON timeout after {timeout:g}s ({self.host}:{self.port})") from None
+            except (ConnectionError, OSError) as e:
+                if conn is not None and not isinstance(e, _NotSent):
+                    # lost with the command on the wire: it may have run, and running
+                    # say / changelevel / mp_restartgame twice is worse than an error
+                    raise RconError(f"RCON connection lost during command ({self.host}:{self.port}): {e}") from e
+                # a pooled connection may have been dropped server-side; reconnect once
+                if attempt or deadline <= time.monotonic():
+                    raise RconError(f"RCON connection failed ({self.host}:{self.port}): {e}") from e
+                log.debug("RCON %s:%s reconnecting after: %s", self.host, self.port, e)
+
+    def _ensure_keepalive(self):
+        if self.keepalive > 0 and (self._keepalive_task is None or self._keepalive_task.done()):
+            self._keepalive_task = asyncio.create_task(self._keepalive_loop())
+
+    async def _keepalive_loop(self):
+        while self._conns:
+            await asyncio.sleep(self.keepalive)
+            now = time.monotonic()
+            for conn in list(self._conns):
+                if conn.closed:
+                    self._conns.remove(conn)
+                elif conn.inflight == 0 and now - conn.last_used >= self.keepalive:
+                    try:
+                        await conn.execute("", timeout=settings.RCON_TIMEOUT)
+                    except Exception as e:
+                        log.debug("RCON keepalive to %s:%s failed: %s", self.host, self.port, e)
+                        conn.close()
+                        self._conns.remove(conn)
+
+    def close(self):
+        if self._keepalive_task is not None:
+            self._keepalive_task.cancel()
+        for conn in self._conns:
+            conn.close()
+        self._conns.clear()
+
+
+_pools: dict[tuple[str, int, str], RconPool] = {}
+
+
+def _pool(host: str, port: int, password: str) -> RconPool:
+    key = (host, port, password)
+    pool = _pools.get(key)
+    if pool is None:
+        pool = _pools[key] = RconPool(host, port, password, settings.RCON_POOL_SIZE, settings.RCON_KEEPALIVE)
+    return pool
+
+
+async def rcon_exec(host: str, port: int, password: str, command: str, timeout: float = settings.RCON_TIMEOUT) -> str:
+    return await _pool(host, port, password).execute(command, timeout)
+
+
+def close_pools():
+    for pool in _pools.values():
+        pool.close()
+    _pools.clear()
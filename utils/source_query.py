@@ -1,12 +1,382 @@
+"""Native asyncio A2S (Steam server query) client.
+
+All queries share a single UDP socket. Replies are demultiplexed by source
+address, so any number of servers can be queried concurrently; queries to the
+same server are serialised because A2S replies carry no request id.
+Timeouts and cancellation simply drop the pending future — no threads involved.
+"""
 import asyncio
-import a2s
+import bz2
+import ipaddress
+import socket
+import struct
+import time
+from dataclasses import dataclass
 
-async def get_info(host: str, port: int, timeout: float = 2.5):
-    loop = asyncio.get_running_loop()
-    addr = (host, port)
-    return await asyncio.wait_for(loop.run_in_executor(None, a2s.info, addr), timeout)
+from exceptions import QueryError
+from utils.metrics import A2S_SECONDS, outcome, server_label
+
+HEADER_SIMPLE = -1
+HEADER_MULTI = -2
+RECV_BUFFER = 1 << 20
+
+A2S_INFO = b"TSource Engine Query\x00"
+A2S_PLAYER = b"U"
+A2S_RULES = b"V"
+
+S2A_INFO = 0x49       # 'I'
+S2A_PLAYER = 0x44     # 'D'
+S2A_RULES = 0x45      # 'E'
+S2A_CHALLENGE = 0x41  # 'A'
+
+NO_CHALLENGE = b"\xFF\xFF\xFF\xFF"
+MAX_CHALLENGE_ROUNDS = 3
+DNS_TTL = 300.0
+
+
+@dataclass
+class SourceInfo:
+    protocol: int = 0
+    server_name: str = ""
+    map_name: str = ""
+    folder: str = ""
+    game: str = ""
+    app_id: int = 0
+    player_count: int = 0
+    max_players: int = 0
+    bot_count: int = 0
+    server_type: str = ""
+    platform: str = ""
+    password_protected: bool = False
+    vac_enabled: bool = False
+    version: str = ""
+    port: int | None = None
+    steam_id: int | None = None
+    keywords: str | None = None
+    game_id: int | None = None
+    ping: float = 0.0
+
+
+@dataclass
+class Player:
+    index: int = 0
+    name: str = ""
+    score: int = 0
+    duration: float = 0.0
+
+
+class _Reader:
+    def __init__(self, data: bytes, offset: int = 0):
+        self.data = data
+        self.pos = offset
+
+    def _unpack(self, fmt: str):
+        size = struct.calcsize(fmt)
+        if self.pos + size > len(self.data):
+            raise QueryError("truncated A2S response")
+        (value,) = struct.unpack_from(fmt, self.data, self.pos)
+        self.pos += size
+        return value
+
+    def byte(self) -> int:
+        return self._unpack("<B")
+
+    def short(self) -> int:
+        return self._unpack("<h")
+
+    def long(self) -> int:
+        return self._unpack("<l")
+
+    def longlong(self) -> int:
+        return self._unpack("<Q")
+
+    def float(self) -> float:
+        return self._unpack("<f")
+
+    def char(self) -> str:
+        return chr(self.byte())
+
+    def string(self) -> str:
+        end = self.data.find(b"\x00", self.pos)
+        if end < 0:
+            raise QueryError("unterminated string in A2S response")
+        raw = self.data[self.pos:end]
+        self.pos = end + 1
+        return raw.decode("utf-8", errors="replace")
+
+    def remaining(self) -> int:
+        return len(self.data) - self.pos
+
+
+def _parse_info(r: _Reader) -> SourceInfo:
+    info = SourceInfo(
+        protocol=r.byte(),
+        server_name=r.string(),
+        map_name=r.string(),
+        folder=r.string(),
+        game=r.string(),
+        app_id=r.short() & 0xFFFF,
+        player_count=r.byte(),
+        max_players=r.byte(),
+        bot_count=r.byte(),
+        server_type=r.char(),
+        platform=r.char(),
+        password_protected=bool(r.byte()),
+        vac_enabled=bool(r.byte()),
+        version=r.string(),
+    )
+    if r.remaining():
+        edf = r.byte()
+        if edf & 0x80:
+            info.port = r.short() & 0xFFFF
+        if edf & 0x10:
+            info.steam_id = r.longlong()
+        if edf & 0x40:
+            r.short()
+            r.string()
+        if edf & 0x20:
+            info.keywords = r.string()
+        if edf & 0x01:
+            info.game_id = r.longlong()
+    return info
+
+
+def _parse_players(r: _Reader) -> list[Player]:
+    r.byte()  # count is a single byte and wraps on big servers; read until exhausted instead
+    players = []
+    while r.remaining():
+        players.append(Player(index=r.byte(), name=r.string(), score=r.long(), duration=r.float()))
+    return players
+
+
+def _parse_rules(r: _Reader) -> dict[str, str]:
+    count = r.short() & 0xFFFF
+    rules = {}
+    for _ in range(count):
+        if not r.remaining():
+            break  # some servers truncate the rule list
+        name = r.string()
+        rules[name] = r.string()
+    return rules
+
+
+class _Split:
+    def __init__(self):
+        self.fragments: dict[int, bytes] = {}
+        self.total = 0
+        self.compressed = False
+
+
+class _Pending:
+    """One outstanding request to a single address, incl. split-packet reassembly.
 
-async def get_players(host: str, port: int, timeout: float = 2.5):
+    Replies of another type than the one expected (or a challenge) are ignored:
+    they answer an earlier query that timed out before they arrived.
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, expect: int):
+        self.future: asyncio.Future[bytes] = loop.create_future()
+        self.expect = expect
+        self.splits: dict[int, _Split] = {}  # packet id -> fragments so far
+
+    def _deliver(self, payload: bytes):
+        if not payload or payload[0] in (self.expect, S2A_CHALLENGE):
+            self.future.set_result(payload)
+
+    def feed(self, data: bytes):
+        if self.future.done() or len(data) < 4:
+            return
+        (header,) = struct.unpack_from("<l", data)
+        if header == HEADER_SIMPLE:
+            self._deliver(data[4:])
+        elif header == HEADER_MULTI:
+            self._feed_fragment(data)
+
+    def _feed_fragment(self, data: bytes):
+        r = _Reader(data, 4)
+        try:
+            packet_id = r.long()
+            split = self.splits.setdefault(packet_id, _Split())
+            split.total = r.byte()
+            number = r.byte()
+            r.short()  # max packet size
+            if packet_id & 0x80000000 and number == 0:
+                split.compressed = True
+                r.long()  # decompressed size
+                r.long()  # crc32
+        except QueryError as e:
+            self.future.set_exception(e)
+            return
+        split.fragments[number] = data[r.pos:]
+        if split.total and len(split.fragments) == split.total:
+            del self.splits[packet_id]
+            self._assemble(split)
+
+    def _assemble(self, split: _Split):
+        payload = b"".join(split.fragments[i] for i in range(split.total))
+        if split.compressed:
+            try:
+                payload = bz2.decompress(payload)
+            except (OSError, ValueError) as e:
+                self.future.set_exception(QueryError(f"bad compressed A2S response: {e}"))
+                return
+        if payload[:4] != NO_CHALLENGE:
+            self.future.set_exception(QueryError("bad split A2S response"))
+            return
+        self._deliver(payload[4:])
+
+
+class _A2SProtocol(asyncio.DatagramProtocol):
+    def __init__(self, client: "A2SClient"):
+        self.client = client
+
+    def datagram_received(self, data: bytes, addr):
+        pending = self.client._pending.get(addr[:2])
+        if pending is not None:
+            pending.feed(data)
+
+    def error_received(self, exc: Exception):
+        # unconnected sockets rarely see ICMP errors; timeouts handle dead servers
+        pass
+
+    def connection_lost(self, exc: Exception | None):
+        self.client._lost(exc)
+
+
+class A2SClient:
+    def __init__(self):
+        self._transport: asyncio.DatagramTransport | None = None
+        self._opening: asyncio.Lock | None = None
+        self._pending: dict[tuple[str, int], _Pending] = {}
+        self._locks: dict[tuple[str, int], asyncio.Lock] = {}
+        self._dns: dict[tuple[str, int], tuple[float, tuple[str, int]]] = {}
+
+    async def _ensure_transport(self) -> asyncio.DatagramTransport:
+        if self._transport is not None and not self._transport.is_closing():
+            return self._transport
+        if self._opening is None:
+            self._opening = asyncio.Lock()
+        async with self._opening:
+            if self._transport is None or self._transport.is_closing():
+                loop = asyncio.get_running_loop()
+                self._transport, _ = await loop.create_datagram_endpoint(
+                    lambda: _A2SProtocol(self), local_addr=("0.0.0.0", 0), family=socket.AF_INET
+                )
+                # a sweep's replies all land at once; the default buffer drops big split rosters
+                # (the kernel caps this at net.core.rmem_max)
+                sock = self._transport.get_extra_info("socket")
+                if sock is not None:
+                    sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, RECV_BUFFER)
+        return self._transport
+
+    def _lost(self, exc: Exception | None):
+        self._transport = None
+        for pending in self._pending.values():
+            if not pending.future.done():
+                pending.future.set_exception(QueryError(f"A2S socket closed: {exc}"))
+
+    async def _resolve(self, host: str, port: int) -> tuple[str, int]:
+        try:
+            ipaddress.IPv4Address(host)
+            return host, port
+        except ValueError:
+            pass
+        now = time.monotonic()
+        cached = self._dns.get((host, port))
+        if cached and cached[0] > now:
+            return cached[1]
+        loop = asyncio.get_running_loop()
+        infos = await loop.getaddrinfo(host, port, family=socket.AF_INET, type=socket.SOCK_DGRAM)
+        if not infos:
+            raise QueryError(f"cannot resolve {host}")
+        addr = infos[0][4][:2]
+        self._dns[(host, port)] = (now + DNS_TTL, addr)
+        return addr
+
+    async def _exchange(self, addr: tuple[str, int], packet: bytes, expect: int) -> bytes:
+        transport = await self._ensure_transport()
+        pending = _Pending(asyncio.get_running_loop(), expect)
+        self._pending[addr] = pending
+        try:
+            transport.sendto(packet, addr)
+            return await pending.future
+        finally:
+            if self._pending.get(addr) is pending:
+                del self._pending[addr]
+
+    async def _query(self, host: str, port: int, kind: str, request: bytes, expect: int, timeout: float,
+                     challenge_in_body: bool) -> tuple[_Reader, float]:
+        started = time.perf_counter()
+        exc = None
+        try:
+            return await self._exchange_with_challenge(host, port, request, expect, timeout, challenge_in_body)
+        except BaseException as e:
+            exc = e
+            raise
+        finally:
+            A2S_SECONDS.labels(server_label(host, port), kind, outcome(exc)).observe(time.perf_counter() - started)
+
+    async def _exchange_with_challenge(self, host: str, port: int, request: bytes, expect: int, timeout: float,
+                                       challenge_in_body: bool) -> tuple[_Reader, float]:
+        async with asyncio.timeout(timeout):
+            addr = await self._resolve(host, port)
+            lock = self._locks.setdefault(addr, asyncio.Lock())
+            async with lock:
+                challenge = b"" if not challenge_in_body else NO_CHALLENGE
+                started = time.perf_counter()
+                for _ in range(MAX_CHALLENGE_ROUNDS):
+                    started = time.perf_counter()
+                    data = await self._exchange(addr, NO_CHALLENGE + request + challenge, expect)
+                    if not data:
+                        raise QueryError("empty A2S response")
+                    kind = data[0]
+                    if kind == S2A_CHALLENGE and len(data) >= 5:
+                        challenge = data[1:5]
+                        continue
+                    if kind != expect:
+                        raise QueryError(f"unexpected A2S response type {kind:#04x}")
+                    return _Reader(data, 1), time.perf_counter() - started
+                raise QueryError("A2S challenge loop did not settle")
+
+    async def info(self, host: str, port: int, timeout: float = 2.5) -> SourceInfo:
+        r, elapsed = await self._query(host, port, "info", A2S_INFO, S2A_INFO, timeout, challenge_in_body=False)
+        info = _parse_info(r)
+        info.ping = elapsed
+        return info
+
+    async def players(self, host: str, port: int, timeout: float = 2.5) -> list[Player]:
+        r, _ = await self._query(host, port, "players", A2S_PLAYER, S2A_PLAYER, timeout, challenge_in_body=True)
+        return _parse_players(r)
+
+    async def rules(self, host: str, port: int, timeout: float = 2.5) -> dict[str, str]:
+        r, _ = await self._query(host, port, "rules", A2S_RULES, S2A_RULES, timeout, challenge_in_body=True)
+        return _parse_rules(r)
+
+    def close(self):
+        if self._transport is not None:
+            self._transport.close()
+            self._transport = None
+
+
+_client: A2SClient | None = None
+_client_loop: asyncio.AbstractEventLoop | None = None
+
+
+def client() -> A2SClient:
+    """Shared client bound to the running event loop."""
+    global _client, _client_loop
     loop = asyncio.get_running_loop()
-    addr = (host, port)
-    return await asyncio.wait_for(loop.run_in_executor(None, a2s.players, addr), timeout)
+    if _client is None or _client_loop is not loop:
+        _client = A2SClient()
+        _client_loop = loop
+    return _client
+
+
+async def get_info(host: str, port: int, timeout: float = 2.5) -> SourceInfo:
+    return await client().info(host, port, timeout)
+
+async def get_players(host: str, port: int, timeout: float = 2.5) -> list[Player]:
+    return await client().players(host, port, timeout)
+
+async def get_rules(host: str, port: int, timeout: float = 2.5) -> dict[str, str]:
+    return await client().rules(host, port, timeout)